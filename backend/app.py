@@ -1,128 +1,2497 @@
 import os
+import base64
+import cProfile
+import csv
+import hashlib
+import io
 import json
+import math
+import multiprocessing
+import pstats
+import queue
+import re
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
 from datetime import datetime
-from flask import Flask, request, jsonify, send_file
+from decimal import Decimal
+from urllib.parse import quote
+import click
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
-import pandas as pd
+from sqlalchemy import event
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
 from werkzeug.utils import secure_filename
-import redis
 from dotenv import load_dotenv
+from sheets import decode_sheet, read_sheet_chunks
+
+try:
+    import fcntl
+except ImportError:  # Windows: writers only queue within a worker
+    fcntl = None
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(BASE_DIR, "data")
 os.makedirs(DATA_DIR, exist_ok=True)
 load_dotenv()
 
-app = Flask(__name__)
-CORS(app)
+app = Flask(__name__)
+CORS(app)
+
+db_path = os.path.join(DATA_DIR, "databases.db")
+# Settings left empty (as in .env.example) fall back to their defaults; only
+# REDIS_URL differs, where empty means running without Redis.
+app.config["SQLALCHEMY_DATABASE_URI"] = (
+    os.getenv("DATABASE_URL") or f"sqlite:///{db_path}"
+)
+app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+app.config["UPLOAD_FOLDER"] = os.getenv("UPLOAD_FOLDER") or "uploads"
+app.config["MAX_CONTENT_LENGTH"] = int(
+    os.getenv("MAX_CONTENT_LENGTH") or 4 * 1024 * 1024 * 1024
+)
+app.config["INGEST_BATCH_SIZE"] = int(os.getenv("INGEST_BATCH_SIZE") or 5000)
+app.config["IMPORT_CHUNK_SIZE"] = int(os.getenv("IMPORT_CHUNK_SIZE") or 50000)
+app.config["IMPORT_WORKERS"] = int(os.getenv("IMPORT_WORKERS") or 2)
+# Processes used to decode the sheets of one workbook; 0 means one per CPU.
+app.config["IMPORT_PROCESSES"] = int(os.getenv("IMPORT_PROCESSES") or 0)
+app.config["JOB_TTL"] = int(os.getenv("JOB_TTL") or 24 * 60 * 60)
+app.config["STORAGE_BACKEND"] = os.getenv("STORAGE_BACKEND") or "legacy"
+app.config["SEARCH_BACKEND"] = os.getenv("SEARCH_BACKEND") or "auto"
+app.config["CACHE_MAX_ENTRIES"] = int(os.getenv("CACHE_MAX_ENTRIES") or 1024)
+app.config["CATALOG_CACHE_TTL"] = int(os.getenv("CATALOG_CACHE_TTL") or 30)
+app.config["RESPONSE_CACHE_TTL"] = int(os.getenv("RESPONSE_CACHE_TTL") or 300)
+app.config["EXPORT_BATCH_SIZE"] = int(os.getenv("EXPORT_BATCH_SIZE") or 1000)
+# Streamed exports are flushed to the client in pieces of about this size.
+EXPORT_CHUNK_BYTES = 64 * 1024
+# Allows ?profile=1 on any endpoint to return a cProfile summary; off unless
+# enabled, since anyone who can reach the API could otherwise profile it.
+app.config["ENABLE_PROFILING"] = (os.getenv("ENABLE_PROFILING") or "0") == "1"
+app.config["DB_POOL_SIZE"] = int(os.getenv("DB_POOL_SIZE") or 10)
+app.config["DB_MAX_OVERFLOW"] = int(os.getenv("DB_MAX_OVERFLOW") or 20)
+app.config["DB_POOL_TIMEOUT"] = int(os.getenv("DB_POOL_TIMEOUT") or 30)
+# SQLite tuning: busy_timeout in milliseconds, cache_size in KiB per connection.
+app.config["SQLITE_BUSY_TIMEOUT"] = int(os.getenv("SQLITE_BUSY_TIMEOUT") or 30000)
+app.config["SQLITE_CACHE_SIZE"] = int(os.getenv("SQLITE_CACHE_SIZE") or 64 * 1024)
+app.config["SQLITE_MMAP_SIZE"] = int(
+    os.getenv("SQLITE_MMAP_SIZE") or 256 * 1024 * 1024
+)
+app.config["SQLITE_SERIALIZE_WRITES"] = (
+    os.getenv("SQLITE_SERIALIZE_WRITES") or "1"
+) == "1"
+
+
+def connect_redis(redis_url):
+    # An empty REDIS_URL runs without Redis and never imports its client.
+    if not redis_url:
+        return None
+    import redis
+
+    try:
+        client = redis.from_url(redis_url, decode_responses=True)
+        client.ping()
+        print("✅ Redis connection successful")
+        return client
+    except Exception as e:
+        print(f"⚠️  Redis connection failed: {e}")
+        return None
+
+
+redis_client = connect_redis(os.getenv("REDIS_URL", "redis://localhost:6379"))
+
+os.makedirs(app.config["UPLOAD_FOLDER"], exist_ok=True)
+
+import_queue = queue.Queue()
+import_jobs = {}
+import_jobs_lock = threading.Lock()
+import_workers_started = False
+
+
+def engine_options(database_url):
+    url = make_url(database_url)
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        return {}
+    options = {
+        "pool_size": app.config["DB_POOL_SIZE"],
+        "max_overflow": app.config["DB_MAX_OVERFLOW"],
+        "pool_timeout": app.config["DB_POOL_TIMEOUT"],
+    }
+    if url.get_backend_name() != "sqlite":
+        options.update(pool_pre_ping=True, pool_recycle=3600)
+    return options
+
+
+app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(
+    app.config["SQLALCHEMY_DATABASE_URI"]
+)
+
+db = SQLAlchemy(app)
+
+
+class WriterLock:
+    """Lets one connection at a time write to a SQLite database.
+
+    Writers queue here instead of in SQLite's busy handler, which gives up
+    after busy_timeout. Threads of a worker wait on a condition and gunicorn
+    workers on an flock of a file next to the database. The thread holding
+    the lock may take it again from a second connection; SQLite then reports
+    the conflict instead of both waiting forever.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.condition = threading.Condition()
+        self.owner = None
+        self.depth = 0
+        self.file = None
+        self.pid = None
+
+    def acquire(self):
+        me = threading.get_ident()
+        with self.condition:
+            while self.owner not in (None, me):
+                self.condition.wait()
+            self.owner = me
+            self.depth += 1
+            if self.depth > 1:
+                return
+        if fcntl is not None:
+            # flock locks belong to the open file, which forked workers share.
+            if self.pid != os.getpid():
+                self.file = open(self.path, "a")
+                self.pid = os.getpid()
+            fcntl.flock(self.file, fcntl.LOCK_EX)
+
+    def release(self):
+        with self.condition:
+            self.depth -= 1
+            if self.depth:
+                return
+            if fcntl is not None and self.pid == os.getpid():
+                fcntl.flock(self.file, fcntl.LOCK_UN)
+            self.owner = None
+            self.condition.notify()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+WRITE_STATEMENT = re.compile(
+    r"\s*(INSERT|UPDATE|DELETE|REPLACE|CREATE|DROP|ALTER)\b", re.IGNORECASE
+)
+
+
+def configure_sqlite(engine):
+    database = engine.url.database
+    if engine.dialect.name != "sqlite" or database in (None, "", ":memory:"):
+        return None
+    writer_lock = WriterLock(f"{database}.lock")
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        # WAL lets readers run while an import commits; NORMAL only syncs at
+        # checkpoints, which is still safe against application crashes.
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={app.config['SQLITE_BUSY_TIMEOUT']}")
+        cursor.execute(f"PRAGMA cache_size=-{app.config['SQLITE_CACHE_SIZE']}")
+        cursor.execute(f"PRAGMA mmap_size={app.config['SQLITE_MMAP_SIZE']}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.close()
+
+    if not app.config["SQLITE_SERIALIZE_WRITES"]:
+        return None
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def acquire_writer(conn, cursor, statement, parameters, context, executemany):
+        if "writer_lock" not in conn.info and WRITE_STATEMENT.match(statement):
+            writer_lock.acquire()
+            conn.info["writer_lock"] = True
+
+    # The commit and rollback events fire just before the driver call; a
+    # writer that starts in that window waits in SQLite's busy handler.
+    @event.listens_for(engine, "commit")
+    @event.listens_for(engine, "rollback")
+    def release_writer(conn):
+        if conn.info.pop("writer_lock", False):
+            writer_lock.release()
+
+    @event.listens_for(engine, "checkin")
+    def release_writer_on_checkin(dbapi_connection, connection_record):
+        if connection_record and connection_record.info.pop("writer_lock", False):
+            writer_lock.release()
+
+    return writer_lock
+
+
+with app.app_context():
+    writer_lock = configure_sqlite(db.engine)
+
+
+def startup_lock():
+    # Gunicorn workers start together; only one at a time may migrate or
+    # backfill, or two of them create the same table.
+    return writer_lock or nullcontext()
+
+
+class as_jsonb(FunctionElement):
+    """Casts a JSON text value to JSONB on PostgreSQL; a no-op elsewhere."""
+
+    inherit_cache = True
+    type = db.Text()
+
+
+class jsonb_as_text(FunctionElement):
+    inherit_cache = True
+    type = db.Text()
+
+
+@compiles(as_jsonb)
+@compiles(jsonb_as_text)
+def compile_json_passthrough(element, compiler, **kw):
+    return compiler.process(element.clauses, **kw)
+
+
+@compiles(as_jsonb, "postgresql")
+def compile_as_jsonb(element, compiler, **kw):
+    return f"CAST({compiler.process(element.clauses, **kw)} AS JSONB)"
+
+
+@compiles(jsonb_as_text, "postgresql")
+def compile_jsonb_as_text(element, compiler, **kw):
+    return f"CAST({compiler.process(element.clauses, **kw)} AS TEXT)"
+
+
+class JSONDocument(db.TypeDecorator):
+    """A JSON document that the application reads and writes as text.
+
+    PostgreSQL stores it as JSONB, so it can be indexed and queried with the
+    JSON operators; other databases store the text as is.
+    """
+
+    impl = db.Text
+    cache_ok = True
+
+    def bind_expression(self, bindvalue):
+        return as_jsonb(bindvalue)
+
+    def column_expression(self, column):
+        return jsonb_as_text(column)
+
+
+@compiles(JSONDocument, "postgresql")
+def compile_json_document(type_, compiler, **kw):
+    return "JSONB"
+
+
+class DynamicTable(db.Model):
+    __tablename__ = "dynamic_tables"
+    id = db.Column(db.Integer, primary_key=True)
+    table_name = db.Column(db.String(100), unique=True, nullable=False)
+    columns = db.Column(db.Text, nullable=False)
+    column_types = db.Column(db.Text)
+    storage = db.Column(
+        db.String(20), nullable=False, default="legacy", server_default="legacy"
+    )
+    search_indexed = db.Column(
+        db.Boolean, nullable=False, default=False, server_default="0"
+    )
+    row_count = db.Column(db.Integer, default=0)
+    generation = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    key_columns = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class DataRecord(db.Model):
+    __tablename__ = "data_records"
+    __table_args__ = (db.Index("ix_data_records_table_id_id", "table_id", "id"),)
+    id = db.Column(db.Integer, primary_key=True)
+    table_id = db.Column(
+        db.Integer, db.ForeignKey("dynamic_tables.id"), nullable=False
+    )
+    data = db.Column(JSONDocument, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class RowHash(db.Model):
+    __tablename__ = "row_hashes"
+    __table_args__ = (
+        db.Index("ix_row_hashes_table_id_key_hash", "table_id", "key_hash"),
+    )
+    table_id = db.Column(
+        db.Integer, db.ForeignKey("dynamic_tables.id"), primary_key=True
+    )
+    row_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    key_hash = db.Column(db.String(40), nullable=False)
+    row_hash = db.Column(db.String(40), nullable=False)
+
+
+class ImportJob(db.Model):
+    """Import job state, shared between workers when there is no Redis."""
+
+    __tablename__ = "import_jobs"
+    id = db.Column(db.String(32), primary_key=True)
+    state = db.Column(db.Text, nullable=False)
+    expires_at = db.Column(db.Float, nullable=False, index=True)
+
+
+def table_column_names(table_name):
+    return {column["name"] for column in db.inspect(db.engine).get_columns(table_name)}
+
+
+def run_ddl(ddl, applied):
+    # Several gunicorn workers may migrate at once; a statement that lost the
+    # race is fine as long as its effect is visible afterwards.
+    try:
+        with db.engine.begin() as connection:
+            connection.execute(db.text(ddl))
+    except Exception:
+        if not applied():
+            raise
+
+
+def add_missing_columns(model):
+    table = model.__table__
+    existing = table_column_names(table.name)
+    for column in table.columns:
+        if column.name in existing:
+            continue
+        ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} "
+        ddl += column.type.compile(dialect=db.engine.dialect)
+        if column.server_default is not None:
+            ddl += f" NOT NULL DEFAULT '{column.server_default.arg}'"
+        run_ddl(ddl, lambda: column.name in table_column_names(table.name))
+    for index in table.indexes:
+        index.create(bind=db.engine, checkfirst=True)
+
+
+def migrate_record_table_ids():
+    if "table_name" not in table_column_names("data_records"):
+        return
+    for table_id, table_name in db.session.execute(
+        db.select(DynamicTable.id, DynamicTable.table_name)
+    ).all():
+        db.session.execute(
+            db.text(
+                "UPDATE data_records SET table_id = :table_id "
+                "WHERE table_name = :table_name AND table_id IS NULL"
+            ),
+            {"table_id": table_id, "table_name": table_name},
+        )
+        db.session.commit()
+    run_ddl(
+        "ALTER TABLE data_records DROP COLUMN table_name",
+        lambda: "table_name" not in table_column_names("data_records"),
+    )
+
+
+def table_column_types(table_name):
+    return {
+        column["name"]: column["type"]
+        for column in db.inspect(db.engine).get_columns(table_name)
+    }
+
+
+def table_index_names(table_name):
+    return {index["name"] for index in db.inspect(db.engine).get_indexes(table_name)}
+
+
+def migrate_postgres():
+    # Databases created before JSONB support keep their rows as text.
+    if not isinstance(table_column_types("data_records")["data"], JSONB):
+        run_ddl(
+            "ALTER TABLE data_records ALTER COLUMN data TYPE JSONB USING data::jsonb",
+            lambda: isinstance(table_column_types("data_records")["data"], JSONB),
+        )
+    # jsonb_path_ops indexes only support @>, but are smaller and faster.
+    run_ddl(
+        "CREATE INDEX IF NOT EXISTS ix_data_records_data_gin "
+        "ON data_records USING gin (data jsonb_path_ops)",
+        lambda: "ix_data_records_data_gin" in table_index_names("data_records"),
+    )
+
+
+def migrate_schema():
+    db.create_all()
+    add_missing_columns(DynamicTable)
+    add_missing_columns(DataRecord)
+    migrate_record_table_ids()
+    if db.engine.dialect.name == "postgresql":
+        migrate_postgres()
+
+
+with app.app_context(), startup_lock():
+    migrate_schema()
+
+
+COLUMN_TYPES = {
+    "int": db.BigInteger,
+    "float": db.Float,
+    "bool": db.Boolean,
+    "datetime": db.DateTime,
+    "text": db.Text,
+}
+ISO_DATETIME = re.compile(r"^\d{4}-\d{2}-\d{2}([ T]\d{2}:\d{2}(:\d{2}(\.\d+)?)?)?$")
+typed_metadata = db.MetaData()
+typed_tables = {}
+typed_tables_lock = threading.Lock()
+
+
+def infer_column_type(series):
+    import pandas as pd
+
+    if pd.api.types.is_bool_dtype(series):
+        return "bool"
+    if pd.api.types.is_integer_dtype(series):
+        return "int"
+    if pd.api.types.is_float_dtype(series):
+        return "float"
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return "datetime"
+    # CSV and JSON rows carry dates as text; ISO dates get the same type as
+    # the date cells of a workbook.
+    values = series.dropna()
+    if series.dtype == object and not values.empty:
+        if all(isinstance(v, str) and ISO_DATETIME.match(v) for v in values):
+            return "datetime"
+    return "text"
+
+
+def to_json_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        # PostgreSQL sums and averages integers as numeric.
+        return int(value) if value == value.to_integral_value() else float(value)
+    return value
+
+
+def physical_table(table):
+    # SQLite reuses the ids of deleted tables and another worker may have
+    # dropped and recreated this one, so a cached definition is only reused
+    # while the table's creation time and column types still match.
+    signature = (table.created_at, table.column_types)
+    with typed_tables_lock:
+        cached = typed_tables.get(table.id)
+        if cached and cached[0] == signature:
+            return cached[1]
+        if cached:
+            typed_metadata.remove(cached[1])
+        column_types = json.loads(table.column_types)
+        physical = db.Table(
+            f"table_data_{table.id}",
+            typed_metadata,
+            db.Column("id", db.Integer, primary_key=True),
+            *[
+                db.Column(f"c{index}", COLUMN_TYPES[column_type])
+                for index, column_type in enumerate(column_types)
+            ],
+            db.Column("created_at", db.DateTime, default=datetime.utcnow),
+        )
+        typed_tables[table.id] = (signature, physical)
+        return physical
+
+
+ROW_COLUMNS = {"id": "int", "created_at": "datetime"}
+FILTER_PATTERN = re.compile(r"^\s*([^<>=!~]+?)\s*(>=|<=|!=|=|>|<|~)\s*(.*)$")
+FILTER_OPERATORS = {
+    "=": lambda expr, value: expr == value,
+    "!=": lambda expr, value: expr != value,
+    ">": lambda expr, value: expr > value,
+    ">=": lambda expr, value: expr >= value,
+    "<": lambda expr, value: expr < value,
+    "<=": lambda expr, value: expr <= value,
+}
+
+
+def json_path(column):
+    # The path is rendered as a literal rather than a bound parameter so that
+    # SQLite can match it against expression indexes on json_extract().
+    if '"' in column:
+        return db.literal(f'$."{column}"')
+    return db.literal_column("'" + f'$."{column}"'.replace("'", "''") + "'")
+
+
+def check_column(column, columns):
+    if column not in columns and column not in ROW_COLUMNS:
+        raise ValueError(f"Unknown column: {column}")
+    return column
+
+
+def parse_filters(values, columns):
+    """Parse ``column<op>value`` filters such as ``age>30`` or ``name~john``."""
+    filters = []
+    for value in values:
+        match = FILTER_PATTERN.match(value)
+        if not match:
+            raise ValueError(f"Invalid filter: {value}")
+        column, op, raw = match.groups()
+        if raw.lower() == "null" and op not in ("=", "!="):
+            raise ValueError(f"Invalid filter: {value}")
+        filters.append((check_column(column, columns), op, raw))
+    return filters
+
+
+def parse_sort(value, columns):
+    """Parse ``col1,-col2`` into (column, descending) pairs."""
+    sort = []
+    for part in value.split(","):
+        part = part.strip()
+        if part:
+            descending = part.startswith("-")
+            sort.append((check_column(part.lstrip("-+"), columns), descending))
+    return sort
+
+
+def coerce_filter_value(column_type, raw):
+    if column_type == "int":
+        return int(raw)
+    if column_type == "float":
+        return float(raw)
+    if column_type == "bool":
+        if raw.lower() not in ("true", "false", "1", "0"):
+            raise ValueError(raw)
+        return raw.lower() in ("true", "1")
+    if column_type == "datetime":
+        import pandas as pd
+
+        return pd.Timestamp(raw).to_pydatetime()
+    if column_type == "text":
+        return raw
+    # Tables created before column types were recorded; guess from the literal.
+    if raw.lower() in ("true", "false"):
+        return raw.lower() == "true"
+    for cast in (int, float):
+        try:
+            return cast(raw)
+        except ValueError:
+            pass
+    return raw
+
+
+def coerce_cell_value(column_type, value):
+    """Convert a cell value sent as JSON to *column_type*, or raise ValueError."""
+    if value is None or (value == "" and column_type != "text"):
+        return None
+    if isinstance(value, (dict, list)):
+        raise ValueError(value)
+    if isinstance(value, str):
+        return coerce_filter_value(column_type, value.strip())
+    if column_type == "text":
+        return str(value)
+    if column_type == "bool" and value in (0, 1):
+        return bool(value)
+    if isinstance(value, bool):
+        raise ValueError(value)
+    if column_type == "int" and float(value).is_integer():
+        return int(value)
+    if column_type == "float":
+        return float(value)
+    raise ValueError(value)
+
+
+def compare(expr, op, value):
+    if value is None:
+        return expr.is_(None) if op == "=" else expr.is_not(None)
+    if op == "~":
+        return db.cast(expr, db.Text).contains(value, autoescape=True)
+    return FILTER_OPERATORS[op](expr, value)
+
+
+def filter_conditions(storage, filters):
+    conditions = []
+    for column, op, raw in filters:
+        if raw.lower() == "null":
+            value = None
+        elif op == "~":
+            value = raw
+        else:
+            try:
+                value = coerce_filter_value(storage.column_type(column), raw)
+            except ValueError:
+                raise ValueError(f"Invalid value for {column}: {raw}")
+        conditions.append(storage.filter_condition(column, op, value))
+    return conditions
+
+
+def sort_order(storage, sort):
+    order = []
+    for column, descending in sort:
+        expr = storage.column_expr(column)
+        order.append(expr.desc() if descending else expr)
+    return order
+
+
+AGGREGATES = {
+    "sum": db.func.sum,
+    "avg": db.func.avg,
+    "min": db.func.min,
+    "max": db.func.max,
+    "count_distinct": lambda expr: db.func.count(db.distinct(expr)),
+}
+
+
+def parse_aggregates(args, storage):
+    """Read ``sum=a,b&avg=c`` style parameters into (function, column) pairs.
+
+    ``sum`` and ``avg`` are checked against the stored column types, so a
+    text or date column is rejected before anything is queried.
+    """
+    aggregates = []
+    for function in AGGREGATES:
+        for column in args.get(function, "").split(","):
+            column = column.strip()
+            if not column:
+                continue
+            check_column(column, storage.columns)
+            if function in ("sum", "avg") and storage.column_type(column) in (
+                "text",
+                "datetime",
+            ):
+                raise ValueError(f"Cannot {function} non-numeric column: {column}")
+            aggregates.append((function, column))
+    return aggregates
+
+
+def aggregate_rows(storage, group_by, aggregates, where=(), sort=(), limit=None):
+    """Group the stored rows in SQL and return one dict per group."""
+    groups = [
+        storage.column_expr(column).label(f"g{i}") for i, column in enumerate(group_by)
+    ]
+    values = []
+    for i, (function, column) in enumerate(aggregates):
+        values.append(storage.aggregate_expr(function, column).label(f"m{i}"))
+    count = db.func.count().label("count")
+    query = storage.select(*groups, count, *values).where(*where)
+    if groups:
+        order = []
+        for column, descending in sort:
+            expr = count if column == "count" else groups[group_by.index(column)]
+            order.append(expr.desc() if descending else expr)
+        query = query.group_by(*groups).order_by(*order, *groups)
+    if limit:
+        query = query.limit(limit)
+    results = []
+    for row in db.session.execute(query).mappings():
+        result = {
+            "group": {
+                column: to_json_value(row[f"g{i}"]) for i, column in enumerate(group_by)
+            },
+            "count": row["count"],
+        }
+        for i, (function, column) in enumerate(aggregates):
+            result.setdefault(function, {})[column] = to_json_value(row[f"m{i}"])
+        results.append(result)
+    return results
+
+
+class LegacyStorage:
+    def __init__(self, table):
+        self.table = table
+        self.columns = json.loads(table.columns)
+        self.types = dict(zip(self.columns, json.loads(table.column_types or "[]")))
+        self.id_column = DataRecord.id
+        self.physical_name = DataRecord.__tablename__
+
+    def records(self):
+        return DataRecord.query.filter_by(table_id=self.table.id)
+
+    def select(self, *columns):
+        return db.select(*columns).where(DataRecord.table_id == self.table.id)
+
+    def column_expr(self, column):
+        if column in ROW_COLUMNS and column not in self.columns:
+            return getattr(DataRecord, column)
+        return db.func.json_extract(DataRecord.data, json_path(column))
+
+    def column_type(self, column):
+        if column in ROW_COLUMNS and column not in self.columns:
+            return ROW_COLUMNS[column]
+        return self.types.get(column)
+
+    def filter_value(self, column, value):
+        # Datetimes are stored in the JSON as ISO text.
+        if isinstance(value, datetime) and column in self.columns:
+            return json_default(value)
+        return value
+
+    def filter_condition(self, column, op, value):
+        return compare(self.column_expr(column), op, self.filter_value(column, value))
+
+    def aggregate_expr(self, function, column):
+        return AGGREGATES[function](self.column_expr(column))
+
+    @staticmethod
+    def search_filter(query):
+        return DataRecord.data.contains(query)
+
+    def index_ddl(self, column):
+        if '"' in column:
+            raise ValueError(f"Cannot index column {column!r}")
+        name = f"ix_data_records_json_{hashlib.sha1(column.encode()).hexdigest()[:12]}"
+        return name, f"data_records (table_id, json_extract(data, {json_path(column)}))"
+
+    def create(self):
+        pass
+
+    def iso_dates(self, df):
+        """Bring text dates to the ISO form workbook dates are stored in."""
+        import pandas as pd
+
+        for column, column_type in self.types.items():
+            if column_type != "datetime" or column not in df:
+                continue
+            if df[column].dtype != object:
+                continue
+            parsed = pd.to_datetime(df[column], errors="coerce", format="ISO8601")
+            dates = parsed.astype(object).where(parsed.notna(), df[column])
+            df = df.assign(**{column: dates})
+        return df
+
+    def insert(self, df, batch_size=None):
+        batch_size = batch_size or app.config["INGEST_BATCH_SIZE"]
+        insert_stmt = DataRecord.__table__.insert()
+        df = self.iso_dates(df)
+        for start in range(0, len(df), batch_size):
+            chunk = df.iloc[start : start + batch_size]
+            with stage("serialize"):
+                rows = [
+                    {"table_id": self.table.id, "data": data}
+                    for data in serialize_rows(chunk)
+                ]
+            db.session.execute(insert_stmt, rows)
+        return len(df)
+
+    def count(self, search="", where=()):
+        query = self.records().filter(*where)
+        if search:
+            query = query.filter(self.search_filter(search))
+        return query.count()
+
+    def estimate_count(self):
+        low, high = db.session.execute(
+            db.select(db.func.min(DataRecord.id), db.func.max(DataRecord.id)).where(
+                DataRecord.table_id == self.table.id
+            )
+        ).one()
+        return high - low + 1 if high is not None else 0
+
+    def page(
+        self, page, per_page, search="", after_id=None, before_id=None,
+        where=(), order=(),
+    ):
+        query = self.records().filter(*where)
+        if search:
+            query = query.filter(self.search_filter(search))
+        if before_id is not None:
+            query = query.filter(DataRecord.id < before_id).order_by(
+                DataRecord.id.desc()
+            )
+        elif after_id is not None:
+            query = query.filter(DataRecord.id > after_id).order_by(DataRecord.id)
+        else:
+            query = query.order_by(*order, DataRecord.id).offset(
+                (max(page, 1) - 1) * per_page
+            )
+        records = [
+            {"id": record.id, "data": json.loads(record.data)}
+            for record in query.limit(per_page)
+        ]
+        if before_id is not None:
+            records.reverse()
+        return records
+
+    def get_rows(self, row_ids):
+        records = self.records().filter(DataRecord.id.in_(row_ids)).all()
+        rows = {record.id: json.loads(record.data) for record in records}
+        return [
+            {"id": row_id, "data": rows[row_id]} for row_id in row_ids if row_id in rows
+        ]
+
+    def max_id(self):
+        return db.session.execute(
+            db.select(db.func.max(DataRecord.id)).where(
+                DataRecord.table_id == self.table.id
+            )
+        ).scalar() or 0
+
+    def row_ids(self, after_id=0):
+        return db.session.execute(
+            db.select(DataRecord.id)
+            .where(DataRecord.table_id == self.table.id, DataRecord.id > after_id)
+            .order_by(DataRecord.id)
+        ).scalars().all()
+
+    def update_rows(self, df, ids, batch_size=None):
+        batch_size = batch_size or app.config["INGEST_BATCH_SIZE"]
+        update_stmt = (
+            DataRecord.__table__.update()
+            .where(DataRecord.id == db.bindparam("row_id"))
+            .values(data=db.bindparam("data"))
+        )
+        df = self.iso_dates(df)
+        for start in range(0, len(df), batch_size):
+            chunk = df.iloc[start : start + batch_size]
+            db.session.execute(
+                update_stmt,
+                [
+                    {"row_id": row_id, "data": data}
+                    for row_id, data in zip(
+                        ids[start : start + batch_size], serialize_rows(chunk)
+                    )
+                ],
+            )
+
+    def cell_selects(self, after_id=0, row_id=None):
+        sql = (
+            "SELECT CAST(cell.value AS TEXT), cell.key, record.table_id, record.id "
+            "FROM data_records AS record, json_each(record.data) AS cell "
+            "WHERE record.table_id = :table_id AND cell.value IS NOT NULL "
+        )
+        params = {"table_id": self.table.id, "after_id": after_id, "row_id": row_id}
+        if row_id is not None:
+            return [(sql + "AND record.id = :row_id", params)]
+        return [(sql + "AND record.id > :after_id", params)]
+
+    def iter_rows(self, batch_size=1000):
+        for record in self.records().order_by(DataRecord.id).yield_per(batch_size):
+            yield record.id, json.loads(record.data)
+
+    def update_row(self, row_id, data):
+        record = self.records().filter_by(id=row_id).first()
+        if not record:
+            return False
+        record.data = json.dumps(data, ensure_ascii=False)
+        return True
+
+    def insert_row(self, data):
+        record = DataRecord(
+            table_id=self.table.id, data=json.dumps(data, ensure_ascii=False)
+        )
+        db.session.add(record)
+        db.session.flush()
+        return record.id
+
+    def patch_row(self, row_id, changes):
+        record = self.records().filter_by(id=row_id).first()
+        if not record:
+            return False
+        record.data = json.dumps(
+            {**json.loads(record.data), **changes}, ensure_ascii=False
+        )
+        return True
+
+    def delete_rows(self, row_ids):
+        deleted = set(
+            db.session.execute(
+                db.select(DataRecord.id).where(
+                    DataRecord.table_id == self.table.id, DataRecord.id.in_(row_ids)
+                )
+            ).scalars()
+        )
+        if deleted:
+            db.session.execute(
+                DataRecord.__table__.delete().where(DataRecord.id.in_(deleted))
+            )
+        return deleted
+
+    def rename(self, new_name):
+        pass
+
+    def drop(self):
+        self.records().delete()
+
+
+class TypedStorage:
+    def __init__(self, table):
+        self.table = table
+        self.columns = json.loads(table.columns)
+        self.column_types = json.loads(table.column_types)
+        self.physical = physical_table(table)
+        self.keys = {column: f"c{index}" for index, column in enumerate(self.columns)}
+        self.types = dict(zip(self.columns, self.column_types))
+        self.id_column = self.physical.c.id
+        self.physical_name = self.physical.name
+
+    def create(self):
+        self.physical.create(bind=db.session.connection())
+
+    def select(self, *columns):
+        return db.select(*columns).select_from(self.physical)
+
+    def column_expr(self, column):
+        if column in ROW_COLUMNS and column not in self.keys:
+            return self.physical.c[column]
+        return self.physical.c[self.keys[column]]
+
+    def column_type(self, column):
+        if column in ROW_COLUMNS and column not in self.keys:
+            return ROW_COLUMNS[column]
+        return self.types[column]
+
+    def filter_condition(self, column, op, value):
+        return compare(self.column_expr(column), op, value)
+
+    def aggregate_expr(self, function, column):
+        return AGGREGATES[function](self.column_expr(column))
+
+    def index_ddl(self, column):
+        key = self.column_expr(column).name
+        return f"ix_{self.physical.name}_{key}", f"{self.physical.name} ({key})"
+
+    def row_to_dict(self, row):
+        return {
+            column: to_json_value(row[self.keys[column]]) for column in self.columns
+        }
+
+    def search_filter(self, query):
+        return db.or_(
+            *[
+                db.cast(self.physical.c[key], db.Text).contains(query)
+                for key in self.keys.values()
+            ]
+        )
+
+    def frame_rows(self, df, batch_size):
+        import pandas as pd
+
+        # A blank cell makes pandas read an int column as floats, which
+        # PostgreSQL's COPY rejects for a bigint column.
+        dates, integers = {}, {}
+        for column, column_type in zip(self.columns, self.column_types):
+            if column not in df:
+                continue
+            values = df[column]
+            if column_type == "datetime":
+                if not pd.api.types.is_datetime64_any_dtype(values):
+                    dates[column] = pd.to_datetime(
+                        values, errors="coerce", format="ISO8601"
+                    )
+            elif column_type == "int" and pd.api.types.is_float_dtype(values):
+                present = values.dropna()
+                if (present == present.round()).all():
+                    integers[column] = "Int64"
+        if dates:
+            df = df.assign(**dates)
+        for start in range(0, len(df), batch_size):
+            with stage("serialize"):
+                chunk = df.iloc[start : start + batch_size].astype(integers)
+                chunk = chunk.astype(object).where(chunk.notna(), None)
+                rows = chunk.rename(columns=self.keys).to_dict("records")
+            yield start, rows
+
+    def insert(self, df, batch_size=None, ids=None):
+        batch_size = batch_size or app.config["INGEST_BATCH_SIZE"]
+        insert_stmt = self.physical.insert()
+        for start, rows in self.frame_rows(df, batch_size):
+            if ids is not None:
+                for row, row_id in zip(rows, ids[start : start + batch_size]):
+                    row["id"] = row_id
+            db.session.execute(insert_stmt, rows)
+        return len(df)
+
+    def update_rows(self, df, ids, batch_size=None):
+        batch_size = batch_size or app.config["INGEST_BATCH_SIZE"]
+        update_stmt = (
+            self.physical.update()
+            .where(self.physical.c.id == db.bindparam("row_id"))
+            .values({key: db.bindparam(f"new_{key}") for key in self.keys.values()})
+        )
+        for start, rows in self.frame_rows(df, batch_size):
+            params = [
+                {"row_id": row_id, **{f"new_{key}": row[key] for key in row}}
+                for row, row_id in zip(rows, ids[start : start + batch_size])
+            ]
+            db.session.execute(update_stmt, params)
+
+    def count(self, search="", where=()):
+        query = db.select(db.func.count()).select_from(self.physical).where(*where)
+        if search:
+            query = query.where(self.search_filter(search))
+        return db.session.execute(query).scalar()
+
+    def estimate_count(self):
+        low, high = db.session.execute(
+            db.select(db.func.min(self.physical.c.id), db.func.max(self.physical.c.id))
+        ).one()
+        return high - low + 1 if high is not None else 0
+
+    def page(
+        self, page, per_page, search="", after_id=None, before_id=None,
+        where=(), order=(),
+    ):
+        row_id = self.physical.c.id
+        query = db.select(self.physical).where(*where)
+        if search:
+            query = query.where(self.search_filter(search))
+        if before_id is not None:
+            query = query.where(row_id < before_id).order_by(row_id.desc())
+        elif after_id is not None:
+            query = query.where(row_id > after_id).order_by(row_id)
+        else:
+            query = query.order_by(*order, row_id).offset(
+                (max(page, 1) - 1) * per_page
+            )
+        rows = db.session.execute(query.limit(per_page)).mappings()
+        records = [{"id": row["id"], "data": self.row_to_dict(row)} for row in rows]
+        if before_id is not None:
+            records.reverse()
+        return records
+
+    def search_ids(self, query, limit, after_id=0):
+        return db.session.execute(
+            db.select(self.physical.c.id)
+            .where(self.search_filter(query), self.physical.c.id > after_id)
+            .order_by(self.physical.c.id)
+            .limit(limit)
+        ).scalars().all()
+
+    def get_rows(self, row_ids):
+        rows = db.session.execute(
+            db.select(self.physical).where(self.physical.c.id.in_(row_ids))
+        ).mappings()
+        rows = {row["id"]: self.row_to_dict(row) for row in rows}
+        return [
+            {"id": row_id, "data": rows[row_id]} for row_id in row_ids if row_id in rows
+        ]
+
+    def max_id(self):
+        return (
+            db.session.execute(db.select(db.func.max(self.physical.c.id))).scalar()
+            or 0
+        )
+
+    def row_ids(self, after_id=0):
+        row_id = self.physical.c.id
+        return db.session.execute(
+            db.select(row_id).where(row_id > after_id).order_by(row_id)
+        ).scalars().all()
+
+    def cell_selects(self, after_id=0, row_id=None):
+        condition = "id = :row_id" if row_id is not None else "id > :after_id"
+        selects = []
+        for column, key in self.keys.items():
+            selects.append(
+                (
+                    f"SELECT CAST({key} AS TEXT), :column_name, :table_id, id "
+                    f"FROM {self.physical.name} "
+                    f"WHERE {key} IS NOT NULL AND {condition}",
+                    {
+                        "column_name": column,
+                        "table_id": self.table.id,
+                        "after_id": after_id,
+                        "row_id": row_id,
+                    },
+                )
+            )
+        return selects
+
+    def iter_rows(self, batch_size=1000):
+        rows = db.session.execute(
+            db.select(self.physical)
+            .order_by(self.physical.c.id)
+            .execution_options(yield_per=batch_size)
+        ).mappings()
+        for row in rows:
+            yield row["id"], self.row_to_dict(row)
+
+    def update_row(self, row_id, data):
+        values = self.to_values({column: data.get(column) for column in self.columns})
+        result = db.session.execute(
+            self.physical.update().where(self.physical.c.id == row_id).values(values)
+        )
+        return result.rowcount > 0
+
+    def to_values(self, data):
+        values = {}
+        for column, value in data.items():
+            try:
+                values[self.keys[column]] = coerce_cell_value(
+                    self.types[column], value
+                )
+            except ValueError:
+                raise ValueError(f"Invalid value for {column}: {value}")
+        return values
+
+    def insert_row(self, data):
+        result = db.session.execute(self.physical.insert().values(self.to_values(data)))
+        return result.inserted_primary_key[0]
+
+    def patch_row(self, row_id, changes):
+        query = self.physical.update().where(self.physical.c.id == row_id)
+        if not changes:
+            query = db.select(self.physical.c.id).where(self.physical.c.id == row_id)
+            return db.session.execute(query).first() is not None
+        result = db.session.execute(query.values(self.to_values(changes)))
+        return result.rowcount > 0
+
+    def delete_rows(self, row_ids):
+        row_id = self.physical.c.id
+        deleted = set(
+            db.session.execute(db.select(row_id).where(row_id.in_(row_ids))).scalars()
+        )
+        if deleted:
+            db.session.execute(self.physical.delete().where(row_id.in_(deleted)))
+        return deleted
+
+    def rename(self, new_name):
+        pass
+
+    def drop(self):
+        self.physical.drop(bind=db.session.connection())
+        with typed_tables_lock:
+            typed_metadata.remove(self.physical)
+            typed_tables.pop(self.table.id, None)
+
+
+def like_pattern(value):
+    escaped = value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def copy_rows(table_name, columns, rows):
+    """Stream rows into a table with PostgreSQL's COPY FROM STDIN.
+
+    COPY runs on the session's connection, so the rows commit or roll back
+    with the rest of the import.
+    """
+    cursor = db.session.connection().connection.cursor()
+    try:
+        with cursor.copy(
+            f"COPY {table_name} ({', '.join(columns)}) FROM STDIN"
+        ) as copy:
+            for row in rows:
+                copy.write_row(row)
+    finally:
+        cursor.close()
+
+
+def jsonb_field(column):
+    # A literal key, like json_path(), so expression indexes can match.
+    return db.literal_column("'" + column.replace("'", "''") + "'")
+
+
+class PostgresLegacyStorage(LegacyStorage):
+    """JSON rows in a JSONB column, loaded with COPY and filtered with @>."""
+
+    def column_expr(self, column):
+        if column in ROW_COLUMNS and column not in self.columns:
+            return getattr(DataRecord, column)
+        return DataRecord.data.op("->", return_type=JSONB)(jsonb_field(column))
+
+    def text_expr(self, column):
+        return DataRecord.data.op("->>", return_type=db.Text)(jsonb_field(column))
+
+    def number_expr(self, column):
+        return db.case(
+            (
+                db.func.jsonb_typeof(self.column_expr(column)) == "number",
+                db.cast(self.text_expr(column), db.Numeric),
+            )
+        )
+
+    def filter_condition(self, column, op, value):
+        if column in ROW_COLUMNS and column not in self.columns:
+            return super().filter_condition(column, op, value)
+        value = self.filter_value(column, value)
+        # ->> maps JSON null to SQL NULL, which -> does not.
+        if value is None:
+            return compare(self.text_expr(column), op, value)
+        if op == "~":
+            return self.text_expr(column).ilike(like_pattern(value), escape="\\")
+        if op == "=":
+            # Containment is answered from the GIN index on data.
+            return DataRecord.data.op("@>", is_comparison=True)(
+                db.bindparam(None, {column: value}, type_=JSONB)
+            )
+        return compare(
+            self.column_expr(column), op, db.bindparam(None, value, type_=JSONB)
+        )
+
+    def aggregate_expr(self, function, column):
+        if column in ROW_COLUMNS and column not in self.columns:
+            return super().aggregate_expr(function, column)
+        if function in ("sum", "avg"):
+            return AGGREGATES[function](self.number_expr(column))
+        if function in ("min", "max"):
+            # jsonb has no min/max; use the numbers if there are any.
+            aggregate = AGGREGATES[function]
+            return db.func.coalesce(
+                db.func.to_jsonb(aggregate(self.number_expr(column))),
+                db.func.to_jsonb(aggregate(self.text_expr(column))),
+                type_=JSONB,
+            )
+        return super().aggregate_expr(function, column)
+
+    @staticmethod
+    def search_filter(query):
+        # Matches the trigram index created by PostgresSearchIndex.
+        return db.cast(DataRecord.data, db.Text).ilike(
+            like_pattern(query), escape="\\"
+        )
+
+    def index_ddl(self, column):
+        name = f"ix_data_records_json_{hashlib.sha1(column.encode()).hexdigest()[:12]}"
+        return name, f"data_records (table_id, (data -> {jsonb_field(column)}))"
+
+    def insert(self, df, batch_size=None):
+        batch_size = batch_size or app.config["INGEST_BATCH_SIZE"]
+        created_at = datetime.utcnow()
+        # Queue GIN entries for autovacuum to merge instead of merging them
+        # every 4MB while the COPY runs, which halves its speed.
+        db.session.execute(db.text("SET LOCAL gin_pending_list_limit = '64MB'"))
+        df = self.iso_dates(df)
+        for start in range(0, len(df), batch_size):
+            with stage("serialize"):
+                rows = serialize_rows(df.iloc[start : start + batch_size])
+            copy_rows(
+                "data_records",
+                ["table_id", "data", "created_at"],
+                ((self.table.id, data, created_at) for data in rows),
+            )
+        return len(df)
+
+
+class PostgresTypedStorage(TypedStorage):
+    """Typed tables loaded with COPY."""
+
+    def filter_condition(self, column, op, value):
+        if op == "~":
+            return db.cast(self.column_expr(column), db.Text).ilike(
+                like_pattern(value), escape="\\"
+            )
+        return super().filter_condition(column, op, value)
+
+    def search_filter(self, query):
+        pattern = like_pattern(query)
+        return db.or_(
+            *[
+                db.cast(self.physical.c[key], db.Text).ilike(pattern, escape="\\")
+                for key in self.keys.values()
+            ]
+        )
+
+    def insert(self, df, batch_size=None, ids=None):
+        batch_size = batch_size or app.config["INGEST_BATCH_SIZE"]
+        created_at = datetime.utcnow()
+        keys = list(self.keys.values())
+        columns = keys + ["created_at"] + (["id"] if ids is not None else [])
+        for start, rows in self.frame_rows(df, batch_size):
+            values = (
+                [row.get(key) for key in keys] + [created_at] for row in rows
+            )
+            if ids is not None:
+                values = (
+                    row + [row_id]
+                    for row, row_id in zip(values, ids[start : start + batch_size])
+                )
+            copy_rows(self.physical.name, columns, values)
+        if ids is not None:
+            # Rows copied with their ids leave the id sequence behind.
+            db.session.execute(
+                db.text(
+                    f"SELECT setval(pg_get_serial_sequence('{self.physical.name}', "
+                    f"'id'), (SELECT max(id) FROM {self.physical.name}))"
+                )
+            )
+        return len(df)
+
+
+STORAGE_BACKENDS = {"legacy": LegacyStorage, "typed": TypedStorage}
+
+with app.app_context():
+    if db.engine.dialect.name == "postgresql":
+        STORAGE_BACKENDS.update(
+            legacy=PostgresLegacyStorage, typed=PostgresTypedStorage
+        )
+
+
+def get_storage(table):
+    return STORAGE_BACKENDS[table.storage or "legacy"](table)
+
+
+SEARCH_TERM = re.compile(r'(?:([A-Za-z_][\w.]*):)?("[^"]*"|\S+)')
+
+
+def parse_search_query(query, columns=()):
+    """Split a search into FTS5 terms, each optionally tied to a column.
+
+    ``col:term`` only restricts the term when ``col`` is one of *columns*;
+    anything else with a colon (a URL, a time) is searched for as written.
+    """
+    terms = []
+    for column, token in SEARCH_TERM.findall(query):
+        if column and normalize_column_name(column) not in columns:
+            column, token = "", f"{column}:{token}"
+        if token.startswith('"'):
+            phrase = token.strip('"').strip()
+            if phrase:
+                terms.append((column or None, f'"{phrase}"'))
+            continue
+        prefix = token.endswith("*")
+        token = token.rstrip("*").replace('"', "")
+        if token:
+            terms.append((column or None, f'"{token}"' + ("*" if prefix else "")))
+    return terms
+
+
+class LikeSearchIndex:
+    enabled = False
+    # Search cursors are (table_id, record_id).
+    cursor_shape = (int, int)
+
+    def setup(self):
+        pass
+
+    def index_rows(self, table, storage, after_id=0):
+        pass
+
+    def reindex_row(self, table, storage, row_id):
+        pass
+
+    def remove_rows(self, table, row_ids):
+        pass
+
+    def reindex_rows(self, table, storage, row_ids):
+        pass
+
+    def remove_table(self, table):
+        pass
+
+    def search_all(self, query, limit, after=None):
+        after_table, after_id = after or (0, 0)
+        condition = STORAGE_BACKENDS["legacy"].search_filter(query)
+        hits = [
+            (table_id, record_id)
+            for table_id, record_id in db.session.execute(
+                db.select(DataRecord.table_id, DataRecord.id)
+                .where(
+                    condition,
+                    db.tuple_(DataRecord.table_id, DataRecord.id)
+                    > (after_table, after_id),
+                )
+                .order_by(DataRecord.table_id, DataRecord.id)
+                .limit(limit)
+            )
+        ]
+        counts = dict(
+            db.session.execute(
+                db.select(DataRecord.table_id, db.func.count())
+                .where(condition)
+                .group_by(DataRecord.table_id)
+            ).all()
+        )
+        typed_tables = DynamicTable.query.filter_by(storage="typed").order_by(
+            DynamicTable.id
+        )
+        for table in typed_tables:
+            storage = get_storage(table)
+            counts[table.id] = storage.count(query)
+            if table.id < after_table or not counts[table.id]:
+                continue
+            if len(hits) >= limit and table.id > hits[-1][0]:
+                continue
+            start = after_id if table.id == after_table else 0
+            hits.extend(
+                (table.id, record_id)
+                for record_id in storage.search_ids(query, limit, start)
+            )
+            hits = sorted(hits)[:limit]
+        hits = [
+            (table_id, record_id, [table_id, record_id])
+            for table_id, record_id in hits
+        ]
+        return hits, counts
+
+
+class PostgresSearchIndex(LikeSearchIndex):
+    """Substring search on PostgreSQL, backed by a pg_trgm index if possible."""
+
+    def setup(self):
+        try:
+            with db.engine.begin() as connection:
+                connection.execute(db.text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+                connection.execute(
+                    db.text(
+                        "CREATE INDEX IF NOT EXISTS ix_data_records_data_trgm "
+                        "ON data_records USING gin ((data::text) gin_trgm_ops)"
+                    )
+                )
+        except Exception as e:
+            app.logger.warning("pg_trgm unavailable, search scans rows: %s", e)
+
+
+class FtsSearchIndex:
+    enabled = True
+    # Search cursors are (score, table_id, record_id).
+    cursor_shape = ((int, float), int, int)
+
+    def setup(self):
+        with db.engine.begin() as connection:
+            connection.execute(
+                db.text(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5("
+                    "value, column_name UNINDEXED, table_id UNINDEXED, "
+                    "record_id UNINDEXED, prefix='2 3')"
+                )
+            )
+        for table in DynamicTable.query.filter_by(search_indexed=False).all():
+            try:
+                self.build_table(table)
+            except Exception as e:
+                db.session.rollback()
+                app.logger.warning(
+                    "Search index for %s not built: %s", table.table_name, e
+                )
+
+    def build_table(self, table):
+        # Claiming the table first takes the write lock, so only one worker
+        # builds a given table's index.
+        claimed = db.session.execute(
+            db.update(DynamicTable)
+            .where(DynamicTable.id == table.id, DynamicTable.search_indexed.is_(False))
+            .values(search_indexed=True)
+        ).rowcount
+        if claimed:
+            self.remove_table(table)
+            self.index_rows(table, get_storage(table))
+        db.session.commit()
+
+    def index_rows(self, table, storage, after_id=0):
+        for sql, params in storage.cell_selects(after_id=after_id):
+            db.session.execute(
+                db.text(
+                    "INSERT INTO search_index "
+                    "(value, column_name, table_id, record_id) " + sql
+                ),
+                params,
+            )
+        table.search_indexed = True
+
+    def reindex_row(self, table, storage, row_id):
+        db.session.execute(
+            db.text(
+                "DELETE FROM search_index "
+                "WHERE table_id = :table_id AND record_id = :row_id"
+            ),
+            {"table_id": table.id, "row_id": row_id},
+        )
+        for sql, params in storage.cell_selects(row_id=row_id):
+            db.session.execute(
+                db.text(
+                    "INSERT INTO search_index "
+                    "(value, column_name, table_id, record_id) " + sql
+                ),
+                params,
+            )
+
+    def remove_rows(self, table, row_ids):
+        db.session.execute(
+            db.text(
+                "DELETE FROM search_index "
+                "WHERE table_id = :table_id AND record_id IN :row_ids"
+            ).bindparams(db.bindparam("row_ids", expanding=True)),
+            {"table_id": table.id, "row_ids": list(row_ids)},
+        )
+
+    def reindex_rows(self, table, storage, row_ids):
+        # One pass over the index to drop the old cells, then per-row inserts.
+        self.remove_rows(table, row_ids)
+        for row_id in row_ids:
+            for sql, params in storage.cell_selects(row_id=row_id):
+                db.session.execute(
+                    db.text(
+                        "INSERT INTO search_index "
+                        "(value, column_name, table_id, record_id) " + sql
+                    ),
+                    params,
+                )
+
+    def remove_table(self, table):
+        db.session.execute(
+            db.text("DELETE FROM search_index WHERE table_id = :table_id"),
+            {"table_id": table.id},
+        )
+
+    def matches(self, query, table_id=None):
+        columns = ()
+        if ":" in query:
+            tables = db.select(DynamicTable.columns)
+            if table_id is not None:
+                tables = tables.where(DynamicTable.id == table_id)
+            columns = {
+                column
+                for names in db.session.execute(tables).scalars()
+                for column in json.loads(names)
+            }
+        terms = parse_search_query(query, columns)
+        if not terms:
+            return None, {}
+        selects = []
+        params = {"term_count": len(terms)}
+        for index, (column, expression) in enumerate(terms):
+            sql = (
+                f"SELECT table_id, record_id, {index} AS term, "
+                f"rank AS score FROM search_index "
+                f"WHERE search_index MATCH :match_{index}"
+            )
+            params[f"match_{index}"] = expression
+            if column:
+                sql += f" AND column_name = :column_{index}"
+                params[f"column_{index}"] = normalize_column_name(column)
+            if table_id is not None:
+                sql += " AND table_id = :table_id"
+                params["table_id"] = table_id
+            selects.append(sql)
+        sql = (
+            "SELECT table_id, record_id, SUM(score) AS score FROM ("
+            + " UNION ALL ".join(selects)
+            + ") GROUP BY table_id, record_id "
+            "HAVING COUNT(DISTINCT term) = :term_count"
+        )
+        return sql, params
+
+    def match_ids(self, query, table_id):
+        """A subquery of the record ids in one table that match *query*."""
+        sql, params = self.matches(query, table_id)
+        if sql is None:
+            return db.select(db.literal(None)).where(db.false())
+        matches = db.text(sql).bindparams(**params).columns(
+            db.column("record_id", db.Integer)
+        ).subquery()
+        return db.select(matches.c.record_id)
+
+    def search(
+        self, query, limit, offset=0, table_id=None, after_id=None, before_id=None
+    ):
+        sql, params = self.matches(query, table_id)
+        if sql is None:
+            return []
+        params = {**params, "limit": limit, "offset": offset}
+        if before_id is not None:
+            sql = (
+                f"SELECT * FROM ({sql}) WHERE record_id < :before_id "
+                "ORDER BY record_id DESC LIMIT :limit"
+            )
+            params["before_id"] = before_id
+        elif after_id is not None:
+            sql = (
+                f"SELECT * FROM ({sql}) WHERE record_id > :after_id "
+                "ORDER BY record_id LIMIT :limit"
+            )
+            params["after_id"] = after_id
+        else:
+            sql += " ORDER BY score, table_id, record_id LIMIT :limit OFFSET :offset"
+        hits = [(row.table_id, row.record_id) for row in db.session.execute(
+            db.text(sql), params
+        )]
+        if before_id is not None:
+            hits.reverse()
+        return hits
+
+    def search_all(self, query, limit, after=None):
+        sql, params = self.matches(query)
+        if sql is None:
+            return [], {}
+        where = ""
+        if after:
+            where = (
+                " WHERE (score, table_id, record_id) "
+                "> (:after_score, :after_table, :after_record)"
+            )
+            params.update(
+                {
+                    "after_score": after[0],
+                    "after_table": after[1],
+                    "after_record": after[2],
+                }
+            )
+        rows = db.session.execute(
+            db.text(
+                f"SELECT table_id, record_id, score FROM ({sql}){where} "
+                "ORDER BY score, table_id, record_id LIMIT :limit"
+            ),
+            {**params, "limit": limit},
+        )
+        hits = [
+            (row.table_id, row.record_id, [row.score, row.table_id, row.record_id])
+            for row in rows
+        ]
+        counts = dict(
+            db.session.execute(
+                db.text(
+                    f"SELECT table_id, COUNT(*) FROM ({sql}) GROUP BY table_id"
+                ),
+                params,
+            ).all()
+        )
+        return hits, counts
+
+    def count(self, query, table_id=None):
+        sql, params = self.matches(query, table_id)
+        if sql is None:
+            return 0
+        return db.session.execute(
+            db.text(f"SELECT COUNT(*) FROM ({sql})"), params
+        ).scalar()
+
+
+def fts5_available():
+    if db.engine.dialect.name != "sqlite":
+        return False
+    with db.engine.connect() as connection:
+        options = connection.exec_driver_sql("PRAGMA compile_options").scalars()
+        return "ENABLE_FTS5" in set(options)
+
+
+with app.app_context(), startup_lock():
+    search_backend = app.config["SEARCH_BACKEND"]
+    if search_backend == "fts" or (search_backend == "auto" and fts5_available()):
+        search_index = FtsSearchIndex()
+    elif db.engine.dialect.name == "postgresql":
+        search_index = PostgresSearchIndex()
+    else:
+        search_index = LikeSearchIndex()
+    search_index.setup()
+
+
+def backfill_row_counts():
+    for table in DynamicTable.query.filter(DynamicTable.row_count.is_(None)):
+        table.row_count = get_storage(table).count()
+        db.session.commit()
+
+
+with app.app_context(), startup_lock():
+    backfill_row_counts()
+
+
+def adjust_row_count(table, delta):
+    if delta:
+        table.row_count = DynamicTable.row_count + delta
+
+
+class LocalCache:
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self.lock:
+            self.entries[key] = (value, time.monotonic() + ttl)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+
+class ResponseCache:
+    def __init__(self, client, max_entries):
+        self.client = client
+        self.local = LocalCache(max_entries)
+        self.stats = {}
+        self.lock = threading.Lock()
+
+    def redis_call(self, method, *args, **kwargs):
+        # Any Redis failure degrades to the in-process LRU for this call.
+        if not self.client:
+            raise ConnectionError("Redis is not configured")
+        return getattr(self.client, method)(*args, **kwargs)
+
+    def get(self, key):
+        try:
+            value = self.redis_call("get", f"cache:{key}")
+            return json.loads(value) if value is not None else None
+        except Exception:
+            return self.local.get(key)
+
+    def set(self, key, value, ttl):
+        try:
+            self.redis_call("set", f"cache:{key}", json.dumps(value), ex=ttl)
+        except Exception:
+            self.local.set(key, value, ttl)
+
+    def record(self, namespace, hit):
+        field = f"{namespace}:{'hits' if hit else 'misses'}"
+        try:
+            self.redis_call("hincrby", "cache:stats", field, 1)
+        except Exception:
+            with self.lock:
+                self.stats[field] = self.stats.get(field, 0) + 1
+
+    def lookup(self, namespace, key):
+        value = self.get(f"{namespace}:{key}")
+        self.record(namespace, value is not None)
+        return value
+
+    def snapshot(self):
+        try:
+            counters = {
+                field: int(value)
+                for field, value in self.redis_call("hgetall", "cache:stats").items()
+            }
+            backend = "redis"
+        except Exception:
+            with self.lock:
+                counters = dict(self.stats)
+            backend = "local"
+        namespaces = {}
+        for field, value in counters.items():
+            namespace, kind = field.rsplit(":", 1)
+            namespaces.setdefault(namespace, {"hits": 0, "misses": 0})[kind] = value
+        for counts in namespaces.values():
+            lookups = counts["hits"] + counts["misses"]
+            counts["hit_ratio"] = round(counts["hits"] / lookups, 4) if lookups else 0.0
+        return {
+            "backend": backend,
+            "local_entries": len(self.local.entries),
+            "local_max_entries": self.local.max_entries,
+            "namespaces": namespaces,
+        }
+
+
+cache = ResponseCache(redis_client, app.config["CACHE_MAX_ENTRIES"])
+
+METRICS_FLUSH_INTERVAL = 1.0
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+METRIC_FAMILIES = {
+    "excel_db_requests_total": ("counter", "HTTP requests by endpoint and status"),
+    "excel_db_request_seconds": ("histogram", "HTTP request latency"),
+    "excel_db_stage_seconds_total": (
+        "counter",
+        "Time spent in each stage of an endpoint, excluding nested stages",
+    ),
+    "excel_db_rows_processed_total": ("counter", "Rows imported, read or exported"),
+    "excel_db_sql_statements_total": ("counter", "SQL statements executed"),
+    "excel_db_sql_seconds_total": ("counter", "Time spent executing SQL statements"),
+    "excel_db_cache_lookups_total": ("counter", "Response cache lookups"),
+}
+
+
+def metric_series(name, **labels):
+    if not labels:
+        return name
+    pairs = []
+    for label, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"')
+        value = value.replace("\n", "\\n")
+        pairs.append(f'{label}="{value}"')
+    return f"{name}{{{','.join(pairs)}}}"
+
+
+class RequestMetrics:
+    """Stage timings, rows and SQL activity collected for one request or job."""
+
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.stages = defaultdict(float)
+        self.rows = 0
+        self.sql_statements = 0
+        self.sql_seconds = 0.0
+        self.lock = threading.Lock()
+
+    def add_stage(self, name, seconds):
+        with self.lock:
+            self.stages[name] += seconds
+
+    def add_sql(self, seconds):
+        with self.lock:
+            self.sql_statements += 1
+            self.sql_seconds += seconds
+
+    def add_rows(self, rows):
+        with self.lock:
+            self.rows += rows
+
+    def series(self):
+        labels = {"endpoint": self.endpoint}
+        values = {
+            metric_series("excel_db_stage_seconds_total", **labels, stage=name): seconds
+            for name, seconds in self.stages.items()
+        }
+        values[metric_series("excel_db_rows_processed_total", **labels)] = self.rows
+        values[metric_series("excel_db_sql_statements_total", **labels)] = (
+            self.sql_statements
+        )
+        values[metric_series("excel_db_sql_seconds_total", **labels)] = self.sql_seconds
+        return values
+
+    def summary(self):
+        return {
+            "stages": {name: round(value, 6) for name, value in self.stages.items()},
+            "rows": self.rows,
+            "sql_statements": self.sql_statements,
+            "sql_seconds": round(self.sql_seconds, 6),
+        }
+
+
+class Metrics:
+    """Prometheus counters, shared by all gunicorn workers through Redis.
+
+    Requests only add to an in-process buffer, which a background thread
+    writes to Redis in one pipeline every METRICS_FLUSH_INTERVAL seconds.
+    Without Redis (or while it is unreachable) each worker counts locally, so
+    a scrape only sees the worker that answered it.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.pending = defaultdict(float)
+        self.local = defaultdict(float)
+        self.flusher = None
+        self.lock = threading.Lock()
+
+    def add(self, values):
+        with self.lock:
+            target = self.pending if self.client else self.local
+            for series, amount in values.items():
+                if amount:
+                    target[series] += amount
+            # Started lazily so that every forked worker gets its own thread.
+            if self.client and not (self.flusher and self.flusher.is_alive()):
+                self.flusher = threading.Thread(
+                    target=self.flush_forever, name="metrics-flusher", daemon=True
+                )
+                self.flusher.start()
+
+    def flush_forever(self):
+        while True:
+            time.sleep(METRICS_FLUSH_INTERVAL)
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            pending, self.pending = self.pending, defaultdict(float)
+        if not pending:
+            return
+        try:
+            pipeline = self.client.pipeline(transaction=False)
+            for series, amount in pending.items():
+                pipeline.hincrbyfloat("metrics", series, amount)
+            pipeline.execute()
+        except Exception:
+            with self.lock:
+                for series, amount in pending.items():
+                    self.local[series] += amount
+
+    def record_request(self, collector, status, seconds):
+        labels = {"endpoint": collector.endpoint}
+        values = collector.series()
+        series = metric_series(
+            "excel_db_requests_total", **labels, method=request.method, status=status
+        )
+        values[series] = 1
+        for bucket in (*REQUEST_BUCKETS, "+Inf"):
+            if bucket == "+Inf" or seconds <= bucket:
+                series = metric_series(
+                    "excel_db_request_seconds_bucket", **labels, le=bucket
+                )
+                values[series] = 1
+        values[metric_series("excel_db_request_seconds_sum", **labels)] = seconds
+        values[metric_series("excel_db_request_seconds_count", **labels)] = 1
+        self.add(values)
+
+    def snapshot(self):
+        self.flush()
+        try:
+            values = {
+                series: float(value)
+                for series, value in self.client.hgetall("metrics").items()
+            }
+        except Exception:
+            values = {}
+        with self.lock:
+            for series, amount in self.local.items():
+                values[series] = values.get(series, 0.0) + amount
+        return values
+
+    def render(self):
+        values = self.snapshot()
+        for namespace, counts in cache.snapshot()["namespaces"].items():
+            for result in ("hits", "misses"):
+                series = metric_series(
+                    "excel_db_cache_lookups_total", namespace=namespace, result=result
+                )
+                values[series] = counts[result]
+        lines = []
+        for family, (metric_type, description) in METRIC_FAMILIES.items():
+            lines.append(f"# HELP {family} {description}")
+            lines.append(f"# TYPE {family} {metric_type}")
+            if metric_type == "histogram":
+                lines.extend(self.render_histogram(family, values))
+                continue
+            for series in sorted(values):
+                if series.split("{", 1)[0] == family:
+                    lines.append(f"{series} {values[series]:g}")
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def render_histogram(family, values):
+        """Every bucket of each label set in ``le`` order, including empty ones."""
+        lines = []
+        prefix = f"{family}_count"
+        for count in sorted(values):
+            if count.split("{", 1)[0] != prefix:
+                continue
+            labels = count[len(prefix):]
+            for bucket in (*REQUEST_BUCKETS, "+Inf"):
+                le = f'le="{bucket}"'
+                pairs = f"{labels[:-1]},{le}}}" if labels else f"{{{le}}}"
+                series = f"{family}_bucket{pairs}"
+                lines.append(f"{series} {values.get(series, 0.0):g}")
+            series = f"{family}_sum{labels}"
+            lines.append(f"{series} {values.get(series, 0.0):g}")
+            lines.append(f"{count} {values[count]:g}")
+        return lines
+
+
+metrics = Metrics(redis_client)
+active_metrics = threading.local()
+
+
+def current_metrics():
+    return getattr(active_metrics, "collector", None)
+
+
+@contextmanager
+def collecting(collector):
+    """Attribute stages and SQL in this thread to *collector*."""
+    previous = current_metrics(), getattr(active_metrics, "stack", None)
+    active_metrics.collector, active_metrics.stack = collector, []
+    try:
+        yield collector
+    finally:
+        active_metrics.collector, active_metrics.stack = previous
+
+
+@contextmanager
+def stage(name):
+    """Time a stage of the current request; nested stages are not double counted."""
+    collector = current_metrics()
+    if collector is None:
+        yield
+        return
+    stack = active_metrics.stack
+    stack.append(0.0)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        nested = stack.pop()
+        if stack:
+            stack[-1] += elapsed
+        collector.add_stage(name, elapsed - nested)
+
+
+def timed_chunks(chunks, name):
+    """Yield from *chunks*, timing the work done to produce each item."""
+    iterator = iter(chunks)
+    try:
+        while True:
+            with stage(name):
+                try:
+                    chunk = next(iterator)
+                except StopIteration:
+                    return
+            yield chunk
+    finally:
+        if hasattr(iterator, "close"):
+            iterator.close()
+
+
+def count_rows(rows):
+    collector = current_metrics()
+    if collector is not None:
+        collector.add_rows(rows)
+
+
+# The start time lives on the statement's execution context rather than the
+# connection, so a statement that fails leaves nothing behind to mistime the
+# next one.
+@event.listens_for(Engine, "before_cursor_execute")
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._query_started = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_query_started", None)
+    collector = current_metrics()
+    if started is not None and collector is not None:
+        collector.add_sql(time.perf_counter() - started)
+
+
+@app.before_request
+def start_request_metrics():
+    g.request_started = time.perf_counter()
+    g.request_metrics = RequestMetrics(request.endpoint or "unknown")
+    g.metrics_context = collecting(g.request_metrics)
+    g.metrics_context.__enter__()
+    if request.args.get("profile") == "1" and app.config["ENABLE_PROFILING"]:
+        g.profiler = cProfile.Profile()
+        g.profiler.enable()
+
+
+@app.after_request
+def finish_request_metrics(response):
+    g.response_status = response.status_code
+    profiler = g.pop("profiler", None)
+    if profiler is None:
+        return response
+    if response.is_streamed:
+        # Run the stream to the end so the profile covers producing the body.
+        for _ in response.response:
+            pass
+    profiler.disable()
+    report = {
+        "seconds": round(time.perf_counter() - g.request_started, 6),
+        **g.request_metrics.summary(),
+        "functions": profile_functions(profiler),
+    }
+    payload = response.get_json(silent=True) if not response.is_streamed else None
+    if isinstance(payload, dict):
+        payload["profile"] = report
+    else:
+        payload = {"status": response.status_code, "profile": report}
+    return app.response_class(
+        json.dumps(payload, default=json_default) + "\n",
+        status=response.status_code,
+        mimetype="application/json",
+    )
+
+
+def profile_functions(profiler, limit=30):
+    stats = pstats.Stats(profiler).sort_stats("cumulative")
+    functions = []
+    for function in stats.fcn_list[:limit]:
+        calls, _, own, cumulative, _ = stats.stats[function]
+        filename, line, name = function
+        functions.append(
+            {
+                "function": f"{os.path.basename(filename)}:{line}({name})",
+                "calls": calls,
+                "own_seconds": round(own, 6),
+                "cumulative_seconds": round(cumulative, 6),
+            }
+        )
+    return functions
+
+
+@app.teardown_request
+def record_request_metrics(error=None):
+    collector = g.pop("request_metrics", None)
+    if collector is None:
+        return
+    g.pop("metrics_context").__exit__(None, None, None)
+    status = 500 if error is not None else g.get("response_status", 500)
+    metrics.record_request(
+        collector, status, time.perf_counter() - g.request_started
+    )
+
+
+def bump_generation(table):
+    table.generation = DynamicTable.generation + 1
+
+
+def request_cache_key(*parts):
+    payload = json.dumps([parts, sorted(request.args.items(multi=True))])
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+def table_cache_key(table):
+    created_at = table.created_at.isoformat() if table.created_at else ""
+    return request_cache_key(table.id, created_at, table.generation)
+
+
+def catalog_fingerprint():
+    # Changes whenever any table is written, created or deleted, so cached
+    # cross-table search results are never served after a write.
+    return tuple(
+        str(value)
+        for value in db.session.execute(
+            db.select(
+                db.func.count(DynamicTable.id),
+                db.func.coalesce(db.func.sum(DynamicTable.generation), 0),
+                db.func.max(DynamicTable.id),
+                db.func.max(DynamicTable.created_at),
+            )
+        ).one()
+    )
+
+
+def normalize_column_name(col):
+    return col.strip().lower().replace(" ", "_").replace("-", "_")
+
+
+def get_table_columns(table_name):
+    table = DynamicTable.query.filter_by(table_name=table_name).first()
+    if table:
+        return json.loads(table.columns)
+    return None
+
+
+def json_default(value):
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+def serialize_rows(df):
+    df = df.astype(object).where(df.notna(), None)
+    return [
+        json.dumps(row, ensure_ascii=False, default=json_default)
+        for row in df.to_dict("records")
+    ]
+
+
+IMPORT_MODES = ("append", "replace", "upsert")
+
+
+def value_hash(values):
+    payload = json.dumps(
+        values, ensure_ascii=False, default=json_default, separators=(",", ":")
+    )
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+def hash_value(column_type, value):
+    """Bring a cell to its column's stored type before it is hashed.
+
+    pandas types every chunk on its own: one blank cell turns an int column
+    into floats, and 1 and 1.0 must not hash differently.
+    """
+    if value is None or isinstance(value, bool):
+        return value
+    if column_type == "datetime" and isinstance(value, str):
+        # Text dates hash like the dates they are stored as.
+        try:
+            return datetime.fromisoformat(value).isoformat()
+        except ValueError:
+            pass
+    if isinstance(value, float):
+        if math.isnan(value):
+            return None
+        if column_type != "float" and value.is_integer():
+            return int(value)
+    elif isinstance(value, int) and column_type == "float":
+        return float(value)
+    return value
 
-db_path = os.path.join(DATA_DIR, "databases.db")
-app.config["SQLALCHEMY_DATABASE_URI"] = os.getenv(
-    "DATABASE_URL", f"sqlite:///{db_path}"
-)
-app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
-app.config["UPLOAD_FOLDER"] = os.getenv("UPLOAD_FOLDER", "uploads")
-app.config["MAX_CONTENT_LENGTH"] = 16 * 1024 * 1024
 
-try:
-    redis_url = os.getenv("REDIS_URL", "redis://localhost:6379")
-    redis_client = redis.from_url(redis_url, decode_responses=True)
-    redis_client.ping()
-    print("✅ Redis connection successful")
-except Exception as e:
-    print(f"⚠️  Redis connection failed: {e}")
-    redis_client = None
+def row_hashes(rows, table, key):
+    columns = json.loads(table.columns)
+    types = dict(zip(columns, json.loads(table.column_types or "[]")))
+    with stage("hash"):
+        hashes = []
+        for row in rows:
+            values = {
+                col: hash_value(types.get(col), row.get(col)) for col in columns
+            }
+            hashes.append(
+                (
+                    value_hash([values[col] for col in key]),
+                    value_hash([values[col] for col in columns]),
+                )
+            )
+        return hashes
 
-os.makedirs(app.config["UPLOAD_FOLDER"], exist_ok=True)
 
-db = SQLAlchemy(app)
+def frame_records(df):
+    return df.astype(object).where(df.notna(), None).to_dict("records")
 
 
-class DynamicTable(db.Model):
-    __tablename__ = "dynamic_tables"
-    id = db.Column(db.Integer, primary_key=True)
-    table_name = db.Column(db.String(100), unique=True, nullable=False)
-    columns = db.Column(db.Text, nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+def save_row_hashes(table, row_ids, hashes):
+    if row_ids:
+        db.session.execute(
+            RowHash.__table__.insert(),
+            [
+                {
+                    "table_id": table.id,
+                    "row_id": row_id,
+                    "key_hash": key_hash,
+                    "row_hash": row_hash,
+                }
+                for row_id, (key_hash, row_hash) in zip(row_ids, hashes)
+            ],
+        )
 
 
-class DataRecord(db.Model):
-    __tablename__ = "data_records"
-    id = db.Column(db.Integer, primary_key=True)
-    table_name = db.Column(db.String(100), nullable=False)
-    data = db.Column(db.Text, nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+def remove_row_hashes(table, row_ids=None):
+    query = RowHash.__table__.delete().where(RowHash.table_id == table.id)
+    if row_ids is not None:
+        query = query.where(RowHash.row_id.in_(list(row_ids)))
+    db.session.execute(query)
 
 
-with app.app_context():
-    db.create_all()
+def refresh_row_hashes(table, storage, row_ids):
+    # Keeps the upsert index in step with rows edited through the API.
+    if not table.key_columns:
+        return
+    remove_row_hashes(table, row_ids)
+    rows = storage.get_rows(list(row_ids))
+    save_row_hashes(
+        table,
+        [row["id"] for row in rows],
+        row_hashes(
+            [row["data"] for row in rows], table, json.loads(table.key_columns)
+        ),
+    )
 
 
-def normalize_column_name(col):
-    return col.strip().lower().replace(" ", "_").replace("-", "_")
+def index_row_hashes(table, storage, key):
+    """Hash every stored row on the given key columns, replacing old hashes."""
+    remove_row_hashes(table)
+    batch_size = app.config["INGEST_BATCH_SIZE"]
+    row_ids, rows = [], []
+    for row_id, data in storage.iter_rows(batch_size):
+        row_ids.append(row_id)
+        rows.append(data)
+        if len(rows) >= batch_size:
+            save_row_hashes(table, row_ids, row_hashes(rows, table, key))
+            row_ids, rows = [], []
+    save_row_hashes(table, row_ids, row_hashes(rows, table, key))
+    table.key_columns = json.dumps(key, ensure_ascii=False)
 
 
-def get_table_columns(table_name):
-    table = DynamicTable.query.filter_by(table_name=table_name).first()
-    if table:
-        return json.loads(table.columns)
-    return None
+def find_row_hashes(table, key_hashes):
+    found = {}
+    for start in range(0, len(key_hashes), 500):
+        for row_id, key_hash, row_hash in db.session.execute(
+            db.select(RowHash.row_id, RowHash.key_hash, RowHash.row_hash).where(
+                RowHash.table_id == table.id,
+                RowHash.key_hash.in_(key_hashes[start : start + 500]),
+            )
+        ):
+            found[key_hash] = (row_id, row_hash)
+    return found
+
+
+def insert_frame(table, storage, df, key=None):
+    if not key:
+        return storage.insert(df)
+    after_id = storage.max_id()
+    inserted = storage.insert(df)
+    save_row_hashes(
+        table,
+        storage.row_ids(after_id),
+        row_hashes(frame_records(df), table, key),
+    )
+    return inserted
+
+
+def upsert_frame(table, storage, df, key):
+    """Insert new keys, rewrite changed rows and skip unchanged ones.
+
+    Rows with a blank key cell cannot be matched and are skipped.
+    """
+    columns = json.loads(table.columns)
+    df = df[columns]
+    blank_keys = df[key].isna().any(axis=1)
+    skipped = int(blank_keys.sum())
+    if skipped:
+        df = df[~blank_keys]
+    hashes = row_hashes(frame_records(df), table, key)
+    # The last row wins when a key repeats within the file.
+    positions = {key_hash: index for index, (key_hash, _) in enumerate(hashes)}
+    existing = find_row_hashes(table, list(positions))
+    new_positions, changed_positions, changed_ids = [], [], []
+    for key_hash, index in positions.items():
+        if key_hash not in existing:
+            new_positions.append(index)
+        elif existing[key_hash][1] != hashes[index][1]:
+            changed_positions.append(index)
+            changed_ids.append(existing[key_hash][0])
+    if new_positions:
+        insert_frame(table, storage, df.iloc[new_positions], key)
+    if changed_positions:
+        storage.update_rows(df.iloc[changed_positions], changed_ids)
+        db.session.execute(
+            RowHash.__table__.update()
+            .where(
+                RowHash.table_id == table.id,
+                RowHash.row_id == db.bindparam("changed_id"),
+            )
+            .values(row_hash=db.bindparam("new_hash")),
+            [
+                {"changed_id": row_id, "new_hash": hashes[index][1]}
+                for row_id, index in zip(changed_ids, changed_positions)
+            ],
+        )
+        search_index.reindex_rows(table, storage, changed_ids)
+    return len(new_positions), len(changed_positions), skipped
+
+
+def drop_table(table):
+    search_index.remove_table(table)
+    remove_row_hashes(table)
+    get_storage(table).drop()
+    db.session.delete(table)
+    db.session.flush()
 
 
-def create_or_update_table(df, table_name):
-    df.columns = [normalize_column_name(col) for col in df.columns]
+def resolve_target_table(table_name, df, mode="append"):
     columns = df.columns.tolist()
     existing_table = DynamicTable.query.filter_by(table_name=table_name).first()
+    if existing_table and mode == "replace":
+        drop_table(existing_table)
+        existing_table = None
     if existing_table:
-        existing_cols = set(json.loads(existing_table.columns))
-        new_cols = set(columns)
-        if existing_cols == new_cols:
-            for _, row in df.iterrows():
-                record = DataRecord(
-                    table_name=table_name,
-                    data=json.dumps(row.to_dict(), ensure_ascii=False),
-                )
-                db.session.add(record)
-        else:
-            base_name = table_name
-            counter = 1
-            while DynamicTable.query.filter_by(
-                table_name=f"{base_name}_{counter}"
-            ).first():
-                counter += 1
-            table_name = f"{base_name}_{counter}"
-            new_table = DynamicTable(
-                table_name=table_name, columns=json.dumps(columns, ensure_ascii=False)
-            )
-            db.session.add(new_table)
-            for _, row in df.iterrows():
-                record = DataRecord(
-                    table_name=table_name,
-                    data=json.dumps(row.to_dict(), ensure_ascii=False),
-                )
-                db.session.add(record)
-    else:
-        new_table = DynamicTable(
-            table_name=table_name, columns=json.dumps(columns, ensure_ascii=False)
-        )
-        db.session.add(new_table)
-        for _, row in df.iterrows():
-            record = DataRecord(
-                table_name=table_name,
-                data=json.dumps(row.to_dict(), ensure_ascii=False),
+        if set(json.loads(existing_table.columns)) == set(columns):
+            return existing_table
+        if mode == "upsert":
+            raise ValueError(
+                f"Columns of '{table_name}' do not match the file; "
+                "upsert needs the same columns"
             )
-            db.session.add(record)
-    db.session.commit()
-    return table_name
+        base_name = table_name
+        counter = 1
+        while DynamicTable.query.filter_by(
+            table_name=f"{base_name}_{counter}"
+        ).first():
+            counter += 1
+        table_name = f"{base_name}_{counter}"
+    new_table = DynamicTable(
+        table_name=table_name,
+        columns=json.dumps(columns, ensure_ascii=False),
+        column_types=json.dumps([infer_column_type(df[col]) for col in columns]),
+        storage=app.config["STORAGE_BACKEND"],
+    )
+    db.session.add(new_table)
+    db.session.flush()
+    get_storage(new_table).create()
+    return new_table
 
 
-@app.route("/api/tables", methods=["GET"])
-def get_tables():
-    tables = DynamicTable.query.all()
+def refresh_statistics(table_name, rows):
+    """ANALYZE a PostgreSQL table once a load has grown it by more than 10%.
+
+    Autovacuum gets there eventually, but until then the planner treats a
+    freshly loaded table as nearly empty and picks sequential scans.
+    """
+    if db.engine.dialect.name != "postgresql" or not rows:
+        return
+    known_rows = db.session.execute(
+        db.text("SELECT reltuples FROM pg_class WHERE oid = CAST(:name AS regclass)"),
+        {"name": table_name},
+    ).scalar()
+    if known_rows is None or known_rows < 0 or rows > known_rows / 10:
+        db.session.execute(db.text(f"ANALYZE {table_name}"))
+
+
+def create_or_update_table(
+    frames, table_name, on_chunk=None, mode="append", key=None
+):
+    import pandas as pd
+
+    if isinstance(frames, pd.DataFrame):
+        frames = [frames]
+    if mode not in IMPORT_MODES:
+        raise ValueError(f"Invalid mode. Use {', '.join(IMPORT_MODES)}")
+    key = [normalize_column_name(col) for col in key or []]
+    if mode == "upsert" and not key:
+        raise ValueError("upsert needs key columns")
+    started = time.perf_counter()
+    target_table = None
+    storage = None
+    rows = inserted = updated = skipped = 0
+    for df in frames:
+        if df.empty:
+            continue
+        df.columns = [normalize_column_name(str(col)) for col in df.columns]
+        if target_table is None:
+            missing = [col for col in key if col not in df.columns]
+            if missing:
+                raise ValueError(f"Key columns not in file: {', '.join(missing)}")
+            target_table = resolve_target_table(table_name, df, mode)
+            storage = get_storage(target_table)
+            after_id = storage.max_id()
+            if not key and target_table.key_columns:
+                # Appended rows need hashes too, or a later upsert on the
+                # stored key would not find them and insert duplicates.
+                key = json.loads(target_table.key_columns)
+            if key and target_table.key_columns != json.dumps(key, ensure_ascii=False):
+                index_row_hashes(target_table, storage, key)
+        with stage("insert"):
+            if mode == "upsert":
+                new_rows, changed_rows, skipped_rows = upsert_frame(
+                    target_table, storage, df, key
+                )
+                inserted += new_rows
+                updated += changed_rows
+                skipped += skipped_rows
+            else:
+                inserted += insert_frame(target_table, storage, df, key)
+        rows += len(df)
+        if on_chunk:
+            on_chunk(len(df))
+    if target_table is None:
+        return None, None
+    with stage("index"):
+        search_index.index_rows(target_table, storage, after_id)
+        refresh_statistics(storage.physical_name, inserted)
+        if key:
+            refresh_statistics(RowHash.__tablename__, inserted)
+    adjust_row_count(target_table, inserted)
+    bump_generation(target_table)
+    target_name = target_table.table_name
+    with stage("commit"):
+        db.session.commit()
+    count_rows(rows)
+    elapsed = time.perf_counter() - started
+    stats = {
+        "table": target_name,
+        "mode": mode,
+        "rows": rows,
+        "inserted": inserted,
+        "updated": updated,
+        "unchanged": rows - inserted - updated - skipped,
+        "skipped": skipped,
+        "seconds": round(elapsed, 3),
+        "rows_per_sec": round(rows / elapsed) if elapsed > 0 else rows,
+    }
+    app.logger.info(
+        "Ingested %s rows into %s in %.3fs (%s rows/s)",
+        rows,
+        target_name,
+        elapsed,
+        stats["rows_per_sec"],
+    )
+    return target_name, stats
+
+
+def load_catalog():
+    tables = DynamicTable.query.order_by(DynamicTable.id).all()
     result = []
     for table in tables:
-        record_count = DataRecord.query.filter_by(table_name=table.table_name).count()
+        record_count = table.row_count
+        if record_count is None:
+            record_count = get_storage(table).count()
         result.append(
             {
                 "id": table.id,
@@ -132,35 +2501,564 @@ def get_tables():
                 "created_at": table.created_at.isoformat(),
             }
         )
+    return result
+
+
+@app.route("/api/tables", methods=["GET"])
+def get_tables():
+    # Keyed on the catalog fingerprint rather than invalidated on write, so a
+    # worker never serves a catalog cached before another worker's write.
+    cache_key = request_cache_key(catalog_fingerprint())
+    result = cache.lookup("tables", cache_key)
+    if result is None:
+        result = load_catalog()
+        cache.set(f"tables:{cache_key}", result, app.config["CATALOG_CACHE_TTL"])
     return jsonify(result)
 
 
+@app.route("/api/cache/stats", methods=["GET"])
+def cache_stats():
+    return jsonify(cache.snapshot())
+
+
+@app.route("/api/metrics", methods=["GET"])
+def prometheus_metrics():
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+
 @app.route("/api/tables/<table_name>", methods=["GET"])
 def get_table_data(table_name):
     page = request.args.get("page", 1, type=int)
     per_page = request.args.get("per_page", 50, type=int)
     search = request.args.get("search", "")
+    count_mode = request.args.get("count", "exact")
+    after_id = request.args.get("after_id", type=int)
+    before_id = request.args.get("before_id", type=int)
+    if count_mode not in ("exact", "estimate", "none"):
+        return jsonify({"error": "Invalid count. Use exact, estimate or none"}), 400
+    if per_page < 1:
+        return jsonify({"error": "per_page must be at least 1"}), 400
+    if request.args.get("cursor"):
+        try:
+            direction, row_id = decode_cursor(request.args["cursor"], (str, int))
+        except ValueError:
+            return jsonify({"error": "Invalid cursor"}), 400
+        if direction == "before":
+            before_id = row_id
+        else:
+            after_id = row_id
     table = DynamicTable.query.filter_by(table_name=table_name).first()
     if not table:
         return jsonify({"error": "Table not found"}), 404
-    query = DataRecord.query.filter_by(table_name=table_name)
-    if search:
-        search_filter = DataRecord.data.contains(search)
-        query = query.filter(search_filter)
-    paginated = query.paginate(page=page, per_page=per_page, error_out=False)
-    records = []
-    for record in paginated.items:
-        records.append({"id": record.id, "data": json.loads(record.data)})
-    return jsonify(
+    columns = json.loads(table.columns)
+    try:
+        filters = parse_filters(request.args.getlist("filter"), columns)
+        sort = parse_sort(request.args.get("sort", ""), columns)
+        fields = [
+            check_column(field.strip(), columns)
+            for field in request.args.get("fields", "").split(",")
+            if field.strip()
+        ]
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if sort and (after_id is not None or before_id is not None):
+        return jsonify({"error": "Cursors cannot be combined with sort"}), 400
+    cache_key = table_cache_key(table)
+    with stage("cache"):
+        result = cache.lookup("pages", cache_key)
+    if result is not None:
+        count_rows(len(result["records"]))
+        return jsonify(result)
+    storage = get_storage(table)
+    keyset = after_id is not None or before_id is not None
+    # Full-text matches are ranked by relevance unless the client seeks by id,
+    # filters or sorts, and sorted pages are paged by offset, so id cursors
+    # are only handed out for id-ordered pages.
+    ranked = search and search_index.enabled and not (keyset or filters or sort)
+    with stage("query"):
+        where = None
+        if search and search_index.enabled and not (filters or sort):
+            hits = search_index.search(
+                search,
+                per_page,
+                (max(page, 1) - 1) * per_page,
+                table.id,
+                after_id=after_id,
+                before_id=before_id,
+            )
+            records = storage.get_rows([record_id for _, record_id in hits])
+        else:
+            try:
+                where = filter_conditions(storage, filters)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            if search and search_index.enabled:
+                matches = search_index.match_ids(search, table.id)
+                where.append(storage.id_column.in_(matches))
+                search = ""
+            records = storage.page(
+                page, per_page, search, after_id, before_id, where,
+                sort_order(storage, sort),
+            )
+    filtered = bool(search or where)
+
+    total = None
+    with stage("count"):
+        if count_mode != "none" and not filtered and table.row_count is not None:
+            total = table.row_count
+        elif count_mode == "estimate" and not filtered:
+            total = storage.estimate_count()
+        elif count_mode != "none":
+            if where is None:
+                total = search_index.count(search, table.id)
+            else:
+                total = storage.count(search, where)
+
+    next_cursor = prev_cursor = None
+    if records and not ranked and not sort:
+        if len(records) == per_page or before_id is not None:
+            next_cursor = encode_cursor(["after", records[-1]["id"]])
+        if (keyset and (before_id is None or len(records) == per_page)) or (
+            not keyset and page > 1
+        ):
+            prev_cursor = encode_cursor(["before", records[0]["id"]])
+    if fields:
+        records = [
+            {
+                "id": record["id"],
+                "data": {field: record["data"].get(field) for field in fields},
+            }
+            for record in records
+        ]
+    result = {
+        "table_name": table_name,
+        "columns": fields or columns,
+        "records": records,
+        "total": total,
+        "pages": math.ceil(total / per_page) if total else total,
+        "current_page": None if keyset else page,
+        "count": count_mode,
+        "next_cursor": next_cursor,
+        "prev_cursor": prev_cursor,
+    }
+    with stage("cache"):
+        cache.set(f"pages:{cache_key}", result, app.config["RESPONSE_CACHE_TTL"])
+    count_rows(len(records))
+    with stage("serialize"):
+        return jsonify(result)
+
+
+@app.route("/api/tables/<table_name>/aggregate", methods=["GET"])
+def aggregate_table(table_name):
+    limit = request.args.get("limit", 1000, type=int)
+    table = DynamicTable.query.filter_by(table_name=table_name).first()
+    if not table:
+        return jsonify({"error": "Table not found"}), 404
+    columns = json.loads(table.columns)
+    storage = get_storage(table)
+    try:
+        group_by = [
+            check_column(column.strip(), columns)
+            for column in request.args.get("group_by", "").split(",")
+            if column.strip()
+        ]
+        aggregates = parse_aggregates(request.args, storage)
+        filters = parse_filters(request.args.getlist("filter"), columns)
+        sort = parse_sort(request.args.get("sort", ""), group_by + ["count"])
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if any(column not in group_by + ["count"] for column, _ in sort):
+        return jsonify({"error": "Sort by a group_by column or count"}), 400
+    if not 0 < limit <= 10000:
+        return jsonify({"error": "limit must be between 1 and 10000"}), 400
+    cache_key = table_cache_key(table)
+    result = cache.lookup("aggregates", cache_key)
+    if result is not None:
+        return jsonify(result)
+    started = time.perf_counter()
+    try:
+        groups = aggregate_rows(
+            storage, group_by, aggregates, filter_conditions(storage, filters), sort,
+            limit,
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    result = {
+        "table_name": table_name,
+        "group_by": group_by,
+        "groups": groups,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+    cache.set(f"aggregates:{cache_key}", result, app.config["RESPONSE_CACHE_TTL"])
+    return jsonify(result)
+
+
+def read_csv_chunks(source, chunk_size):
+    import pandas as pd
+
+    with pd.read_csv(source, chunksize=chunk_size) as reader:
+        yield from reader
+
+
+def iter_file_tables(filepath, filename):
+    chunk_size = app.config["IMPORT_CHUNK_SIZE"]
+    base_name = filename.rsplit(".", 1)[0]
+    if filename.endswith(".csv"):
+        size = os.path.getsize(filepath) or 1
+        with open(filepath, "rb") as handle:
+            chunks = timed_chunks(read_csv_chunks(handle, chunk_size), "parse")
+            try:
+                yield (
+                    base_name.replace(" ", "_"),
+                    chunks,
+                    lambda rows: min(handle.tell() / size, 1.0),
+                )
+            finally:
+                chunks.close()
+    elif filename.endswith(".xlsx"):
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(filepath, read_only=True, data_only=True)
+        try:
+            total_rows = sum(
+                max((worksheet.max_row or 1) - 1, 0)
+                for worksheet in workbook.worksheets
+            )
+            for worksheet in workbook.worksheets:
+                table_name = f"{base_name}_{worksheet.title}".replace(" ", "_")
+                yield (
+                    table_name,
+                    timed_chunks(read_sheet_chunks(worksheet, chunk_size), "parse"),
+                    lambda rows: min(rows / total_rows, 1.0) if total_rows else None,
+                )
+        finally:
+            workbook.close()
+    else:
+        import pandas as pd
+
+        excel_file = pd.ExcelFile(filepath)
+        sheet_count = len(excel_file.sheet_names)
+        for index, sheet_name in enumerate(excel_file.sheet_names):
+            table_name = f"{base_name}_{sheet_name}".replace(" ", "_")
+            with stage("parse"):
+                frame = excel_file.parse(sheet_name)
+            yield (
+                table_name,
+                [frame],
+                lambda rows, done=index + 1: done / sheet_count,
+            )
+
+
+# Decoded chunks a sheet may have waiting for its insert thread.
+DECODED_CHUNKS_PER_SHEET = 2
+
+
+def decoder_context():
+    # Decoders come from a forkserver, not a fork of this (threaded) worker.
+    context = multiprocessing.get_context("forkserver")
+    context.set_forkserver_preload(["sheets", "pandas", "openpyxl"])
+    return context
+
+
+def received_chunks(chunks, decoder, parse_seconds):
+    """Yield the frames a decoder process sends, see sheets.decode_sheet."""
+    while True:
+        try:
+            kind, value = chunks.get(timeout=1)
+        except queue.Empty:
+            if decoder.exitcode is not None:
+                raise RuntimeError(
+                    f"Sheet decoder exited with code {decoder.exitcode}"
+                )
+            continue
+        if kind == "error":
+            raise RuntimeError(value)
+        if kind == "done":
+            parse_seconds.append(value)
+            return
+        yield value
+
+
+def import_process_count(sheet_count):
+    # Decoders re-import the main script. When that is this file (python
+    # app.py) each would run the app's startup, so sheets are read in-process.
+    main_file = getattr(sys.modules["__main__"], "__file__", None)
+    if "forkserver" not in multiprocessing.get_all_start_methods() or (
+        main_file and os.path.abspath(main_file) == os.path.abspath(__file__)
+    ):
+        return 1
+    processes = app.config["IMPORT_PROCESSES"] or os.cpu_count() or 1
+    return max(1, min(processes, sheet_count))
+
+
+def workbook_sheets(filepath):
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(filepath, read_only=True, data_only=True)
+    try:
+        return [
+            (worksheet.title, max((worksheet.max_row or 1) - 1, 0))
+            for worksheet in workbook.worksheets
+        ]
+    finally:
+        workbook.close()
+
+
+def import_sheets_parallel(
+    filepath, filename, sheets, on_progress=None, mode="append", key=None
+):
+    base_name = filename.rsplit(".", 1)[0]
+    total_rows = sum(rows for _, rows in sheets)
+    processes = import_process_count(len(sheets))
+    progress_lock = threading.Lock()
+    rows_done = 0
+    # Sheets are inserted concurrently (on SQLite they take turns through the
+    # writer lock), except that sheets mapping to the same table go in turn.
+    table_locks = defaultdict(threading.Lock)
+    collector = current_metrics()
+
+    def on_chunk(rows):
+        nonlocal rows_done
+        with progress_lock:
+            rows_done += rows
+            if on_progress:
+                fraction = min(rows_done / total_rows, 1.0) if total_rows else None
+                on_progress(rows_done, fraction)
+
+    def ingest(title):
+        # Each sheet in flight has one decoder process streaming chunks to the
+        # thread inserting them, so memory stays bounded however many sheets
+        # the workbook has.
+        table_name = f"{base_name}_{title}".replace(" ", "_")
+        parse_seconds = []
+        with app.app_context(), collecting(collector), table_locks[table_name]:
+            chunks = context.Queue(DECODED_CHUNKS_PER_SHEET)
+            decoder = context.Process(
+                target=decode_sheet,
+                args=(filepath, title, chunk_size, chunks),
+                daemon=True,
+            )
+            decoder.start()
+            try:
+                created_table, stats = create_or_update_table(
+                    received_chunks(chunks, decoder, parse_seconds),
+                    table_name,
+                    on_chunk,
+                    mode,
+                    key,
+                )
+            except Exception:
+                db.session.rollback()
+                raise
+            finally:
+                db.session.remove()
+                if decoder.is_alive():
+                    decoder.terminate()
+                decoder.join()
+                chunks.close()
+        parse_seconds = sum(parse_seconds)
+        if collector is not None:
+            collector.add_stage("parse", parse_seconds)
+        if stats:
+            stats = {"sheet": title, "parse_seconds": round(parse_seconds, 3), **stats}
+        return created_table, stats
+
+    chunk_size = app.config["IMPORT_CHUNK_SIZE"]
+    context = decoder_context()
+    with ThreadPoolExecutor(processes) as writers:
+        writing = {title: writers.submit(ingest, title) for title, _ in sheets}
+        results = {title: future.result() for title, future in writing.items()}
+
+    tables_created = []
+    ingest_stats = []
+    for title, _ in sheets:
+        created_table, stats = results[title]
+        if created_table:
+            tables_created.append(created_table)
+            ingest_stats.append(stats)
+    return tables_created, ingest_stats
+
+
+def import_file(filepath, filename, on_progress=None, mode="append", key=None):
+    if filename.endswith(".xlsx"):
+        sheets = workbook_sheets(filepath)
+        if len(sheets) > 1 and import_process_count(len(sheets)) > 1:
+            return import_sheets_parallel(
+                filepath, filename, sheets, on_progress, mode, key
+            )
+    tables_created = []
+    ingest_stats = []
+    rows_done = 0
+    for table_name, frames, fraction in iter_file_tables(filepath, filename):
+
+        def on_chunk(rows):
+            nonlocal rows_done
+            rows_done += rows
+            if on_progress:
+                on_progress(rows_done, fraction(rows_done))
+
+        created_table, stats = create_or_update_table(
+            frames, table_name, on_chunk, mode, key
+        )
+        if created_table:
+            tables_created.append(created_table)
+            ingest_stats.append(stats)
+    return tables_created, ingest_stats
+
+
+def save_job(job, progress=False):
+    """Store *job* where every worker can poll it.
+
+    Without Redis the worker running a job keeps its live state in memory and
+    writes status changes to the import_jobs table. Progress updates are not
+    written there: they arrive while the import holds its write transaction,
+    which on SQLite would block another connection's write.
+    """
+    if redis_client:
+        redis_client.set(
+            f"import_job:{job['id']}", json.dumps(job), ex=app.config["JOB_TTL"]
+        )
+        return
+    with import_jobs_lock:
+        if job["finished_at"]:
+            import_jobs.pop(job["id"], None)
+        else:
+            import_jobs[job["id"]] = dict(job)
+    if progress:
+        return
+    jobs = ImportJob.__table__
+    now = time.time()
+    values = {"state": json.dumps(job), "expires_at": now + app.config["JOB_TTL"]}
+    with db.engine.begin() as connection:
+        saved = connection.execute(
+            jobs.update().where(jobs.c.id == job["id"]).values(**values)
+        ).rowcount
+        if not saved:
+            connection.execute(jobs.delete().where(jobs.c.expires_at < now))
+            connection.execute(jobs.insert().values(id=job["id"], **values))
+
+
+def load_job(job_id):
+    if redis_client:
+        job = redis_client.get(f"import_job:{job_id}")
+        return json.loads(job) if job else None
+    with import_jobs_lock:
+        job = import_jobs.get(job_id)
+        if job:
+            return dict(job)
+    jobs = ImportJob.__table__
+    with db.engine.connect() as connection:
+        state = connection.execute(
+            db.select(jobs.c.state).where(
+                jobs.c.id == job_id, jobs.c.expires_at >= time.time()
+            )
+        ).scalar()
+    return json.loads(state) if state else None
+
+
+def enqueue_import_job(filepath, filename, mode="append", key=None):
+    job_id = uuid.uuid4().hex
+    save_job(
         {
-            "table_name": table_name,
-            "columns": json.loads(table.columns),
-            "records": records,
-            "total": paginated.total,
-            "pages": paginated.pages,
-            "current_page": page,
+            "id": job_id,
+            "status": "queued",
+            "filename": filename,
+            "filepath": filepath,
+            "mode": mode,
+            "key": key or [],
+            "rows_processed": 0,
+            "progress": 0.0,
+            "tables": [],
+            "stats": [],
+            "error": None,
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
         }
     )
+    start_import_workers()
+    if redis_client:
+        redis_client.rpush("import_jobs:queue", job_id)
+    else:
+        import_queue.put(job_id)
+    return job_id
+
+
+def run_import_job(job_id):
+    job = load_job(job_id)
+    if not job:
+        return
+    job["status"] = "running"
+    job["started_at"] = time.time()
+    save_job(job)
+
+    def on_progress(rows, fraction):
+        job["rows_processed"] = rows
+        if fraction is not None:
+            job["progress"] = round(fraction, 4)
+        save_job(job, progress=True)
+
+    collector = RequestMetrics("import_job")
+    try:
+        with collecting(collector):
+            tables_created, ingest_stats = import_file(
+                job["filepath"],
+                job["filename"],
+                on_progress,
+                job.get("mode", "append"),
+                job.get("key"),
+            )
+        job["status"] = "completed" if tables_created else "failed"
+        job["tables"] = tables_created
+        job["stats"] = ingest_stats
+        job["progress"] = 1.0
+        if not tables_created:
+            job["error"] = "No data found in file"
+    except Exception as e:
+        db.session.rollback()
+        job["status"] = "failed"
+        job["error"] = str(e)
+    finally:
+        if os.path.exists(job["filepath"]):
+            os.remove(job["filepath"])
+        metrics.add(collector.series())
+    job["finished_at"] = time.time()
+    save_job(job)
+
+
+def import_worker():
+    while True:
+        if redis_client:
+            try:
+                item = redis_client.blpop("import_jobs:queue", timeout=5)
+            except Exception as e:
+                app.logger.warning("Import queue unavailable: %s", e)
+                time.sleep(5)
+                continue
+            if not item:
+                continue
+            job_id = item[1]
+        else:
+            job_id = import_queue.get()
+        with app.app_context():
+            try:
+                run_import_job(job_id)
+            except Exception:
+                app.logger.exception("Import job %s crashed", job_id)
+            finally:
+                db.session.remove()
+
+
+def start_import_workers():
+    global import_workers_started
+    with import_jobs_lock:
+        if import_workers_started:
+            return
+        import_workers_started = True
+    for index in range(app.config["IMPORT_WORKERS"]):
+        threading.Thread(
+            target=import_worker, name=f"import-worker-{index}", daemon=True
+        ).start()
 
 
 @app.route("/api/upload", methods=["POST"])
@@ -170,44 +3068,127 @@ def upload_file():
     file = request.files["file"]
     if file.filename == "":
         return jsonify({"error": "No file selected"}), 400
+    mode = request.args.get("mode", "append")
+    key = [col.strip() for col in request.args.get("key", "").split(",") if col.strip()]
+    if mode not in IMPORT_MODES:
+        return jsonify({"error": f"Invalid mode. Use {', '.join(IMPORT_MODES)}"}), 400
+    if mode == "upsert" and not key:
+        return jsonify({"error": "mode=upsert needs key=col1,col2"}), 400
     if file and file.filename.endswith((".xlsx", ".xls", ".csv")):
         filename = secure_filename(file.filename)
+        if request.args.get("async") in ("1", "true"):
+            filepath = os.path.join(
+                app.config["UPLOAD_FOLDER"], f"{uuid.uuid4().hex}_{filename}"
+            )
+            with stage("save"):
+                file.save(filepath)
+            job_id = enqueue_import_job(filepath, filename, mode, key)
+            return (
+                jsonify(
+                    {
+                        "message": "Import job queued",
+                        "job_id": job_id,
+                        "status_url": f"/api/jobs/{job_id}",
+                    }
+                ),
+                202,
+            )
         filepath = os.path.join(app.config["UPLOAD_FOLDER"], filename)
-        file.save(filepath)
+        with stage("save"):
+            file.save(filepath)
         try:
-            if filename.endswith(".csv"):
-                df = pd.read_csv(filepath)
-            else:
-                excel_file = pd.ExcelFile(filepath)
-                tables_created = []
-                for sheet_name in excel_file.sheet_names:
-                    df = pd.read_excel(filepath, sheet_name=sheet_name)
-                    if not df.empty:
-                        table_name = (
-                            f"{filename.rsplit('.', 1)[0]}_{sheet_name}".replace(
-                                " ", "_"
-                            )
-                        )
-                        created_table = create_or_update_table(df, table_name)
-                        tables_created.append(created_table)
-                os.remove(filepath)
-                return jsonify(
-                    {"message": "File uploaded successfully", "tables": tables_created}
-                )
-            if not df.empty:
-                table_name = filename.rsplit(".", 1)[0].replace(" ", "_")
-                created_table = create_or_update_table(df, table_name)
-                os.remove(filepath)
-                return jsonify(
-                    {"message": "File uploaded successfully", "tables": [created_table]}
-                )
+            tables_created, ingest_stats = import_file(
+                filepath, filename, mode=mode, key=key
+            )
+        except ValueError as e:
+            db.session.rollback()
+            return jsonify({"error": str(e)}), 400
         except Exception as e:
+            db.session.rollback()
+            return jsonify({"error": str(e)}), 500
+        finally:
             if os.path.exists(filepath):
                 os.remove(filepath)
-            return jsonify({"error": str(e)}), 500
+        if not tables_created:
+            return jsonify({"error": "No data found in file"}), 400
+        return jsonify(
+            {
+                "message": "File uploaded successfully",
+                "tables": tables_created,
+                "stats": ingest_stats,
+            }
+        )
     return jsonify({"error": "Invalid file format"}), 400
 
 
+@app.route("/api/jobs/<job_id>", methods=["GET"])
+def get_job(job_id):
+    job = load_job(job_id)
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+    job.pop("filepath", None)
+    now = job["finished_at"] or time.time()
+    elapsed = now - job["started_at"] if job["started_at"] else 0.0
+    rows_per_sec = job["rows_processed"] / elapsed if elapsed > 0 else 0.0
+    eta = None
+    if job["status"] == "running" and 0 < job["progress"] < 1:
+        eta = round(elapsed * (1 - job["progress"]) / job["progress"], 1)
+    elif job["status"] == "completed":
+        eta = 0.0
+    job.update(
+        {
+            "elapsed_seconds": round(elapsed, 3),
+            "rows_per_sec": round(rows_per_sec),
+            "eta_seconds": eta,
+        }
+    )
+    return jsonify(job)
+
+
+def encode_cursor(key):
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+
+def decode_cursor(cursor, shape):
+    """Decode a cursor whose elements must have the types listed in *shape*."""
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if (
+        not isinstance(key, list)
+        or len(key) != len(shape)
+        or not all(
+            isinstance(value, types) and not isinstance(value, bool)
+            for value, types in zip(key, shape)
+        )
+    ):
+        raise ValueError("Invalid cursor")
+    return key
+
+
+def load_hit_rows(hits, tables):
+    rows = {}
+    legacy_ids = [
+        record_id
+        for table_id, record_id, _ in hits
+        if table_id in tables and tables[table_id].storage != "typed"
+    ]
+    if legacy_ids:
+        for record in DataRecord.query.filter(DataRecord.id.in_(legacy_ids)):
+            rows[(record.table_id, record.id)] = json.loads(record.data)
+    for table_id, table in tables.items():
+        if table.storage != "typed":
+            continue
+        record_ids = [
+            record_id for hit_table, record_id, _ in hits if hit_table == table_id
+        ]
+        if record_ids:
+            for row in get_storage(table).get_rows(record_ids):
+                rows[(table_id, row["id"])] = row["data"]
+    return rows
+
+
 @app.route("/api/search", methods=["GET"])
 def search():
     query = request.args.get("q", "")
@@ -218,21 +3199,122 @@ def search():
         limit = 1000
 
     if not query:
-        return jsonify({"results": []})
+        return jsonify({"results": [], "counts": {}, "total": 0, "next_cursor": None})
+    cursor = request.args.get("cursor")
+    try:
+        after = decode_cursor(cursor, search_index.cursor_shape) if cursor else None
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    with stage("cache"):
+        cache_key = request_cache_key(catalog_fingerprint())
+        result = cache.lookup("search", cache_key)
+    if result is not None:
+        count_rows(len(result["results"]))
+        return jsonify(result)
+    with stage("query"):
+        hits, counts = search_index.search_all(query, limit, after)
+        table_ids = {table_id for table_id, _, _ in hits} | set(counts)
+        tables = {
+            table.id: table
+            for table in DynamicTable.query.filter(DynamicTable.id.in_(table_ids))
+        }
+    with stage("load"):
+        rows = load_hit_rows(hits, tables)
     results = []
-    tables = DynamicTable.query.all()
-    for table in tables:
-        records = (
-            DataRecord.query.filter(
-                DataRecord.table_name == table.table_name,
-                DataRecord.data.contains(query),
+    for table_id, record_id, _ in hits:
+        if (table_id, record_id) in rows:
+            results.append(
+                {
+                    "table": tables[table_id].table_name,
+                    "id": record_id,
+                    "data": rows[(table_id, record_id)],
+                }
             )
-            .limit(limit)
-            .all()
+    counts = {
+        tables[table_id].table_name: count
+        for table_id, count in counts.items()
+        if table_id in tables and count
+    }
+    next_cursor = encode_cursor(hits[-1][2]) if len(hits) == limit else None
+    result = {
+        "results": results,
+        "counts": counts,
+        "total": sum(counts.values()),
+        "next_cursor": next_cursor,
+    }
+    with stage("cache"):
+        cache.set(f"search:{cache_key}", result, app.config["RESPONSE_CACHE_TTL"])
+    count_rows(len(results))
+    with stage("serialize"):
+        return jsonify(result)
+
+
+def stream_csv(columns, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow([row.get(column) for column in columns])
+        if buffer.tell() >= EXPORT_CHUNK_BYTES:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def stream_ndjson(columns, rows):
+    lines = []
+    size = 0
+    for row in rows:
+        line = json.dumps(
+            {column: row.get(column) for column in columns},
+            ensure_ascii=False,
+            default=json_default,
         )
-        for record in records:
-            results.append({"table": table.table_name, "data": json.loads(record.data)})
-    return jsonify({"results": results})
+        lines.append(line)
+        size += len(line)
+        if size >= EXPORT_CHUNK_BYTES:
+            yield "\n".join(lines) + "\n"
+            lines = []
+            size = 0
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+def stream_xlsx(columns, rows):
+    # XLSX is a zip archive, so the workbook is written to a private temp file
+    # in write-only mode and streamed back once it is complete.
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet()
+    worksheet.append(columns)
+    for row in rows:
+        worksheet.append([row.get(column) for column in columns])
+    handle, output_path = tempfile.mkstemp(
+        suffix=".xlsx", dir=app.config["UPLOAD_FOLDER"]
+    )
+    os.close(handle)
+    try:
+        workbook.save(output_path)
+        with open(output_path, "rb") as f:
+            while True:
+                chunk = f.read(EXPORT_CHUNK_BYTES)
+                if not chunk:
+                    break
+                yield chunk
+    finally:
+        os.remove(output_path)
+
+
+EXPORT_FORMATS = {
+    "csv": (stream_csv, "text/csv; charset=utf-8"),
+    "ndjson": (stream_ndjson, "application/x-ndjson; charset=utf-8"),
+    "xlsx": (
+        stream_xlsx,
+        "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    ),
+}
 
 
 @app.route("/api/export/<table_name>", methods=["GET"])
@@ -240,27 +3322,30 @@ def export_table(table_name):
     table = DynamicTable.query.filter_by(table_name=table_name).first()
     if not table:
         return jsonify({"error": "Table not found"}), 404
-    
+
     # Get format parameter (default to xlsx)
     format_type = request.args.get("format", "xlsx").lower()
-    if format_type not in ["xlsx", "csv"]:
-        return jsonify({"error": "Invalid format. Use 'xlsx' or 'csv'"}), 400
-    
-    records = DataRecord.query.filter_by(table_name=table_name).all()
-    data = [json.loads(record.data) for record in records]
-    df = pd.DataFrame(data)
-    
-    if format_type == "csv":
-        output_path = os.path.join(app.config["UPLOAD_FOLDER"], f"{table_name}_export.csv")
-        df.to_csv(output_path, index=False, encoding='utf-8')
-        download_name = f"{table_name}.csv"
-    else:  # xlsx
-        output_path = os.path.join(app.config["UPLOAD_FOLDER"], f"{table_name}_export.xlsx")
-        df.to_excel(output_path, index=False)
-        download_name = f"{table_name}.xlsx"
-    
-    return send_file(
-        output_path, as_attachment=True, download_name=download_name
+    if format_type not in EXPORT_FORMATS:
+        return jsonify({"error": "Invalid format. Use 'xlsx', 'csv' or 'ndjson'"}), 400
+
+    columns = json.loads(table.columns)
+    storage = get_storage(table)
+
+    def export_rows():
+        exported = 0
+        for _, row in storage.iter_rows(app.config["EXPORT_BATCH_SIZE"]):
+            exported += 1
+            yield row
+        count_rows(exported)
+
+    writer, mimetype = EXPORT_FORMATS[format_type]
+    download_name = quote(f"{table_name}.{format_type}")
+    return Response(
+        stream_with_context(timed_chunks(writer(columns, export_rows()), "stream")),
+        mimetype=mimetype,
+        headers={
+            "Content-Disposition": f"attachment; filename*=UTF-8''{download_name}"
+        },
     )
 
 
@@ -269,12 +3354,114 @@ def delete_table(table_name):
     table = DynamicTable.query.filter_by(table_name=table_name).first()
     if not table:
         return jsonify({"error": "Table not found"}), 404
-    DataRecord.query.filter_by(table_name=table_name).delete()
-    db.session.delete(table)
+    drop_table(table)
     db.session.commit()
     return jsonify({"message": "Table deleted successfully"})
 
 
+def json_frame(rows, columns):
+    import pandas as pd
+
+    return pd.DataFrame.from_records(rows, columns=columns)
+
+
+def migrate_table_to_typed(table, batch_size):
+    legacy = get_storage(table)
+    columns = json.loads(table.columns)
+    sample = [json.loads(record.data) for record in legacy.records().limit(batch_size)]
+    sample_df = json_frame(sample, columns)
+    table.column_types = json.dumps(
+        [infer_column_type(sample_df[col]) for col in columns]
+    )
+    table.storage = "typed"
+    typed = get_storage(table)
+    typed.create()
+    ids = []
+    rows = []
+    migrated = 0
+    for row_id, data in legacy.iter_rows(batch_size):
+        ids.append(row_id)
+        rows.append(data)
+        if len(rows) >= batch_size:
+            migrated += typed.insert(json_frame(rows, columns), ids=ids)
+            ids, rows = [], []
+    if rows:
+        migrated += typed.insert(json_frame(rows, columns), ids=ids)
+    legacy.drop()
+    search_index.remove_table(table)
+    search_index.index_rows(table, typed)
+    table.row_count = migrated
+    bump_generation(table)
+    db.session.commit()
+    return migrated
+
+
+@app.cli.command("migrate-storage")
+@click.option("--table", "table_names", multiple=True, help="Only migrate these tables")
+@click.option("--batch-size", default=5000, show_default=True)
+def migrate_storage_command(table_names, batch_size):
+    """Convert legacy data_records tables into typed per-table storage."""
+    query = DynamicTable.query.filter_by(storage="legacy")
+    if table_names:
+        query = query.filter(DynamicTable.table_name.in_(table_names))
+    for table in query.all():
+        started = time.perf_counter()
+        try:
+            migrated = migrate_table_to_typed(table, batch_size)
+        except Exception as e:
+            db.session.rollback()
+            click.echo(f"Could not migrate {table.table_name}: {e}")
+            continue
+        click.echo(
+            f"Migrated {table.table_name}: {migrated} rows "
+            f"in {time.perf_counter() - started:.2f}s"
+        )
+
+
+@app.cli.command("rebuild-search-index")
+@click.option("--table", "table_names", multiple=True, help="Only rebuild these tables")
+def rebuild_search_index_command(table_names):
+    """Rebuild the full-text search index from the stored rows."""
+    if not search_index.enabled:
+        click.echo("Full-text search is not enabled for this database.")
+        return
+    query = DynamicTable.query
+    if table_names:
+        query = query.filter(DynamicTable.table_name.in_(table_names))
+    for table in query.all():
+        started = time.perf_counter()
+        table.search_indexed = False
+        db.session.commit()
+        search_index.build_table(table)
+        click.echo(
+            f"Indexed {table.table_name} in {time.perf_counter() - started:.2f}s"
+        )
+
+
+@app.cli.command("index-column")
+@click.option("--table", "table_name", required=True)
+@click.option("--column", "columns", multiple=True, required=True)
+@click.option("--drop", is_flag=True, help="Drop the indexes instead")
+def index_column_command(table_name, columns, drop):
+    """Index columns that are often used in filter= or sort= queries."""
+    table = DynamicTable.query.filter_by(table_name=table_name).first()
+    if not table:
+        raise click.ClickException(f"Table not found: {table_name}")
+    storage = get_storage(table)
+    for column in columns:
+        try:
+            name, target = storage.index_ddl(check_column(column, storage.columns))
+        except ValueError as e:
+            raise click.ClickException(str(e))
+        if drop:
+            sql = f"DROP INDEX IF EXISTS {name}"
+        else:
+            sql = f"CREATE INDEX IF NOT EXISTS {name} ON {target}"
+        db.session.execute(db.text(sql))
+        db.session.commit()
+        click.echo(f"{'Dropped' if drop else 'Created'} index {name} on {column}")
+
+
 def create_sample_data():
     if not DynamicTable.query.first():
         sample_table = DynamicTable(
@@ -282,6 +3469,7 @@ def create_sample_data():
             columns=json.dumps(["name", "url", "info", "note"]),
         )
         db.session.add(sample_table)
+        db.session.flush()
         sample_data = [
             {
                 "name": "BYS",
@@ -304,11 +3492,15 @@ def create_sample_data():
         ]
         for data in sample_data:
             record = DataRecord(
-                table_name="sample_data", data=json.dumps(data, ensure_ascii=False)
+                table_id=sample_table.id, data=json.dumps(data, ensure_ascii=False)
             )
             db.session.add(record)
+        sample_table.row_count = len(sample_data)
+        db.session.flush()
+        search_index.index_rows(sample_table, get_storage(sample_table))
         db.session.commit()
 
+
 @app.route("/api/rename_table", methods=["POST"])
 def rename_table():
     data = request.get_json()
@@ -321,10 +3513,9 @@ def rename_table():
         return jsonify({"error": "Table not found."}), 404
     if DynamicTable.query.filter_by(table_name=new_name).first():
         return jsonify({"error": "A table with the new name already exists."}), 400
-    # Update table name in DynamicTable
+    get_storage(table).rename(new_name)
     table.table_name = new_name
-    # Update all DataRecord entries
-    DataRecord.query.filter_by(table_name=old_name).update({"table_name": new_name})
+    bump_generation(table)
     db.session.commit()
     return jsonify({"message": "Table renamed successfully."})
 
@@ -337,13 +3528,118 @@ def update_row():
     new_data = data.get("data")
     if not row_id or not table_name or not new_data:
         return jsonify({"error": "id, table_name, and data are required."}), 400
-    record = DataRecord.query.filter_by(id=row_id, table_name=table_name).first()
-    if not record:
+    table = DynamicTable.query.filter_by(table_name=table_name).first()
+    storage = get_storage(table) if table else None
+    try:
+        found = storage is not None and storage.update_row(row_id, new_data)
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 400
+    if not found:
         return jsonify({"error": "Row not found."}), 404
-    record.data = json.dumps(new_data, ensure_ascii=False)
+    search_index.reindex_row(table, storage, row_id)
+    refresh_row_hashes(table, storage, [row_id])
+    bump_generation(table)
     db.session.commit()
     return jsonify({"message": "Row updated successfully."})
 
+
+def validate_batch(payload, columns):
+    inserts = payload.get("insert") or []
+    updates = payload.get("update") or []
+    deletes = payload.get("delete") or []
+    if not all(isinstance(ops, list) for ops in (inserts, updates, deletes)):
+        return "insert, update and delete must be lists"
+    if not all(isinstance(row, dict) for row in inserts):
+        return "Each insert must be an object of column values"
+    for change in updates:
+        if (
+            not isinstance(change, dict)
+            or not isinstance(change.get("id"), int)
+            or not isinstance(change.get("data"), dict)
+        ):
+            return "Each update must have an integer id and a data object"
+    if not all(isinstance(row_id, int) for row_id in deletes):
+        return "delete must be a list of integer ids"
+    unknown = {
+        column
+        for row in inserts + [change["data"] for change in updates]
+        for column in row
+        if column not in columns
+    }
+    if unknown:
+        return f"Unknown columns: {', '.join(sorted(unknown))}"
+    return None
+
+
+@app.route("/api/tables/<table_name>/rows:batch", methods=["POST"])
+def batch_rows(table_name):
+    table = DynamicTable.query.filter_by(table_name=table_name).first()
+    if not table:
+        return jsonify({"error": "Table not found"}), 404
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return jsonify({"error": "A JSON object is required"}), 400
+    columns = json.loads(table.columns)
+    error = validate_batch(payload, columns)
+    if error:
+        return jsonify({"error": error}), 400
+
+    storage = get_storage(table)
+    results = {"insert": [], "update": [], "delete": []}
+    try:
+        for index, data in enumerate(payload.get("insert") or []):
+            row = {column: data.get(column) for column in columns}
+            try:
+                row_id = storage.insert_row(row)
+            except ValueError as e:
+                raise ValueError(f"insert {index}: {e}")
+            search_index.reindex_row(table, storage, row_id)
+            refresh_row_hashes(table, storage, [row_id])
+            results["insert"].append(
+                {"index": index, "id": row_id, "status": "inserted"}
+            )
+        for change in payload.get("update") or []:
+            try:
+                found = storage.patch_row(change["id"], change["data"])
+            except ValueError as e:
+                raise ValueError(f"update {change['id']}: {e}")
+            if found:
+                search_index.reindex_row(table, storage, change["id"])
+                refresh_row_hashes(table, storage, [change["id"]])
+            results["update"].append(
+                {"id": change["id"], "status": "updated" if found else "not_found"}
+            )
+        deletes = payload.get("delete") or []
+        deleted = storage.delete_rows(deletes) if deletes else set()
+        if deleted:
+            search_index.remove_rows(table, deleted)
+            remove_row_hashes(table, deleted)
+        results["delete"] = [
+            {"id": row_id, "status": "deleted" if row_id in deleted else "not_found"}
+            for row_id in deletes
+        ]
+        adjust_row_count(table, len(results["insert"]) - len(deleted))
+        bump_generation(table)
+        db.session.commit()
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 400
+    except Exception:
+        db.session.rollback()
+        app.logger.exception("Batch on %s failed", table_name)
+        return jsonify({"error": "Batch failed; no rows were changed"}), 500
+    return jsonify(
+        {
+            "table_name": table_name,
+            "inserted": len(results["insert"]),
+            "updated": sum(r["status"] == "updated" for r in results["update"]),
+            "deleted": len(deleted),
+            "results": results,
+        }
+    )
+
+
 if __name__ == "__main__":
     with app.app_context():
         create_sample_data()
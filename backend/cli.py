@@ -1,19 +1,105 @@
 #!/usr/bin/env python3
 import click
+import csv
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
-from tabulate import tabulate
 from colorama import init, Fore, Style
 import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
 init()
 
-API_URL = os.environ.get("CLI_API_URL", "http://localhost:5000/api")
+API_URL = os.environ.get("CLI_API_URL") or "http://localhost:5000/api"
+CONNECT_TIMEOUT = float(os.environ.get("CLI_CONNECT_TIMEOUT") or 5)
+READ_TIMEOUT = float(os.environ.get("CLI_READ_TIMEOUT") or 60)
+MAX_RETRIES = int(os.environ.get("CLI_MAX_RETRIES") or 3)
+RETRY_BACKOFF = float(os.environ.get("CLI_RETRY_BACKOFF") or 0.5)
+POOL_SIZE = int(os.environ.get("CLI_POOL_SIZE") or 10)
+PAGE_CACHE_SIZE = int(os.environ.get("CLI_PAGE_CACHE_SIZE") or 50)
+PAGE_CACHE_TTL = float(os.environ.get("CLI_PAGE_CACHE_TTL") or 300)
+
+
+class APISession(requests.Session):
+    """Keep-alive session that applies the CLI's default timeouts."""
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", (CONNECT_TIMEOUT, READ_TIMEOUT))
+        return super().request(method, url, **kwargs)
+
+
+def create_session():
+    # Only idempotent requests are retried; an upload is never sent twice.
+    retry = Retry(
+        total=MAX_RETRIES,
+        backoff_factor=RETRY_BACKOFF,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=frozenset(["GET", "HEAD", "DELETE"]),
+    )
+    adapter = HTTPAdapter(
+        pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, max_retries=retry
+    )
+    session = APISession()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+session = create_session()
+
+
+class PageCache:
+    """LRU cache of API responses for the interactive session."""
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (value, time.monotonic() + self.ttl)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, table_name=None):
+        """Drop one table's pages and all search results, or everything."""
+        with self.lock:
+            for key in list(self.entries):
+                if table_name is None or key[0] == "search" or key[1] == table_name:
+                    del self.entries[key]
 
 
 class DatabaseCLI:
-    def __init__(self):
+    def __init__(self, session=session):
+        self.session = session
         self.current_table = None
+        self.current_page = 1
+        self.current_search = ""
+        self.next_cursor = None
+        self.prev_cursor = None
+        self.interactive = False
+        self.page_cache = PageCache(PAGE_CACHE_SIZE, PAGE_CACHE_TTL)
+        self.prefetches = {}
+        self.prefetcher = None
 
     def print_success(self, message):
         print(f"{Fore.GREEN}{message}{Style.RESET_ALL}")
@@ -30,8 +116,10 @@ class DatabaseCLI:
         print(f"{Fore.YELLOW}{'='*60}{Style.RESET_ALL}\n")
 
     def list_tables(self):
+        from tabulate import tabulate
+
         try:
-            response = requests.get(f"{API_URL}/tables")
+            response = self.session.get(f"{API_URL}/tables")
             tables = response.json()
 
             if not tables:
@@ -62,20 +150,65 @@ class DatabaseCLI:
         except Exception as e:
             self.print_error(f"Could not load tables: {str(e)}")
 
-    def show_table(self, table_name, page=1, search=""):
-        try:
-            params = {"page": page, "per_page": 20}
-            if search:
-                params["search"] = search
+    def request_page(self, table_name, page, search="", cursor=None):
+        params = {"page": page, "per_page": 20}
+        if search:
+            params["search"] = search
+        else:
+            params["count"] = "estimate"
+        if cursor:
+            params["cursor"] = cursor
+
+        response = self.session.get(f"{API_URL}/tables/{table_name}", params=params)
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return response.json()
+
+    def fetch_page(self, table_name, page, search="", cursor=None):
+        if not self.interactive:
+            return self.request_page(table_name, page, search, cursor)
+        key = ("page", table_name, search, page)
+        data = self.page_cache.get(key)
+        if data is not None:
+            return data
+        prefetch = self.prefetches.pop(key, None)
+        if prefetch is not None:
+            try:
+                data = prefetch.result()
+            except Exception:
+                data = None
+        if data is None:
+            data = self.request_page(table_name, page, search, cursor)
+        if data is not None:
+            self.page_cache.set(key, data)
+        return data
+
+    def prefetch_page(self, table_name, page, search, cursor):
+        # Fetch the next page in the background while the user reads this one.
+        key = ("page", table_name, search, page)
+        if key in self.prefetches or self.page_cache.get(key) is not None:
+            return
+        if self.prefetcher is None:
+            self.prefetcher = ThreadPoolExecutor(max_workers=1)
+        self.prefetches[key] = self.prefetcher.submit(
+            self.request_page, table_name, page, search, cursor
+        )
+
+    def invalidate_cache(self, table_name=None):
+        self.page_cache.invalidate(table_name)
+        self.prefetches.clear()
+
+    def show_table(self, table_name, page=1, search="", cursor=None):
+        from tabulate import tabulate
 
-            response = requests.get(f"{API_URL}/tables/{table_name}", params=params)
+        try:
+            data = self.fetch_page(table_name, page, search, cursor)
 
-            if response.status_code == 404:
+            if data is None:
                 self.print_error(f"Table '{table_name}' not found.")
                 return
 
-            data = response.json()
-
             if not data["records"]:
                 self.print_info("No data found in this table.")
                 return
@@ -97,18 +230,45 @@ class DatabaseCLI:
             )
 
             print(
-                f"\n{Fore.CYAN}Page {data['current_page']}/{data['pages']} - Total {data['total']} records{Style.RESET_ALL}"
+                f"\n{Fore.CYAN}Page {page}/{data['pages']} - Total {data['total']} records{Style.RESET_ALL}"
             )
+            if data.get("next_cursor") and not self.interactive:
+                print(
+                    f"{Fore.CYAN}Next page: --cursor {data['next_cursor']}"
+                    f"{Style.RESET_ALL}"
+                )
 
             self.current_table = table_name
+            self.current_page = page
+            self.current_search = search
+            self.next_cursor = data.get("next_cursor")
+            self.prev_cursor = data.get("prev_cursor")
+            if self.interactive and self.next_cursor:
+                self.prefetch_page(table_name, page + 1, search, self.next_cursor)
 
         except Exception as e:
             self.print_error(f"Could not show table: {str(e)}")
 
-    def search_all(self, query):
+    def show_page(self, page):
+        cursor = None
+        if page == self.current_page + 1:
+            cursor = self.next_cursor
+        elif page == self.current_page - 1 and page > 1:
+            cursor = self.prev_cursor
+        self.show_table(self.current_table, page, self.current_search, cursor)
+
+    def search_all(self, query, limit=100):
         try:
-            response = requests.get(f"{API_URL}/search", params={"q": query})
-            results = response.json()["results"]
+            key = ("search", query, limit)
+            data = self.page_cache.get(key) if self.interactive else None
+            if data is None:
+                response = self.session.get(
+                    f"{API_URL}/search", params={"q": query, "limit": limit}
+                )
+                data = response.json()
+                if self.interactive and response.ok:
+                    self.page_cache.set(key, data)
+            results = data["results"]
 
             if not results:
                 self.print_info(f"No results found for '{query}'.")
@@ -122,10 +282,31 @@ class DatabaseCLI:
                     print(f"  {Fore.CYAN}{key}:{Style.RESET_ALL} {value}")
                 print()
 
+            counts = ", ".join(
+                f"{table}: {count}" for table, count in data.get("counts", {}).items()
+            )
+            print(
+                f"{Fore.CYAN}Showing {len(results)} of {data.get('total', len(results))} "
+                f"matches ({counts}){Style.RESET_ALL}"
+            )
+
         except Exception as e:
             self.print_error(f"Search failed: {str(e)}")
 
-    def upload_file(self, filepath):
+    def print_import_stats(self, stats):
+        for table in stats or []:
+            if table.get("mode", "append") != "append":
+                self.print_info(
+                    f"  {table['table']}: {table['inserted']} inserted, "
+                    f"{table['updated']} updated, {table['unchanged']} unchanged"
+                    + (
+                        f", {table['skipped']} skipped (blank key)"
+                        if table.get("skipped")
+                        else ""
+                    )
+                )
+
+    def upload_file(self, filepath, wait=False, mode="append", key=None):
         try:
             if not os.path.exists(filepath):
                 self.print_error(f"File not found: {filepath}")
@@ -133,13 +314,36 @@ class DatabaseCLI:
 
             with open(filepath, "rb") as f:
                 files = {"file": f}
-                response = requests.post(f"{API_URL}/upload", files=files)
-
-            if response.status_code == 200:
+                params = {"mode": mode}
+                if key:
+                    params["key"] = key
+                if wait:
+                    params["async"] = 1
+                # A synchronous import can take minutes before the response.
+                response = self.session.post(
+                    f"{API_URL}/upload",
+                    files=files,
+                    params=params,
+                    timeout=(CONNECT_TIMEOUT, READ_TIMEOUT if wait else None),
+                )
+            self.invalidate_cache()
+
+            if response.status_code == 202:
+                job = self.wait_for_job(response.json()["job_id"])
+                if job.get("status") == "completed":
+                    self.print_success(
+                        f"File uploaded! Created tables: {', '.join(job['tables'])} "
+                        f"({job['rows_processed']} rows, {job['rows_per_sec']} rows/s)"
+                    )
+                    self.print_import_stats(job.get("stats"))
+                else:
+                    self.print_error(f"Upload error: {job.get('error')}")
+            elif response.status_code == 200:
                 data = response.json()
                 self.print_success(
                     f"File uploaded! Created tables: {', '.join(data['tables'])}"
                 )
+                self.print_import_stats(data.get("stats"))
             else:
                 error = response.json().get("error", "Unknown error")
                 self.print_error(f"Upload error: {error}")
@@ -147,6 +351,31 @@ class DatabaseCLI:
         except Exception as e:
             self.print_error(f"Could not upload file: {str(e)}")
 
+    def wait_for_job(self, job_id):
+        def describe(job):
+            if not job:
+                return None
+            eta = job.get("eta_seconds")
+            eta = f"{eta:.0f}s" if eta is not None else "?"
+            return f"{job['rows_processed']} rows, {job['rows_per_sec']} rows/s, ETA {eta}"
+
+        shown = 0
+        with click.progressbar(
+            length=100, label="Importing", show_eta=False, item_show_func=describe
+        ) as bar:
+            while True:
+                response = self.session.get(f"{API_URL}/jobs/{job_id}")
+                if response.status_code != 200:
+                    error = response.json().get("error", "Unknown error")
+                    return {"status": "failed", "error": error}
+                job = response.json()
+                percent = int(job.get("progress", 0) * 100)
+                bar.update(max(percent - shown, 0), current_item=job)
+                shown = max(percent, shown)
+                if job.get("status") not in ("queued", "running"):
+                    return job
+                time.sleep(0.5)
+
     def delete_table(self, table_name):
         try:
             confirm = click.confirm(
@@ -155,9 +384,10 @@ class DatabaseCLI:
             if not confirm:
                 return
 
-            response = requests.delete(f"{API_URL}/delete/{table_name}")
+            response = self.session.delete(f"{API_URL}/delete/{table_name}")
 
             if response.status_code == 200:
+                self.invalidate_cache(table_name)
                 self.print_success(f"Table '{table_name}' deleted.")
             else:
                 self.print_error("Could not delete table.")
@@ -165,15 +395,126 @@ class DatabaseCLI:
         except Exception as e:
             self.print_error(f"Delete error: {str(e)}")
 
+    def aggregate(self, table_name, group_by=(), metrics=None, filters=(), sort=None):
+        from tabulate import tabulate
+
+        try:
+            params = {"group_by": ",".join(group_by), "filter": list(filters)}
+            for function, columns in (metrics or {}).items():
+                if columns:
+                    params[function] = ",".join(columns)
+            if sort:
+                params["sort"] = sort
+            response = self.session.get(
+                f"{API_URL}/tables/{table_name}/aggregate", params=params
+            )
+            data = response.json()
+            if response.status_code != 200:
+                self.print_error(data.get("error", "Could not aggregate table."))
+                return
+
+            headers = list(data["group_by"]) + ["count"]
+            for function, columns in (metrics or {}).items():
+                headers += [f"{function}({column})" for column in columns]
+            rows = []
+            for group in data["groups"]:
+                row = [group["group"].get(column) for column in data["group_by"]]
+                row.append(group["count"])
+                for function, columns in (metrics or {}).items():
+                    row += [group[function].get(column) for column in columns]
+                rows.append(row)
+
+            self.print_table_header(f"{table_name.upper()} SUMMARY")
+            print(tabulate(rows, headers=headers, tablefmt="fancy_grid"))
+            self.print_info(f"{len(rows)} group(s) in {data['seconds']}s")
+
+        except Exception as e:
+            self.print_error(f"Aggregate error: {str(e)}")
+
+    def read_diff(self, filepath):
+        """Yield (op, row_id, data) tuples from a CSV or NDJSON diff file.
+
+        NDJSON lines look like {"op": "update", "id": 3, "data": {...}}. CSV
+        files have _op and _id columns next to the data columns; empty cells
+        are left unchanged by updates and stored as empty by inserts.
+        """
+        with open(filepath, newline="", encoding="utf-8") as f:
+            if filepath.endswith(".csv"):
+                for row in csv.DictReader(f):
+                    op = (row.pop("_op", "") or "").strip().lower()
+                    row_id = (row.pop("_id", "") or "").strip()
+                    data = {
+                        key: value
+                        for key, value in row.items()
+                        if op == "insert" or value != ""
+                    }
+                    yield op, int(row_id) if row_id else None, data
+            else:
+                for line in f:
+                    if line.strip():
+                        change = json.loads(line)
+                        yield change.get("op"), change.get("id"), change.get("data")
+
+    def apply_diff(self, table_name, filepath, batch_size=1000):
+        totals = {"inserted": 0, "updated": 0, "deleted": 0}
+        missing = []
+
+        def send(batch):
+            response = self.session.post(
+                f"{API_URL}/tables/{table_name}/rows:batch", json=batch
+            )
+            data = response.json()
+            if response.status_code != 200:
+                raise RuntimeError(data.get("error", "Unknown error"))
+            for key in totals:
+                totals[key] += data[key]
+            for op in ("update", "delete"):
+                missing.extend(
+                    (op, result["id"])
+                    for result in data["results"][op]
+                    if result["status"] == "not_found"
+                )
+
+        try:
+            batch = {"insert": [], "update": [], "delete": []}
+            pending = 0
+            for line, (op, row_id, data) in enumerate(self.read_diff(filepath), 1):
+                if op == "insert":
+                    batch["insert"].append(data or {})
+                elif op == "update" and row_id is not None:
+                    batch["update"].append({"id": row_id, "data": data or {}})
+                elif op == "delete" and row_id is not None:
+                    batch["delete"].append(row_id)
+                else:
+                    raise ValueError(f"Invalid change on line {line}")
+                pending += 1
+                if pending >= batch_size:
+                    send(batch)
+                    batch = {"insert": [], "update": [], "delete": []}
+                    pending = 0
+            if pending:
+                send(batch)
+        except Exception as e:
+            self.print_error(f"Could not apply changes: {str(e)}")
+        finally:
+            self.invalidate_cache(table_name)
+        if any(totals.values()) or missing:
+            self.print_success(
+                f"Applied to '{table_name}': {totals['inserted']} inserted, "
+                f"{totals['updated']} updated, {totals['deleted']} deleted."
+            )
+        for op, row_id in missing:
+            self.print_info(f"Row {row_id} not found ({op} skipped).")
+
     # Added error handling for API requests
     def safe_api_request(self, url, method="GET", data=None, params=None, files=None):
         try:
             if method == "GET":
-                response = requests.get(url, params=params)
+                response = self.session.get(url, params=params)
             elif method == "POST":
-                response = requests.post(url, json=data, files=files)
+                response = self.session.post(url, json=data, files=files)
             elif method == "DELETE":
-                response = requests.delete(url)
+                response = self.session.delete(url)
             else:
                 raise ValueError("Unsupported HTTP method")
             response.raise_for_status()
@@ -203,20 +544,33 @@ main.add_command(tables, "list-tables")
 @click.argument("table_name")
 @click.option("--page", "-p", default=1, help="Page number")
 @click.option("--search", "-s", default="", help="Search term")
-def show(table_name, page, search):
-    cli.show_table(table_name, page, search)
+@click.option("--cursor", "-c", default=None, help="Continue from a page cursor")
+def show(table_name, page, search, cursor):
+    cli.show_table(table_name, page, search, cursor)
 
 
 @main.command("search")
 @click.argument("query")
-def search(query):
-    cli.search_all(query)
+@click.option("--limit", "-l", default=100, help="Maximum number of results")
+def search(query, limit):
+    cli.search_all(query, limit)
 
 
 @main.command("upload")
 @click.argument("filepath", type=click.Path(exists=True))
-def upload(filepath):
-    cli.upload_file(filepath)
+@click.option(
+    "--wait", "-w", is_flag=True, help="Import in the background and show progress"
+)
+@click.option(
+    "--mode",
+    "-m",
+    type=click.Choice(["append", "replace", "upsert"]),
+    default="append",
+    help="Append rows, replace the table or upsert on --key",
+)
+@click.option("--key", "-k", help="Comma-separated key columns for upsert")
+def upload(filepath, wait, mode, key):
+    cli.upload_file(filepath, wait, mode, key)
 
 
 @main.command("delete")
@@ -225,22 +579,59 @@ def delete(table_name):
     cli.delete_table(table_name)
 
 
+@main.command("apply")
+@click.argument("table_name")
+@click.argument("diff_path", type=click.Path(exists=True))
+@click.option(
+    "--batch-size", "-b", default=1000, help="Changes sent per transaction"
+)
+def apply(table_name, diff_path, batch_size):
+    cli.apply_diff(table_name, diff_path, batch_size)
+
+
+@main.command("aggregate")
+@click.argument("table_name")
+@click.option("--group-by", "-g", multiple=True, help="Column to group by")
+@click.option("--sum", "sums", multiple=True, help="Column to sum")
+@click.option("--avg", "avgs", multiple=True, help="Column to average")
+@click.option("--min", "mins", multiple=True, help="Column to take the minimum of")
+@click.option("--max", "maxes", multiple=True, help="Column to take the maximum of")
+@click.option(
+    "--count-distinct",
+    "distincts",
+    multiple=True,
+    help="Column to count distinct values in",
+)
+@click.option("--filter", "-f", "filters", multiple=True, help="Filter such as age>30")
+@click.option("--sort", "-s", help="Sort groups, e.g. -count")
+def aggregate(table_name, group_by, sums, avgs, mins, maxes, distincts, filters, sort):
+    metrics = {
+        "sum": sums,
+        "avg": avgs,
+        "min": mins,
+        "max": maxes,
+        "count_distinct": distincts,
+    }
+    cli.aggregate(table_name, group_by, metrics, filters, sort)
+
+
 @main.command("export")
 @click.argument("table_name")
 @click.argument("output_path", required=False)
-@click.option("--format", "-f", type=click.Choice(["xlsx", "csv"]), default="xlsx", help="Export format (xlsx or csv)")
+@click.option("--format", "-f", type=click.Choice(["xlsx", "csv", "ndjson"]), default="xlsx", help="Export format (xlsx, csv or ndjson)")
 def export(table_name, output_path, format):
     try:
         url = f"{API_URL}/export/{table_name}?format={format}"
-        response = requests.get(url)
-        if response.status_code == 200:
-            if not output_path:
-                output_path = f"{table_name}.{format}"
-            with open(output_path, "wb") as f:
-                f.write(response.content)
-            cli.print_success(f"Table saved as '{output_path}' in {format.upper()} format.")
-        else:
-            cli.print_error("Could not export table.")
+        with cli.session.get(url, stream=True) as response:
+            if response.status_code == 200:
+                if not output_path:
+                    output_path = f"{table_name}.{format}"
+                with open(output_path, "wb") as f:
+                    for chunk in response.iter_content(chunk_size=64 * 1024):
+                        f.write(chunk)
+                cli.print_success(f"Table saved as '{output_path}' in {format.upper()} format.")
+            else:
+                cli.print_error("Could not export table.")
     except Exception as e:
         cli.print_error(f"Export error: {str(e)}")
 
@@ -257,6 +648,7 @@ def help_cmd():
 
 @main.command()
 def interactive():
+    cli.interactive = True
     cli.print_info("Welcome to interactive mode! Type 'exit' to quit.")
 
     while True:
@@ -278,8 +670,12 @@ Commands:
   tables, t           - List tables
   use <table>         - Select table
   show [page]         - Show selected table
+  next, n             - Show next page
+  prev, p             - Show previous page
   search <term>       - Search in table
   searchall <term>    - Search all tables
+  upload <file>       - Upload Excel/CSV file
+  delete <table>      - Delete table
   clear               - Clear screen
   exit, quit, q       - Exit
                 """
@@ -302,9 +698,24 @@ Commands:
                 if cli.current_table:
                     try:
                         page = int(command[5:].strip())
-                        cli.show_table(cli.current_table, page=page)
                     except ValueError:
                         cli.print_error("Invalid page number")
+                    else:
+                        cli.show_page(page)
+                else:
+                    cli.print_error("Select a table first")
+
+            elif command.lower() in ["next", "n"]:
+                if cli.current_table:
+                    cli.show_page(cli.current_page + 1)
+                else:
+                    cli.print_error("Select a table first")
+
+            elif command.lower() in ["prev", "p"]:
+                if cli.current_table and cli.current_page > 1:
+                    cli.show_page(cli.current_page - 1)
+                elif cli.current_table:
+                    cli.print_error("Already on the first page")
                 else:
                     cli.print_error("Select a table first")
 
@@ -319,6 +730,12 @@ Commands:
                 search_term = command[10:].strip()
                 cli.search_all(search_term)
 
+            elif command.lower().startswith("upload "):
+                cli.upload_file(command[7:].strip())
+
+            elif command.lower().startswith("delete "):
+                cli.delete_table(command[7:].strip())
+
             elif command.lower() == "clear":
                 os.system("clear" if os.name == "posix" else "cls")
 
@@ -1,16 +1,264 @@
 #!/usr/bin/env python3
 import asyncio
+import contextlib
+import http
+import io
+import re
+import traceback
 import websockets
 import json
 import os
 import sys
+import time
 from pathlib import Path
 
+CLI_WORKERS = int(os.environ.get("CLI_WORKERS") or min(4, os.cpu_count() or 1))
+CLI_COMMAND_TIMEOUT = float(os.environ.get("CLI_COMMAND_TIMEOUT") or 60)
+OUTPUT_CHUNK_SIZE = 4096
+OUTPUT_FLUSH_INTERVAL = 0.1
+PROMPT = "Excel Database CLI > "
+COMMAND_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+ANSI_ESCAPE = re.compile(r"\x1b\[[0-9;]*m")
+
+
+class WorkerStream(io.TextIOBase):
+    """Forwards CLI output to the terminal server as protocol messages.
+
+    Small writes are coalesced into chunks of up to OUTPUT_CHUNK_SIZE
+    characters, sent at least every OUTPUT_FLUSH_INTERVAL seconds.
+    """
+
+    def __init__(self, protocol):
+        self.protocol = protocol
+        self.chunks = []
+        self.buffered = 0
+        self.last_flush = time.monotonic()
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        if not isinstance(text, str):
+            raise TypeError(f"write() argument must be str, not {type(text).__name__}")
+        self.chunks.append(text)
+        self.buffered += len(text)
+        if (
+            self.buffered >= OUTPUT_CHUNK_SIZE
+            or time.monotonic() - self.last_flush >= OUTPUT_FLUSH_INTERVAL
+        ):
+            self.flush()
+        return len(text)
+
+    def flush(self):
+        self.last_flush = time.monotonic()
+        if not self.buffered:
+            return
+        data = ANSI_ESCAPE.sub("", "".join(self.chunks))
+        self.chunks, self.buffered = [], 0
+        self.protocol.write(json.dumps({"type": "output", "data": data}) + "\n")
+        self.protocol.flush()
+
+
+def run_command(cli_module, args, protocol):
+    import click
+
+    # Each command starts from a fresh DatabaseCLI, like a new process would.
+    cli_module.cli = cli_module.DatabaseCLI()
+    stdout = WorkerStream(protocol)
+    stderr = io.StringIO()
+    exit_code = 0
+    with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+        sys.stdin = io.StringIO()
+        try:
+            result = cli_module.main.main(
+                args=args, prog_name="cli.py", standalone_mode=False
+            )
+            exit_code = result if isinstance(result, int) else 0
+        except click.ClickException as e:
+            e.show()
+            exit_code = e.exit_code
+        except click.Abort:
+            print("Aborted!", file=sys.stderr)
+            exit_code = 1
+        except SystemExit as e:
+            exit_code = e.code if isinstance(e.code, int) else 1
+        except Exception:
+            traceback.print_exc()
+            exit_code = 1
+        finally:
+            sys.stdin = sys.__stdin__
+            stdout.flush()
+    message = {"type": "exit", "code": exit_code, "stderr": stderr.getvalue()}
+    protocol.write(json.dumps(message) + "\n")
+    protocol.flush()
+
+
+def worker_main():
+    # stdout carries the JSON protocol, so anything the CLI writes straight to
+    # file descriptor 1 (e.g. os.system) is sent to /dev/null instead.
+    protocol = os.fdopen(os.dup(1), "w", encoding="utf-8")
+    os.dup2(os.open(os.devnull, os.O_WRONLY), 1)
+    sys.path.insert(0, str(Path(__file__).parent))
+    import cli as cli_module
+
+    for line in sys.stdin:
+        request = json.loads(line)
+        run_command(cli_module, request["args"], protocol)
+
+
+class CLIWorker:
+    def __init__(self):
+        self.process = None
+
+    async def start(self):
+        self.process = await asyncio.create_subprocess_exec(
+            sys.executable,
+            str(Path(__file__).resolve()),
+            "--worker",
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            env={**os.environ, "PYTHONUNBUFFERED": "1"},
+            limit=2**20,
+        )
+
+    async def restart(self):
+        if self.process and self.process.returncode is None:
+            self.process.kill()
+            await self.process.wait()
+        await self.start()
+
+    async def run(self, args, deadline):
+        """Yield the worker's output and exit messages for one command.
+
+        *deadline* (in event loop time) bounds the waits for the worker only,
+        not the time the consumer takes to handle each message.
+        """
+        self.process.stdin.write((json.dumps({"args": args}) + "\n").encode())
+        async with asyncio.timeout_at(deadline):
+            await self.process.stdin.drain()
+        while True:
+            async with asyncio.timeout_at(deadline):
+                line = await self.process.stdout.readline()
+            if not line:
+                raise RuntimeError("CLI worker exited unexpectedly")
+            message = json.loads(line)
+            yield message
+            if message["type"] == "exit":
+                return
+
+
+class WorkerPool:
+    """A fixed set of warm CLI processes; commands wait for a free one."""
+
+    def __init__(self, size, timeout):
+        self.size = max(1, size)
+        self.timeout = timeout
+        self.idle = asyncio.Queue()
+        self.restarts = 0
+
+    async def start(self):
+        for _ in range(self.size):
+            worker = CLIWorker()
+            await worker.start()
+            self.idle.put_nowait(worker)
+
+    async def run(self, args):
+        """Stream one command's messages from a free worker.
+
+        A worker whose command times out, fails or is cancelled mid-stream is
+        killed and replaced before it goes back to the pool.
+        """
+        try:
+            worker = await asyncio.wait_for(self.idle.get(), self.timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError("All CLI workers are busy, try again later.")
+        finished = False
+        deadline = asyncio.get_running_loop().time() + self.timeout
+        try:
+            async with contextlib.aclosing(worker.run(args, deadline)) as messages:
+                async for message in messages:
+                    yield message
+            finished = True
+        except TimeoutError:
+            raise TimeoutError(f"Command timed out after {self.timeout:g} seconds.")
+        finally:
+            if not finished:
+                self.restarts += 1
+                await worker.restart()
+            self.idle.put_nowait(worker)
+
+
+class CommandMetrics:
+    """Command counters and latency histogram for the /metrics endpoint."""
 
-class CLITerminalServer:
     def __init__(self):
+        self.running = 0
+        self.commands = {}
+        self.buckets = [0] * len(COMMAND_BUCKETS)
+        self.seconds = 0.0
+        self.count = 0
+
+    def record(self, status, seconds):
+        self.commands[status] = self.commands.get(status, 0) + 1
+        for index, bucket in enumerate(COMMAND_BUCKETS):
+            if seconds <= bucket:
+                self.buckets[index] += 1
+        self.seconds += seconds
+        self.count += 1
+
+    def render(self, server):
+        lines = [
+            "# HELP cli_terminal_connections Open websocket connections",
+            "# TYPE cli_terminal_connections gauge",
+            f"cli_terminal_connections {len(server.connections)}",
+            "# HELP cli_terminal_running_commands Commands currently running",
+            "# TYPE cli_terminal_running_commands gauge",
+            f"cli_terminal_running_commands {self.running}",
+            "# HELP cli_terminal_workers CLI worker processes in the pool",
+            "# TYPE cli_terminal_workers gauge",
+            f"cli_terminal_workers {server.pool.size}",
+            "# HELP cli_terminal_idle_workers CLI workers waiting for a command",
+            "# TYPE cli_terminal_idle_workers gauge",
+            f"cli_terminal_idle_workers {server.pool.idle.qsize()}",
+            "# HELP cli_terminal_worker_restarts_total Workers killed and replaced",
+            "# TYPE cli_terminal_worker_restarts_total counter",
+            f"cli_terminal_worker_restarts_total {server.pool.restarts}",
+            "# HELP cli_terminal_commands_total Finished commands by status",
+            "# TYPE cli_terminal_commands_total counter",
+        ]
+        for status, count in sorted(self.commands.items()):
+            lines.append(f'cli_terminal_commands_total{{status="{status}"}} {count}')
+        lines += [
+            "# HELP cli_terminal_command_seconds Command latency",
+            "# TYPE cli_terminal_command_seconds histogram",
+        ]
+        for bucket, count in zip(COMMAND_BUCKETS, self.buckets):
+            lines.append(
+                f'cli_terminal_command_seconds_bucket{{le="{bucket}"}} {count}'
+            )
+        lines += [
+            f'cli_terminal_command_seconds_bucket{{le="+Inf"}} {self.count}',
+            f"cli_terminal_command_seconds_sum {self.seconds:g}",
+            f"cli_terminal_command_seconds_count {self.count}",
+        ]
+        return "\n".join(lines) + "\n"
+
+
+class CLITerminalServer:
+    def __init__(self, pool):
         self.connections = set()
-        self.cli_path = Path(__file__).parent / "cli.py"
+        self.pool = pool
+        self.metrics = CommandMetrics()
+
+    async def process_request(self, path, request_headers):
+        # Plain HTTP GET /metrics on the websocket port returns Prometheus text.
+        if path == "/metrics":
+            return (
+                http.HTTPStatus.OK,
+                [("Content-Type", "text/plain; version=0.0.4")],
+                self.metrics.render(self).encode(),
+            )
+        return None
 
     async def register(self, websocket):
         self.connections.add(websocket)
@@ -45,10 +293,48 @@ Excel Database CLI > """,
         await websocket.send(json.dumps(welcome_msg))
 
     async def execute_command(self, command, websocket):
+        """Run one command, then send a final status frame.
+
+        Output is streamed as "output" frames while the command runs; the
+        status frame reports ok, error, timeout or cancelled, the CLI exit
+        code and the elapsed time.
+        """
+        started = time.perf_counter()
+        status, exit_code = "cancelled", None
+        self.metrics.running += 1
+        try:
+            with contextlib.suppress(websockets.exceptions.ConnectionClosed):
+                try:
+                    status, exit_code = await self.run_command(command, websocket)
+                except asyncio.CancelledError:
+                    await websocket.send(
+                        json.dumps(
+                            {
+                                "type": "output",
+                                "data": f"^C\nCommand cancelled.\n\n{PROMPT}",
+                                "prompt": True,
+                            }
+                        )
+                    )
+                await websocket.send(
+                    json.dumps(
+                        {
+                            "type": "status",
+                            "status": status,
+                            "exit_code": exit_code,
+                            "seconds": round(time.perf_counter() - started, 3),
+                        }
+                    )
+                )
+        finally:
+            self.metrics.running -= 1
+            self.metrics.record(status, time.perf_counter() - started)
+
+    async def run_command(self, command, websocket):
         if command.strip() == "clear":
             await websocket.send(json.dumps({"type": "clear"}))
             await self.send_welcome_message(websocket)
-            return
+            return "ok", 0
 
         if command.strip() == "help":
             help_msg = {
@@ -78,7 +364,7 @@ Excel Database CLI > """,
                 "prompt": True,
             }
             await websocket.send(json.dumps(help_msg))
-            return
+            return "ok", 0
 
         try:
             cmd_parts = command.strip().split()
@@ -87,72 +373,106 @@ Excel Database CLI > """,
                     json.dumps(
                         {
                             "type": "output",
-                            "data": "Excel Database CLI > ",
+                            "data": PROMPT,
                             "prompt": True,
                         }
                     )
                 )
-                return
-
-            full_command = [sys.executable, str(self.cli_path)] + cmd_parts
+                return "ok", 0
 
-            process = await asyncio.create_subprocess_exec(
-                *full_command,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-                env={**os.environ, "PYTHONUNBUFFERED": "1"},
-            )
-
-            stdout, stderr = await process.communicate()
+            if cmd_parts[0] == "interactive":
+                raise ValueError(
+                    "Interactive mode is not available in the web terminal."
+                )
 
+            produced_output = False
+            exit_code = None
             output = ""
-            if stdout:
-                output += stdout.decode("utf-8")
-            if stderr:
-                output += f"\nError: {stderr.decode('utf-8')}"
+            async with contextlib.aclosing(self.pool.run(cmd_parts)) as messages:
+                async for message in messages:
+                    if message["type"] == "output":
+                        if message["data"].strip():
+                            produced_output = True
+                        # send() waits for the socket to drain, which in turn
+                        # stops reading from the worker until the client keeps up.
+                        await websocket.send(
+                            json.dumps({"type": "output", "data": message["data"]})
+                        )
+                    elif message["type"] == "exit":
+                        exit_code = message["code"]
+                        if message["stderr"]:
+                            output += f"\nError: {message['stderr']}"
 
-            if not output.strip():
+            if not produced_output and not output.strip():
                 output = "Command executed successfully."
 
             await websocket.send(
                 json.dumps(
                     {
                         "type": "output",
-                        "data": output + "\n\nExcel Database CLI > ",
+                        "data": output + f"\n\n{PROMPT}",
                         "prompt": True,
                     }
                 )
             )
+            return ("ok" if exit_code == 0 else "error"), exit_code
 
         except Exception as e:
             error_msg = {
                 "type": "output",
-                "data": f"Error while executing command: {str(e)}\n\nExcel Database CLI > ",
+                "data": f"Error while executing command: {str(e)}\n\n{PROMPT}",
                 "prompt": True,
             }
             await websocket.send(json.dumps(error_msg))
+            return ("timeout" if isinstance(e, TimeoutError) else "error"), None
 
     async def handle_client(self, websocket, path):
         await self.register(websocket)
+        running = None
         try:
             async for message in websocket:
                 data = json.loads(message)
+                busy = running is not None and not running.done()
                 if data.get("type") == "command":
-                    await self.execute_command(data.get("command", ""), websocket)
+                    if busy:
+                        await websocket.send(
+                            json.dumps(
+                                {
+                                    "type": "output",
+                                    "data": "A command is already running. "
+                                    "Cancel it first.\n",
+                                }
+                            )
+                        )
+                        continue
+                    running = asyncio.create_task(
+                        self.execute_command(data.get("command", ""), websocket)
+                    )
+                elif data.get("type") == "cancel" and busy:
+                    running.cancel()
         except websockets.exceptions.ConnectionClosed:
             pass
         finally:
+            if running is not None and not running.done():
+                running.cancel()
             await self.unregister(websocket)
 
 
 async def main():
-    server = CLITerminalServer()
+    pool = WorkerPool(CLI_WORKERS, CLI_COMMAND_TIMEOUT)
+    await pool.start()
+    server = CLITerminalServer(pool)
 
     print("CLI Terminal Server is starting...")
-    print("WebSocket server is listening on port 8080...")
+    print("WebSocket server is listening on port 8080 (metrics at /metrics)...")
 
     start_server = websockets.serve(
-        server.handle_client, "0.0.0.0", 8080, ping_interval=20, ping_timeout=10
+        server.handle_client,
+        "0.0.0.0",
+        8080,
+        ping_interval=20,
+        ping_timeout=10,
+        process_request=server.process_request,
     )
 
     await start_server
@@ -162,6 +482,9 @@ async def main():
 
 
 if __name__ == "__main__":
+    if "--worker" in sys.argv[1:]:
+        worker_main()
+        sys.exit(0)
     try:
         asyncio.run(main())
     except KeyboardInterrupt:
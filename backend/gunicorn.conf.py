@@ -0,0 +1,30 @@
+# Gunicorn settings for the API server: gunicorn -c gunicorn.conf.py app:app
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+bind = os.getenv("GUNICORN_BIND") or "0.0.0.0:5000"
+workers = int(os.getenv("GUNICORN_WORKERS") or 4)
+timeout = int(os.getenv("GUNICORN_TIMEOUT") or 120)
+# Load the app once in the master: startup migrations run a single time and
+# workers are forked with everything imported, so (re)starting one is cheap.
+preload_app = (os.getenv("GUNICORN_PRELOAD") or "1") == "1"
+
+
+def on_starting(server):
+    if server.cfg.preload_app:
+        # The app imports these on first upload or export; importing them
+        # before the fork lets every worker share them.
+        import openpyxl  # noqa: F401
+        import pandas  # noqa: F401
+
+
+def post_fork(server, worker):
+    if server.cfg.preload_app:
+        from app import app, db
+
+        # Pooled connections opened by the master must not be shared.
+        with app.app_context():
+            db.engine.dispose(close=False)
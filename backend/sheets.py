@@ -0,0 +1,69 @@
+"""Chunked worksheet reading, shared by the API and its sheet decoders.
+
+Decoder processes are started by a forkserver rather than forked from a busy
+API worker, so this module must stay cheap to import and free of app state.
+"""
+import time
+
+
+def unique_columns(header):
+    columns = []
+    seen = {}
+    for index, name in enumerate(header):
+        name = f"Unnamed: {index}" if name is None else str(name)
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        columns.append(name)
+    return columns
+
+
+def read_sheet_chunks(worksheet, chunk_size):
+    import pandas as pd
+
+    rows = worksheet.iter_rows(values_only=True)
+    header = next(rows, None)
+    if header is None:
+        return
+    columns = unique_columns(header)
+    width = len(columns)
+    batch = []
+    for row in rows:
+        if all(value is None for value in row):
+            continue
+        row = tuple(row[:width]) + (None,) * (width - len(row))
+        batch.append(row)
+        if len(batch) >= chunk_size:
+            yield pd.DataFrame.from_records(batch, columns=columns)
+            batch = []
+    if batch:
+        yield pd.DataFrame.from_records(batch, columns=columns)
+
+
+def decode_sheet(filepath, title, chunk_size, chunks):
+    """Parse one sheet in a decoder process and send its chunks to *chunks*.
+
+    Puts ``("chunk", frame)`` for every chunk, then ``("done", seconds)`` with
+    the time spent parsing, or ``("error", message)``. The queue is bounded,
+    so the decoder never gets more than a few chunks ahead of the inserts.
+    """
+    from openpyxl import load_workbook
+
+    parse_seconds = 0.0
+    started = time.perf_counter()
+    try:
+        workbook = load_workbook(filepath, read_only=True, data_only=True)
+        try:
+            for frame in read_sheet_chunks(workbook[title], chunk_size):
+                parse_seconds += time.perf_counter() - started
+                chunks.put(("chunk", frame))
+                started = time.perf_counter()
+        finally:
+            workbook.close()
+    except Exception as e:
+        chunks.put(("error", f"{type(e).__name__}: {e}"))
+        return
+    parse_seconds += time.perf_counter() - started
+    chunks.put(("done", parse_seconds))
@@ -0,0 +1,70 @@
+import io
+import os
+import sys
+import tempfile
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORKDIR = tempfile.mkdtemp(prefix="excel-db-tests-")
+
+# The app configures itself at import time, so point it at a scratch database
+# (or TEST_DATABASE_URL, e.g. an empty PostgreSQL database) and run without
+# Redis before it is imported.
+os.environ["DATABASE_URL"] = (
+    os.environ.get("TEST_DATABASE_URL")
+    or f"sqlite:///{os.path.join(WORKDIR, 'test.db')}"
+)
+os.environ["UPLOAD_FOLDER"] = os.path.join(WORKDIR, "uploads")
+os.environ["REDIS_URL"] = ""
+sys.path.insert(0, BACKEND_DIR)
+
+
+@pytest.fixture(scope="session")
+def app_module():
+    import app
+
+    return app
+
+
+@pytest.fixture
+def client(app_module):
+    return app_module.app.test_client()
+
+
+@pytest.fixture
+def storage(app_module, request, monkeypatch):
+    backend = getattr(request, "param", "legacy")
+    monkeypatch.setitem(app_module.app.config, "STORAGE_BACKEND", backend)
+    return backend
+
+
+def upload(client, filename, content, **params):
+    if isinstance(content, str):
+        content = content.encode()
+    response = client.post(
+        "/api/upload",
+        query_string=params,
+        data={"file": (io.BytesIO(content), filename)},
+        content_type="multipart/form-data",
+    )
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+
+def xlsx(rows):
+    return workbook({"Sheet": rows})
+
+
+def workbook(sheets):
+    from openpyxl import Workbook
+
+    book = Workbook()
+    book.remove(book.active)
+    for title, rows in sheets.items():
+        sheet = book.create_sheet(title)
+        for row in rows:
+            sheet.append(row)
+    output = io.BytesIO()
+    book.save(output)
+    return output.getvalue()
@@ -0,0 +1,35 @@
+import pytest
+
+from conftest import upload
+
+STORAGES = ["legacy", "typed"]
+
+
+@pytest.fixture
+def sales(client, storage):
+    upload(
+        client,
+        "sales.csv",
+        "city,amount\nParis,1.5\nParis,2.5\nRome,4\n",
+        mode="replace",
+    )
+    return "/api/tables/sales/aggregate"
+
+
+@pytest.mark.parametrize("storage", STORAGES, indirect=True)
+def test_sum_of_numeric_column(client, sales):
+    response = client.get(sales, query_string={"group_by": "city", "sum": "amount"})
+
+    assert response.status_code == 200
+    groups = response.get_json()["groups"]
+    sums = {group["group"]["city"]: group["sum"]["amount"] for group in groups}
+    assert sums == {"Paris": 4.0, "Rome": 4.0}
+
+
+@pytest.mark.parametrize("storage", STORAGES, indirect=True)
+@pytest.mark.parametrize("function", ["sum", "avg"])
+def test_sum_of_text_column_is_rejected(client, sales, function):
+    response = client.get(sales, query_string={function: "city"})
+
+    assert response.status_code == 400
+    assert response.get_json()["error"] == f"Cannot {function} non-numeric column: city"
@@ -0,0 +1,87 @@
+import pytest
+
+from conftest import upload
+
+
+@pytest.fixture
+def people(client, storage):
+    upload(client, "people.csv", "name,age\nada,36\nalan,41\n", mode="replace")
+    return {
+        record["data"]["name"]: record["id"]
+        for record in client.get("/api/tables/people").get_json()["records"]
+    }
+
+
+def batch(client, payload):
+    return client.post("/api/tables/people/rows:batch", json=payload)
+
+
+def rows(client):
+    data = client.get("/api/tables/people").get_json()
+    return data["total"], {r["data"]["name"]: r["data"]["age"] for r in data["records"]}
+
+
+@pytest.mark.parametrize("storage", ["legacy", "typed"], indirect=True)
+def test_batch_reports_a_status_per_entry(client, people):
+    missing = max(people.values()) + 100
+
+    response = batch(
+        client,
+        {
+            "insert": [{"name": "grace", "age": 85}],
+            "update": [
+                {"id": people["ada"], "data": {"age": 37}},
+                {"id": missing, "data": {"age": 1}},
+            ],
+            "delete": [people["alan"], missing],
+        },
+    )
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert (body["inserted"], body["updated"], body["deleted"]) == (1, 1, 1)
+    results = body["results"]
+    assert [r["status"] for r in results["insert"]] == ["inserted"]
+    assert results["update"] == [
+        {"id": people["ada"], "status": "updated"},
+        {"id": missing, "status": "not_found"},
+    ]
+    assert results["delete"] == [
+        {"id": people["alan"], "status": "deleted"},
+        {"id": missing, "status": "not_found"},
+    ]
+    assert rows(client) == (2, {"ada": 37, "grace": 85})
+
+
+@pytest.mark.parametrize("storage", ["legacy", "typed"], indirect=True)
+def test_batch_with_an_unknown_column_changes_nothing(client, people):
+    response = batch(
+        client,
+        {
+            "insert": [{"name": "grace", "age": 85}],
+            "update": [{"id": people["ada"], "data": {"height": 170}}],
+            "delete": [people["alan"]],
+        },
+    )
+
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "Unknown columns: height"}
+    assert rows(client) == (2, {"ada": 36, "alan": 41})
+
+
+@pytest.mark.parametrize(
+    "payload",
+    [
+        {"insert": {"name": "grace"}},
+        {"update": [{"id": "1", "data": {}}]},
+        {"delete": ["1"]},
+    ],
+)
+def test_malformed_batch_is_rejected(client, people, payload):
+    assert batch(client, payload).status_code == 400
+
+
+def test_batch_on_a_missing_table(client):
+    response = client.post("/api/tables/nobody/rows:batch", json={"delete": [1]})
+
+    assert response.status_code == 404
@@ -0,0 +1,104 @@
+import pytest
+
+from conftest import upload
+
+
+def table_names(client):
+    return [table["name"] for table in client.get("/api/tables").get_json()]
+
+
+def test_catalog_shows_tables_written_by_another_worker(
+    client, storage, app_module, monkeypatch
+):
+    table_names(client)
+    # Another worker writes through its own cache, leaving this one untouched.
+    other = app_module.ResponseCache(None, 16)
+    with monkeypatch.context() as patch:
+        patch.setattr(app_module, "cache", other)
+        upload(client, "elsewhere.csv", "a\n1\n", mode="replace")
+
+    assert "elsewhere" in table_names(client)
+
+
+@pytest.fixture(params=["local", "redis"])
+def cache(request, app_module, monkeypatch):
+    client = None
+    if request.param == "redis":
+        import fakeredis
+
+        client = fakeredis.FakeRedis(decode_responses=True)
+    response_cache = app_module.ResponseCache(client, 16)
+    monkeypatch.setattr(app_module, "cache", response_cache)
+    return response_cache
+
+
+@pytest.fixture
+def prices(client, storage, cache):
+    upload(client, "prices.csv", "item,price\npen,2\nink,5\n", mode="replace")
+    return client.get("/api/tables/prices").get_json()["records"]
+
+
+def hits(cache, namespace):
+    return cache.snapshot()["namespaces"].get(namespace, {}).get("hits", 0)
+
+
+@pytest.mark.parametrize("storage", ["legacy", "typed"], indirect=True)
+def test_cached_page_is_replaced_after_a_write(client, cache, prices):
+    client.get("/api/tables/prices")
+    assert hits(cache, "pages") == 1
+
+    response = client.post(
+        "/api/update_row",
+        json={"table_name": "prices", "id": prices[0]["id"], "data": {"price": 3}},
+    )
+    assert response.status_code == 200
+
+    records = client.get("/api/tables/prices").get_json()["records"]
+    assert records[0]["data"]["price"] == 3
+    assert hits(cache, "pages") == 1
+
+
+def test_cached_search_and_aggregates_follow_a_batch(client, storage, cache, prices):
+    def search_total():
+        return client.get("/api/search?q=quill").get_json()["total"]
+
+    def price_sum():
+        data = client.get("/api/tables/prices/aggregate?sum=price").get_json()
+        return data["groups"][0]["sum"]["price"]
+
+    assert (search_total(), price_sum()) == (0, 7)
+    assert (search_total(), price_sum()) == (0, 7)
+    assert (hits(cache, "search"), hits(cache, "aggregates")) == (1, 1)
+
+    response = client.post(
+        "/api/tables/prices/rows:batch",
+        json={"insert": [{"item": "quill", "price": 9}]},
+    )
+    assert response.status_code == 200
+
+    assert (search_total(), price_sum()) == (1, 16)
+
+
+def test_workers_share_entries_through_redis(client, storage, app_module, monkeypatch):
+    import fakeredis
+
+    server = fakeredis.FakeServer()
+    workers = [
+        app_module.ResponseCache(
+            fakeredis.FakeRedis(server=server, decode_responses=True), 16
+        )
+        for _ in range(2)
+    ]
+    upload(client, "shared.csv", "a\n1\n", mode="replace")
+
+    for worker in workers:
+        monkeypatch.setattr(app_module, "cache", worker)
+        client.get("/api/tables/shared")
+
+    assert workers[1].snapshot()["namespaces"]["pages"] == {
+        "hits": 1,
+        "misses": 1,
+        "hit_ratio": 0.5,
+    }
+    assert workers[1].snapshot()["backend"] == "redis"
+    assert workers[1].local.entries == {}
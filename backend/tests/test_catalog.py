@@ -0,0 +1,52 @@
+import pytest
+
+from conftest import upload
+
+
+def record_count(client, name):
+    tables = {table["name"]: table for table in client.get("/api/tables").get_json()}
+    return tables[name]["record_count"]
+
+
+def stored_rows(app_module, name):
+    with app_module.app.app_context():
+        table = app_module.DynamicTable.query.filter_by(table_name=name).one()
+        return app_module.get_storage(table).count()
+
+
+@pytest.mark.parametrize("storage", ["legacy", "typed"], indirect=True)
+def test_record_count_follows_every_write(client, storage, app_module):
+    def check(expected):
+        assert record_count(client, "ledger") == expected
+        assert stored_rows(app_module, "ledger") == expected
+
+    upload(client, "ledger.csv", "ref,amount\n1,5\n2,6\n", mode="replace")
+    check(2)
+    upload(client, "ledger.csv", "ref,amount\n3,7\n")
+    check(3)
+    upload(client, "ledger.csv", "ref,amount\n3,8\n4,9\n", mode="upsert", key="ref")
+    check(4)
+
+    ids = [r["id"] for r in client.get("/api/tables/ledger").get_json()["records"]]
+    response = client.post(
+        "/api/tables/ledger/rows:batch",
+        json={"insert": [{"ref": 5, "amount": 1}], "delete": ids[:2]},
+    )
+    assert response.status_code == 200
+    check(3)
+
+    upload(client, "ledger.csv", "ref,amount\n1,5\n", mode="replace")
+    check(1)
+
+
+def test_missing_record_counts_are_backfilled(client, storage, app_module):
+    upload(client, "backfill.csv", "a\n1\n2\n3\n", mode="replace")
+    with app_module.app.app_context():
+        table = app_module.DynamicTable.query.filter_by(table_name="backfill").one()
+        table.row_count = None
+        app_module.db.session.commit()
+
+        app_module.backfill_row_counts()
+
+        app_module.db.session.refresh(table)
+        assert table.row_count == 3
@@ -0,0 +1,145 @@
+import threading
+import types
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import cli
+
+
+@pytest.fixture
+def server():
+    """A local API that answers with the statuses queued in ``server.statuses``."""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def respond(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            self.rfile.read(length)
+            httpd.requests.append((self.command, self.client_address[1]))
+            status = httpd.statuses.pop(0) if httpd.statuses else 200
+            body = b"{}"
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        do_GET = do_POST = respond
+
+        def log_message(self, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    httpd.statuses = []
+    httpd.requests = []
+    httpd.url = f"http://127.0.0.1:{httpd.server_port}"
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def session(monkeypatch):
+    monkeypatch.setattr(cli, "RETRY_BACKOFF", 0)
+    session = cli.create_session()
+    yield session
+    session.close()
+
+
+def test_session_keeps_connections_alive(server, session):
+    for _ in range(3):
+        assert session.get(f"{server.url}/tables").status_code == 200
+
+    assert len({port for _, port in server.requests}) == 1
+
+
+def test_session_retries_gateway_errors_on_reads(server, session):
+    server.statuses = [503, 502]
+
+    response = session.get(f"{server.url}/tables")
+
+    assert response.status_code == 200
+    assert [method for method, _ in server.requests] == ["GET"] * 3
+
+
+def test_session_never_retries_an_upload(server, session):
+    server.statuses = [503]
+
+    response = session.post(f"{server.url}/upload", data=b"a,b\n")
+
+    assert response.status_code == 503
+    assert [method for method, _ in server.requests] == ["POST"]
+
+
+class PagedSession:
+    """Serves a three-page table and records the pages requested."""
+
+    def __init__(self):
+        self.requested = []
+
+    def get(self, url, params=None, **kwargs):
+        page = params["page"]
+        self.requested.append(page)
+        data = {
+            "columns": ["n"],
+            "records": [{"id": page, "data": {"n": page}}],
+            "total": 3,
+            "pages": 3,
+            "current_page": page,
+            "next_cursor": f"after-{page}" if page < 3 else None,
+            "prev_cursor": f"before-{page}" if page > 1 else None,
+        }
+        return types.SimpleNamespace(
+            status_code=200, json=lambda: data, raise_for_status=lambda: None
+        )
+
+
+@pytest.fixture
+def browser():
+    browser = cli.DatabaseCLI(session=PagedSession())
+    browser.interactive = True
+    yield browser
+    if browser.prefetcher:
+        browser.prefetcher.shutdown()
+
+
+def test_next_page_is_prefetched_and_pages_are_cached(browser, capsys):
+    browser.show_table("numbers")
+    browser.prefetches[("page", "numbers", "", 2)].result()
+
+    browser.show_page(2)
+    browser.show_page(1)
+    browser.prefetcher.shutdown()
+
+    # Page 3 was prefetched while page 2 was shown; nothing was fetched twice.
+    assert browser.session.requested == [1, 2, 3]
+    assert "Page 2/3" in capsys.readouterr().out
+
+
+def test_writes_drop_the_cached_pages_of_their_table(browser):
+    browser.show_table("numbers")
+    browser.prefetches[("page", "numbers", "", 2)].result()
+
+    browser.invalidate_cache("other")
+    browser.show_table("numbers")
+    browser.invalidate_cache("numbers")
+    browser.show_table("numbers")
+
+    assert browser.session.requested.count(1) == 2
+
+
+def test_page_cache_evicts_the_least_recently_used_and_expired():
+    cache = cli.PageCache(2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == (1, None, 3)
+    expired = cli.PageCache(2, ttl=-1)
+    expired.set("a", 1)
+    assert expired.get("a") is None
@@ -0,0 +1,144 @@
+import asyncio
+import contextlib
+import io
+import json
+import types
+
+import click
+import pytest
+
+import cli_terminal_server
+
+
+def fake_cli():
+    @click.group()
+    def main():
+        pass
+
+    @main.command()
+    @click.argument("name")
+    def hello(name):
+        click.echo(f"Hello {name}")
+
+    @main.command()
+    @click.argument("name")
+    def delete(name):
+        click.confirm(f"Delete {name}?", abort=True)
+        click.echo("deleted")
+
+    return types.SimpleNamespace(DatabaseCLI=object, main=main)
+
+
+def run(args):
+    protocol = io.StringIO()
+    cli_terminal_server.run_command(fake_cli(), args, protocol)
+    messages = [json.loads(line) for line in protocol.getvalue().splitlines()]
+    output = "".join(m["data"] for m in messages if m["type"] == "output")
+    return output, messages[-1]
+
+
+def test_click_echo_reaches_the_terminal():
+    output, exit_message = run(["hello", "world"])
+
+    assert output == "Hello world\n"
+    assert exit_message == {"type": "exit", "code": 0, "stderr": ""}
+
+
+def test_click_confirm_prompts_and_aborts_without_input():
+    output, exit_message = run(["delete", "sample_data"])
+
+    assert output.startswith("Delete sample_data? [y/N]: ")
+    assert exit_message["code"] == 1
+    assert "Aborted!" in exit_message["stderr"]
+
+
+class ScriptedWorker(cli_terminal_server.CLIWorker):
+    """A worker whose process prints *lines* and then stays silent."""
+
+    def __init__(self, lines):
+        super().__init__()
+        self.lines = lines
+        self.restarted = False
+
+    async def start(self):
+        stdout = asyncio.StreamReader()
+        for line in self.lines:
+            stdout.feed_data((json.dumps(line) + "\n").encode())
+        stdin = types.SimpleNamespace(
+            write=lambda data: None, drain=lambda: asyncio.sleep(0)
+        )
+        self.process = types.SimpleNamespace(stdin=stdin, stdout=stdout)
+
+    async def restart(self):
+        self.restarted = True
+
+
+async def collect(worker, timeout, pause=0):
+    pool = cli_terminal_server.WorkerPool(1, timeout)
+    pool.idle.put_nowait(worker)
+    await worker.start()
+    messages = []
+    async with contextlib.aclosing(pool.run(["list-tables"])) as stream:
+        async for message in stream:
+            messages.append(message["type"])
+            await asyncio.sleep(pause)
+    return messages
+
+
+def test_slow_consumer_does_not_time_out_the_command():
+    worker = ScriptedWorker(
+        [
+            {"type": "output", "data": "a"},
+            {"type": "exit", "code": 0, "stderr": ""},
+        ]
+    )
+
+    messages = asyncio.run(collect(worker, timeout=0.1, pause=0.2))
+
+    assert messages == ["output", "exit"]
+    assert not worker.restarted
+
+
+def test_silent_worker_times_out_and_is_restarted():
+    worker = ScriptedWorker([{"type": "output", "data": "a"}])
+
+    with pytest.raises(TimeoutError, match="timed out after 0.1 seconds"):
+        asyncio.run(collect(worker, timeout=0.1))
+
+    assert worker.restarted
+
+
+def test_commands_reuse_a_warm_worker_process():
+    async def scenario():
+        pool = cli_terminal_server.WorkerPool(1, 30)
+        worker = cli_terminal_server.CLIWorker()
+        await worker.start()
+        pool.idle.put_nowait(worker)
+        pids = []
+        try:
+            for _ in range(2):
+                messages = [message async for message in pool.run(["--help"])]
+                assert messages[-1]["code"] == 0
+                assert "Usage: cli.py" in "".join(
+                    m["data"] for m in messages if m["type"] == "output"
+                )
+                pids.append(worker.process.pid)
+        finally:
+            worker.process.kill()
+            await worker.process.wait()
+        return pids, pool.restarts
+
+    pids, restarts = asyncio.run(scenario())
+
+    assert pids[0] == pids[1]
+    assert restarts == 0
+
+
+def test_command_waits_for_a_free_worker_then_gives_up():
+    async def scenario():
+        pool = cli_terminal_server.WorkerPool(1, 0.1)
+        with pytest.raises(TimeoutError, match="All CLI workers are busy"):
+            async for _ in pool.run(["list-tables"]):
+                pass
+
+    asyncio.run(scenario())
@@ -0,0 +1,28 @@
+import os
+import subprocess
+import sys
+
+from dotenv import dotenv_values
+
+from conftest import BACKEND_DIR, WORKDIR
+
+
+def test_example_env_starts_with_defaults():
+    env = {**os.environ, **dotenv_values(os.path.join(BACKEND_DIR, ".env.example"))}
+    env["DATABASE_URL"] = f"sqlite:///{os.path.join(WORKDIR, 'example.db')}"
+    script = (
+        "import app, cli, cli_terminal_server; "
+        "print(app.app.config['INGEST_BATCH_SIZE'], cli.MAX_RETRIES, "
+        "cli_terminal_server.CLI_COMMAND_TIMEOUT)"
+    )
+
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=WORKDIR,
+        env={**env, "PYTHONPATH": BACKEND_DIR},
+        capture_output=True,
+        text=True,
+    )
+
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.split()[-3:] == ["5000", "3", "60.0"]
@@ -0,0 +1,84 @@
+import csv
+import io
+import json
+from datetime import datetime
+
+import pytest
+
+from conftest import upload, xlsx
+
+ROWS = [["city", "day", "visits"]] + [
+    [f"şehir {n}", datetime(2024, 1, n), n] for n in range(1, 6)
+]
+
+
+@pytest.fixture
+def visits(client, storage, app_module, monkeypatch):
+    upload(client, "visits.xlsx", xlsx(ROWS), mode="replace")
+    # Small batches and chunks so the export spans several of each.
+    monkeypatch.setitem(app_module.app.config, "EXPORT_BATCH_SIZE", 2)
+    monkeypatch.setattr(app_module, "EXPORT_CHUNK_BYTES", 32)
+    return "/api/export/visits_Sheet"
+
+
+def export(client, url, format_type):
+    response = client.get(url, query_string={"format": format_type})
+    assert response.status_code == 200
+    assert response.is_streamed
+    chunks = list(response.response)
+    response.close()
+    assert len(chunks) > 1
+    return b"".join(
+        chunk.encode() if isinstance(chunk, str) else chunk for chunk in chunks
+    )
+
+
+@pytest.mark.parametrize("storage", ["legacy", "typed"], indirect=True)
+def test_csv_export_streams_every_row(client, visits):
+    body = export(client, visits, "csv").decode()
+
+    rows = list(csv.reader(io.StringIO(body)))
+    assert rows[0] == ["city", "day", "visits"]
+    assert rows[1:] == [
+        [f"şehir {n}", f"2024-01-0{n}T00:00:00", str(n)] for n in range(1, 6)
+    ]
+
+
+@pytest.mark.parametrize("storage", ["legacy", "typed"], indirect=True)
+def test_ndjson_export_streams_every_row(client, visits):
+    body = export(client, visits, "ndjson").decode()
+
+    assert [json.loads(line) for line in body.splitlines()] == [
+        {"city": f"şehir {n}", "day": f"2024-01-0{n}T00:00:00", "visits": n}
+        for n in range(1, 6)
+    ]
+
+
+def test_xlsx_export_is_a_workbook(client, visits):
+    from openpyxl import load_workbook
+
+    body = export(client, visits, "xlsx")
+
+    sheet = load_workbook(io.BytesIO(body)).active
+    rows = [list(row) for row in sheet.iter_rows(values_only=True)]
+    assert rows[0] == ["city", "day", "visits"]
+    assert [row[0] for row in rows[1:]] == [f"şehir {n}" for n in range(1, 6)]
+
+
+def test_export_names_the_download(client, visits):
+    response = client.get(visits, query_string={"format": "csv"})
+
+    assert response.mimetype == "text/csv"
+    assert response.headers["Content-Disposition"] == (
+        "attachment; filename*=UTF-8''visits_Sheet.csv"
+    )
+
+
+def test_unknown_export_format_is_rejected(client, visits):
+    response = client.get(visits, query_string={"format": "pdf"})
+
+    assert response.status_code == 400
+
+
+def test_export_of_a_missing_table(client):
+    assert client.get("/api/export/nowhere").status_code == 404
@@ -0,0 +1,51 @@
+from datetime import datetime
+
+import pytest
+
+from conftest import upload, xlsx
+
+
+@pytest.fixture
+def orders(client, storage):
+    upload(
+        client,
+        "orders.xlsx",
+        xlsx(
+            [
+                ["code", "day", "amount"],
+                ["007", datetime(2024, 1, 1), 1.5],
+                ["A1", datetime(2024, 1, 2), 2.5],
+            ]
+        ),
+        mode="replace",
+    )
+    return "/api/tables/orders_Sheet"
+
+
+def codes(client, url, *filters):
+    response = client.get(url, query_string={"filter": list(filters)})
+    assert response.status_code == 200, response.get_json()
+    return [record["data"]["code"] for record in response.get_json()["records"]]
+
+
+@pytest.mark.parametrize("storage", ["legacy", "typed"], indirect=True)
+def test_filter_values_take_the_column_type(client, orders):
+    assert codes(client, orders, "code=007") == ["007"]
+    assert codes(client, orders, "day=2024-01-02") == ["A1"]
+    assert codes(client, orders, "day>=2024-01-01T12:00") == ["A1"]
+    assert codes(client, orders, "amount<2") == ["007"]
+
+
+@pytest.mark.parametrize("storage", ["legacy", "typed"], indirect=True)
+def test_filter_value_that_does_not_fit_is_rejected(client, orders):
+    response = client.get(orders, query_string={"filter": "amount>abc"})
+
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "Invalid value for amount: abc"
+
+
+@pytest.mark.parametrize("per_page", [0, -1])
+def test_per_page_must_be_positive(client, orders, per_page):
+    response = client.get(orders, query_string={"per_page": per_page})
+
+    assert response.status_code == 400
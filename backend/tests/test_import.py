@@ -0,0 +1,88 @@
+import pytest
+
+from conftest import upload, workbook, xlsx
+
+
+def test_multi_sheet_workbook_streams_every_sheet(client, app_module, monkeypatch):
+    monkeypatch.setitem(app_module.app.config, "IMPORT_PROCESSES", 2)
+    monkeypatch.setitem(app_module.app.config, "IMPORT_CHUNK_SIZE", 10)
+    sheets = {
+        f"s{index}": [["n", "label"]] + [[n, f"row{n}"] for n in range(25 + index)]
+        for index in range(3)
+    }
+
+    result = upload(client, "book.xlsx", workbook(sheets))
+
+    stats = {entry["sheet"]: entry for entry in result["stats"]}
+    assert {title: stats[title]["inserted"] for title in sheets} == {
+        "s0": 25,
+        "s1": 26,
+        "s2": 27,
+    }
+    table = client.get("/api/tables/book_s2?per_page=100").get_json()
+    assert [record["data"]["n"] for record in table["records"]] == list(range(27))
+
+
+@pytest.mark.parametrize("storage", ["legacy", "typed"], indirect=True)
+def test_rows_keep_their_values_across_insert_batches(
+    client, storage, app_module, monkeypatch
+):
+    monkeypatch.setitem(app_module.app.config, "INGEST_BATCH_SIZE", 3)
+    rows = [["name", "score", "note"]] + [
+        [f"ölçüm {n}", n * 1.5, None if n % 3 else f'"{n}"'] for n in range(8)
+    ]
+
+    result = upload(client, "scores.xlsx", xlsx(rows), mode="replace")
+
+    assert result["stats"][0]["inserted"] == 8
+    records = client.get("/api/tables/scores_Sheet").get_json()["records"]
+    assert [record["data"] for record in records] == [
+        {"name": name, "score": score, "note": note} for name, score, note in rows[1:]
+    ]
+    ids = [record["id"] for record in records]
+    assert ids == sorted(ids)
+
+
+@pytest.mark.parametrize("filename", ["counts.csv", "counts.xlsx"])
+def test_files_are_read_in_chunks_with_progress(
+    storage, app_module, monkeypatch, tmp_path, filename
+):
+    monkeypatch.setitem(app_module.app.config, "IMPORT_CHUNK_SIZE", 4)
+    rows = [["n"]] + [[n] for n in range(10)]
+    path = tmp_path / filename
+    if filename.endswith(".csv"):
+        path.write_text("\n".join(str(row[0]) for row in rows) + "\n")
+    else:
+        path.write_bytes(xlsx(rows))
+    progress = []
+
+    with app_module.app.app_context():
+        _, stats = app_module.import_file(
+            str(path), filename, lambda *update: progress.append(update), "replace"
+        )
+
+    assert [done for done, _ in progress] == [4, 8, 10]
+    assert progress[-1][1] == 1.0
+    assert stats[0]["inserted"] == 10
+
+
+def test_parallel_import_keeps_sheet_order_and_shared_tables(
+    client, app_module, monkeypatch
+):
+    monkeypatch.setitem(app_module.app.config, "IMPORT_PROCESSES", 3)
+    sheets = {
+        "x": [["n"], [1]],
+        "empty": [["n"]],
+        # Both sheets map to the table book_a_b and are inserted in turn.
+        "a b": [["n"]] + [[n] for n in range(20)],
+        "a_b": [["n"]] + [[n] for n in range(20, 40)],
+    }
+
+    client.delete("/api/delete/book_a_b")
+    result = upload(client, "book.xlsx", workbook(sheets), mode="append")
+
+    assert [entry["sheet"] for entry in result["stats"]] == ["x", "a b", "a_b"]
+    table = client.get("/api/tables/book_a_b?per_page=100").get_json()
+    assert sorted(record["data"]["n"] for record in table["records"]) == list(
+        range(40)
+    )
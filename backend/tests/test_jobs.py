@@ -0,0 +1,48 @@
+import io
+import time
+import types
+
+import cli
+
+
+def wait_for(client, job_id):
+    for _ in range(100):
+        job = client.get(f"/api/jobs/{job_id}").get_json()
+        if job["status"] not in ("queued", "running"):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def test_job_state_is_visible_to_other_workers(client, storage, app_module):
+    response = client.post(
+        "/api/upload",
+        query_string={"async": "1"},
+        data={"file": (io.BytesIO(b"a,b\n1,x\n2,y\n"), "queued.csv")},
+        content_type="multipart/form-data",
+    )
+    assert response.status_code == 202
+    job_id = response.get_json()["job_id"]
+    assert wait_for(client, job_id)["status"] == "completed"
+
+    # Another worker has none of this worker's in-memory state.
+    with app_module.import_jobs_lock:
+        app_module.import_jobs.clear()
+    response = client.get(f"/api/jobs/{job_id}")
+
+    assert response.status_code == 200
+    job = response.get_json()
+    assert job["status"] == "completed"
+    assert job["rows_processed"] == 2
+    assert job["tables"] == ["queued"]
+
+
+def test_cli_reports_a_job_it_cannot_poll():
+    response = types.SimpleNamespace(
+        status_code=404, json=lambda: {"error": "Job not found"}
+    )
+    session = types.SimpleNamespace(get=lambda url: response)
+
+    job = cli.DatabaseCLI(session=session).wait_for_job("missing")
+
+    assert job == {"status": "failed", "error": "Job not found"}
@@ -0,0 +1,41 @@
+import time
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+
+def test_profiling_is_opt_in(client):
+    response = client.get("/api/tables?profile=1")
+
+    assert response.status_code == 200
+    assert "profile" not in response.get_json()
+
+
+def test_histogram_lists_every_bucket_in_order(client, app_module):
+    client.get("/api/tables")
+
+    lines = client.get("/api/metrics").get_data(as_text=True).splitlines()
+    prefix = 'excel_db_request_seconds_bucket{endpoint="get_tables",'
+    buckets = [line for line in lines if line.startswith(prefix)]
+
+    expected = [str(bucket) for bucket in (*app_module.REQUEST_BUCKETS, "+Inf")]
+    assert [line.split('le="')[1].split('"')[0] for line in buckets] == expected
+    counts = [float(line.rsplit(" ", 1)[1]) for line in buckets]
+    assert counts == sorted(counts)
+    assert counts[-1] >= 1
+
+
+def test_failed_statement_does_not_skew_sql_timing(app_module):
+    collector = app_module.RequestMetrics("test")
+    with app_module.app.app_context(), app_module.collecting(collector):
+        with app_module.db.engine.connect() as connection:
+            with pytest.raises(DBAPIError):
+                connection.execute(text("SELECT * FROM missing_table"))
+            connection.rollback()
+            time.sleep(0.2)
+            connection.execute(text("SELECT 1"))
+
+    # Only the statement that succeeded is timed, from its own start.
+    assert collector.sql_statements == 1
+    assert 0 < collector.sql_seconds < 0.2
@@ -0,0 +1,80 @@
+import pytest
+
+from conftest import upload, xlsx
+
+
+@pytest.fixture
+def numbers(client, storage):
+    upload(
+        client,
+        "numbers.xlsx",
+        xlsx([["n"], *([n] for n in range(1, 6))]),
+        mode="replace",
+    )
+    return "/api/tables/numbers_Sheet"
+
+
+def page(client, url, **params):
+    response = client.get(url, query_string={"per_page": 2, **params})
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+
+def values(data):
+    return [record["data"]["n"] for record in data["records"]]
+
+
+@pytest.mark.parametrize("storage", ["legacy", "typed"], indirect=True)
+def test_cursors_walk_forward_and_back(client, numbers):
+    first = page(client, numbers)
+    assert values(first) == [1, 2]
+    assert first["prev_cursor"] is None
+
+    second = page(client, numbers, cursor=first["next_cursor"])
+    third = page(client, numbers, cursor=second["next_cursor"])
+    assert values(second) == [3, 4]
+    assert values(third) == [5]
+    assert third["next_cursor"] is None
+
+    back = page(client, numbers, cursor=third["prev_cursor"])
+    assert values(back) == [3, 4]
+    assert values(page(client, numbers, cursor=back["prev_cursor"])) == [1, 2]
+
+
+def test_seeking_by_cursor_reports_no_page_number(client, numbers):
+    first = page(client, numbers, page=2)
+    assert first["current_page"] == 2
+
+    after = page(client, numbers, page=2, cursor=first["next_cursor"])
+    assert after["current_page"] is None
+    assert page(client, numbers, after_id=1)["current_page"] is None
+
+
+def test_invalid_cursor_is_rejected(client, numbers):
+    response = client.get(numbers, query_string={"cursor": "not-a-cursor"})
+
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "Invalid cursor"
+
+
+@pytest.mark.parametrize(
+    "count, total, pages", [("exact", 5, 3), ("none", None, None)]
+)
+def test_count_modes(client, numbers, count, total, pages):
+    data = page(client, numbers, count=count)
+
+    assert data["count"] == count
+    assert data["total"] == total
+    assert data["pages"] == pages
+
+
+def test_estimated_count_is_a_number(client, numbers):
+    data = page(client, numbers, count="estimate")
+
+    assert isinstance(data["total"], int)
+
+
+def test_unknown_count_mode_is_rejected(client, numbers):
+    response = client.get(numbers, query_string={"count": "approximate"})
+
+    assert response.status_code == 400
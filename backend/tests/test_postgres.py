@@ -0,0 +1,63 @@
+import pytest
+
+from conftest import upload
+
+AWKWARD = (
+    'note,n\n"tab\there",1\n"line\nbreak",2\n"back\\\\slash \\N",3\n'
+    '"quote "" ünicode",4\n,5\n'
+)
+
+
+@pytest.fixture
+def postgres(app_module):
+    with app_module.app.app_context():
+        if app_module.db.engine.dialect.name != "postgresql":
+            pytest.skip("needs PostgreSQL (set TEST_DATABASE_URL)")
+    return app_module
+
+
+def notes(client, table_name, **params):
+    response = client.get(f"/api/tables/{table_name}", query_string=params)
+    records = response.get_json()["records"]
+    return [record["data"]["note"] for record in records]
+
+
+@pytest.mark.parametrize("storage", ["legacy", "typed"], indirect=True)
+def test_copy_keeps_values_copy_would_escape(client, storage, postgres):
+    upload(client, "awkward.csv", AWKWARD, mode="replace")
+
+    assert notes(client, "awkward") == [
+        "tab\there",
+        "line\nbreak",
+        "back\\\\slash \\N",
+        'quote " ünicode',
+        None,
+    ]
+
+
+def test_legacy_rows_are_jsonb_behind_a_gin_index(client, storage, postgres):
+    upload(client, "awkward.csv", AWKWARD, mode="replace")
+
+    with postgres.app.app_context():
+        data_type = postgres.table_column_types("data_records")["data"]
+        indexes = postgres.table_index_names("data_records")
+    assert isinstance(data_type, postgres.JSONB)
+    assert "ix_data_records_data_gin" in indexes
+    assert notes(client, "awkward", filter="n=4") == ['quote " ünicode']
+
+
+def test_rows_copied_with_their_ids_advance_the_sequence(client, storage, postgres):
+    upload(client, "awkward.csv", AWKWARD, mode="replace")
+    result = postgres.app.test_cli_runner().invoke(
+        args=["migrate-storage", "--table", "awkward"]
+    )
+    assert "Migrated awkward: 5 rows" in result.output
+
+    response = client.post(
+        "/api/tables/awkward/rows:batch", json={"insert": [{"note": "new", "n": 6}]}
+    )
+
+    assert response.status_code == 200
+    ids = [r["id"] for r in client.get("/api/tables/awkward").get_json()["records"]]
+    assert response.get_json()["results"]["insert"][0]["id"] == max(ids)
+    assert len(set(ids)) == 6
@@ -0,0 +1,77 @@
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+
+import pytest
+from sqlalchemy import text
+
+from conftest import BACKEND_DIR, WORKDIR
+
+
+def test_records_are_looked_up_through_the_table_id_index(app_module):
+    with app_module.app.app_context():
+        if app_module.db.engine.dialect.name != "sqlite":
+            pytest.skip("needs SQLite")
+        plan = app_module.db.session.execute(
+            text(
+                "EXPLAIN QUERY PLAN SELECT id, data FROM data_records "
+                "WHERE table_id = 1 AND id > 10 ORDER BY id LIMIT 50"
+            )
+        ).all()
+
+    assert "ix_data_records_table_id_id" in " ".join(row[-1] for row in plan)
+
+
+def test_records_keyed_by_table_name_are_migrated():
+    path = os.path.join(WORKDIR, "before_table_ids.db")
+    connection = sqlite3.connect(path)
+    connection.executescript(
+        """
+        CREATE TABLE dynamic_tables (
+            id INTEGER PRIMARY KEY, table_name VARCHAR(100) NOT NULL UNIQUE,
+            columns TEXT NOT NULL, created_at DATETIME
+        );
+        CREATE TABLE data_records (
+            id INTEGER PRIMARY KEY, table_name VARCHAR(100) NOT NULL,
+            data TEXT NOT NULL, created_at DATETIME
+        );
+        INSERT INTO dynamic_tables VALUES
+            (1, 'fruit', '["name"]', '2024-01-01 00:00:00'),
+            (2, 'veg', '["name"]', '2024-01-01 00:00:00');
+        INSERT INTO data_records VALUES
+            (1, 'fruit', '{"name": "fig"}', '2024-01-01 00:00:00'),
+            (2, 'veg', '{"name": "kale"}', '2024-01-01 00:00:00'),
+            (3, 'fruit', '{"name": "lime"}', '2024-01-01 00:00:00');
+        """
+    )
+    connection.commit()
+    connection.close()
+    script = (
+        "import json, app; "
+        "client = app.app.test_client(); "
+        "print(json.dumps(client.get('/api/tables/fruit').get_json()['records']))"
+    )
+
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=WORKDIR,
+        env={
+            **os.environ,
+            "DATABASE_URL": f"sqlite:///{path}",
+            "PYTHONPATH": BACKEND_DIR,
+        },
+        capture_output=True,
+        text=True,
+    )
+
+    assert result.returncode == 0, result.stderr
+    records = json.loads(result.stdout.splitlines()[-1])
+    assert [record["data"]["name"] for record in records] == ["fig", "lime"]
+    connection = sqlite3.connect(path)
+    columns = [row[1] for row in connection.execute("PRAGMA table_info(data_records)")]
+    indexes = [row[1] for row in connection.execute("PRAGMA index_list(data_records)")]
+    connection.close()
+    assert "table_name" not in columns
+    assert "ix_data_records_table_id_id" in indexes
@@ -0,0 +1,59 @@
+import pytest
+
+from conftest import upload
+
+
+@pytest.fixture
+def links(client, storage):
+    client.delete("/api/delete/links")
+    upload(
+        client,
+        "links.csv",
+        "title,url\nmarmara,https://obs.marmara.edu.tr\nexample,https://example.com\n",
+    )
+    return client
+
+
+@pytest.mark.parametrize("storage", ["legacy", "typed"], indirect=True)
+def test_search_for_url(links):
+    response = links.get("/api/search?q=https://obs.marmara.edu.tr")
+
+    assert response.status_code == 200
+    assert response.get_json()["total"] == 1
+    table = links.get("/api/tables/links?search=https://obs.marmara.edu.tr")
+    assert table.get_json()["total"] == 1
+
+
+@pytest.mark.parametrize("storage", ["legacy", "typed"], indirect=True)
+def test_column_prefix_restricts_term(links, app_module):
+    if not app_module.search_index.enabled:
+        pytest.skip("column prefixes need the FTS5 search index")
+
+    assert links.get("/api/tables/links?search=title:marmara").get_json()[
+        "total"
+    ] == 1
+    assert links.get("/api/tables/links?search=title:example.com").get_json()[
+        "total"
+    ] == 0
+
+
+@pytest.mark.parametrize("cursor", ["WzFd", "WyJhIiwgMSwgMl0=", "bm90IGpzb24="])
+def test_malformed_search_cursor(links, cursor):
+    # [1], ["a", 1, 2] and a string that is not JSON.
+    response = links.get(f"/api/search?q=https&cursor={cursor}")
+
+    assert response.status_code == 400
+
+
+def test_search_cursor_round_trip(links):
+    first = links.get("/api/search?q=https&limit=1").get_json()
+    second = links.get(
+        f"/api/search?q=https&limit=1&cursor={first['next_cursor']}"
+    ).get_json()
+
+    assert len(first["results"]) == len(second["results"]) == 1
+    assert first["results"][0] != second["results"][0]
+
+
+def test_malformed_table_cursor(links):
+    assert links.get("/api/tables/links?cursor=WzFd").status_code == 400
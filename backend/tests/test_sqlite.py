@@ -0,0 +1,83 @@
+import threading
+import time
+
+import pytest
+from sqlalchemy import text
+
+
+def overlapping(windows):
+    windows = sorted(windows)
+    return any(end > start for (_, end), (start, _) in zip(windows, windows[1:]))
+
+
+def run_threads(target, count=4):
+    threads = [threading.Thread(target=target) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def test_writer_lock_admits_one_thread_at_a_time(app_module, tmp_path):
+    lock = app_module.WriterLock(str(tmp_path / "db.lock"))
+    windows = []
+
+    def write():
+        with lock:
+            started = time.monotonic()
+            time.sleep(0.02)
+            windows.append((started, time.monotonic()))
+
+    run_threads(write)
+
+    assert len(windows) == 4
+    assert not overlapping(windows)
+
+
+def test_writer_lock_is_reentrant_for_its_owner(app_module, tmp_path):
+    lock = app_module.WriterLock(str(tmp_path / "db.lock"))
+    taken = threading.Event()
+
+    with lock:
+        with lock:
+            pass
+        thread = threading.Thread(target=lambda: lock.acquire() or taken.set())
+        thread.start()
+        # Still held after the inner release.
+        assert not taken.wait(0.05)
+    thread.join(1)
+
+    assert taken.is_set()
+    lock.release()
+
+
+def test_sqlite_runs_in_wal_mode(app_module):
+    if app_module.writer_lock is None:
+        pytest.skip("needs SQLite")
+    with app_module.app.app_context(), app_module.db.engine.connect() as connection:
+        assert connection.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert connection.execute(text("PRAGMA synchronous")).scalar() == 1
+
+
+def test_write_transactions_hold_the_writer_lock(app_module):
+    if app_module.writer_lock is None:
+        pytest.skip("needs SQLite")
+    with app_module.app.app_context():
+        engine = app_module.db.engine
+    with engine.begin() as connection:
+        connection.execute(text("DROP TABLE IF EXISTS lock_probe"))
+        connection.execute(text("CREATE TABLE lock_probe (n INTEGER)"))
+    owners = []
+
+    def write():
+        with engine.begin() as connection:
+            connection.execute(text("INSERT INTO lock_probe VALUES (1)"))
+            owners.append(app_module.writer_lock.owner == threading.get_ident())
+            time.sleep(0.02)
+
+    run_threads(write)
+
+    assert owners == [True] * 4
+    assert app_module.writer_lock.owner is None
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT COUNT(*) FROM lock_probe")).scalar() == 4
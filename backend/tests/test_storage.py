@@ -0,0 +1,148 @@
+import json
+from datetime import datetime
+
+import pytest
+
+from conftest import upload, xlsx
+
+
+@pytest.mark.parametrize("storage", ["typed"], indirect=True)
+def test_update_row_with_datetime_column(client, storage):
+    upload(
+        client,
+        "events.xlsx",
+        xlsx([["name", "day"], ["launch", datetime(2024, 1, 2)]]),
+    )
+    table = client.get("/api/tables/events_Sheet").get_json()
+    record = table["records"][0]
+
+    response = client.post(
+        "/api/update_row",
+        json={
+            "table_name": "events_Sheet",
+            "id": record["id"],
+            "data": {**record["data"], "name": "kickoff"},
+        },
+    )
+
+    assert response.status_code == 200
+    updated = client.get("/api/tables/events_Sheet").get_json()["records"][0]
+    assert updated["data"] == {"name": "kickoff", "day": "2024-01-02T00:00:00"}
+
+
+@pytest.mark.parametrize("storage", ["typed"], indirect=True)
+def test_typed_table_recreated_by_another_worker(client, storage, app_module):
+    upload(client, "layout.csv", "a,b\n1,x\n")
+    # Another worker still has the definition cached when the table is
+    # dropped and a new one takes over its id.
+    stale = dict(app_module.typed_tables)
+    assert client.delete("/api/delete/layout").status_code == 200
+    upload(client, "layout.csv", "a,b,c\n1.5,y,2\n")
+    app_module.typed_tables.update(stale)
+
+    response = client.get("/api/tables/layout")
+
+    assert response.status_code == 200
+    assert response.get_json()["records"][0]["data"] == {"a": 1.5, "b": "y", "c": 2}
+
+
+@pytest.fixture
+def people(client, storage):
+    upload(client, "people.csv", "name,age\nada,36\nalan,41\n", mode="replace")
+    return client.get("/api/tables/people").get_json()["records"]
+
+
+@pytest.mark.parametrize("storage", ["typed"], indirect=True)
+def test_update_row_rejects_value_of_the_wrong_type(client, people):
+    response = client.post(
+        "/api/update_row",
+        json={
+            "table_name": "people",
+            "id": people[0]["id"],
+            "data": {"name": "ada", "age": "abc"},
+        },
+    )
+
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "Invalid value for age: abc"}
+
+
+@pytest.mark.parametrize("storage", ["typed"], indirect=True)
+def test_update_row_converts_numeric_strings(client, people):
+    response = client.post(
+        "/api/update_row",
+        json={
+            "table_name": "people",
+            "id": people[0]["id"],
+            "data": {"name": "ada", "age": "37"},
+        },
+    )
+
+    assert response.status_code == 200
+    records = client.get("/api/tables/people").get_json()["records"]
+    assert records[0]["data"] == {"name": "ada", "age": 37}
+
+
+@pytest.mark.parametrize("storage", ["typed"], indirect=True)
+def test_batch_with_a_bad_value_is_rejected_without_changes(client, people):
+    response = client.post(
+        "/api/tables/people/rows:batch",
+        json={
+            "insert": [{"name": "grace", "age": 85}],
+            "update": [{"id": people[1]["id"], "data": {"age": "forty"}}],
+        },
+    )
+
+    assert response.status_code == 400
+    assert response.get_json() == {
+        "error": f"update {people[1]['id']}: Invalid value for age: forty"
+    }
+    records = client.get("/api/tables/people").get_json()["records"]
+    assert [record["data"]["name"] for record in records] == ["ada", "alan"]
+
+
+SHIPMENTS = "item,shipped\nbox,2024-01-02\ncrate,2024-01-03 10:30\n"
+
+
+def column_types(app_module, table_name):
+    with app_module.app.app_context():
+        table = app_module.DynamicTable.query.filter_by(table_name=table_name).one()
+        return json.loads(table.column_types)
+
+
+@pytest.mark.parametrize("storage", ["legacy", "typed"], indirect=True)
+def test_csv_dates_are_typed_on_upload(client, storage, app_module):
+    upload(client, "shipments.csv", SHIPMENTS, mode="replace")
+
+    assert column_types(app_module, "shipments") == ["text", "datetime"]
+    records = client.get("/api/tables/shipments").get_json()["records"]
+    assert [record["data"]["shipped"] for record in records] == [
+        "2024-01-02T00:00:00",
+        "2024-01-03T10:30:00",
+    ]
+
+
+def test_migrate_storage_types_csv_dates_like_an_upload(client, app_module):
+    # Tables from before column types were recorded are typed by migration.
+    upload(client, "migrated.csv", SHIPMENTS, mode="replace")
+    with app_module.app.app_context():
+        table = app_module.DynamicTable.query.filter_by(table_name="migrated").one()
+        table.column_types = None
+        app_module.db.session.commit()
+
+    result = app_module.app.test_cli_runner().invoke(
+        args=["migrate-storage", "--table", "migrated"]
+    )
+
+    assert result.exit_code == 0, result.output
+    assert column_types(app_module, "migrated") == ["text", "datetime"]
+
+
+@pytest.mark.parametrize("storage", ["legacy", "typed"], indirect=True)
+def test_reupserting_csv_dates_changes_nothing(client, storage):
+    upload(client, "shipments.csv", SHIPMENTS, mode="replace")
+    upload(client, "shipments.csv", SHIPMENTS, mode="upsert", key="item")
+
+    stats = upload(client, "shipments.csv", SHIPMENTS, mode="upsert", key="item")
+
+    assert stats["stats"][0]["unchanged"] == 2
@@ -0,0 +1,51 @@
+import pytest
+
+from conftest import upload
+
+STORAGES = ["legacy", "typed"]
+
+
+def upsert(client, content):
+    stats = upload(client, "stock.csv", content, mode="upsert", key="sku")
+    return stats["stats"][0]
+
+
+def stock(client):
+    records = client.get("/api/tables/stock?sort=sku").get_json()["records"]
+    return [record["data"] for record in records]
+
+
+@pytest.fixture
+def stocked(client, storage):
+    client.delete("/api/delete/stock")
+    upload(client, "stock.csv", "sku,qty\n1,5\n2,6\n")
+    return client
+
+
+@pytest.mark.parametrize("storage", STORAGES, indirect=True)
+def test_blank_cell_does_not_change_other_rows(stocked):
+    # The blank qty makes pandas read the whole column as floats.
+    stats = upsert(stocked, "sku,qty\n1,5\n2,\n3,7\n")
+
+    assert (stats["inserted"], stats["updated"], stats["unchanged"]) == (1, 1, 1)
+    assert [row["qty"] for row in stock(stocked)] == [5, None, 7]
+
+
+@pytest.mark.parametrize("storage", STORAGES, indirect=True)
+def test_rows_with_blank_keys_are_skipped(stocked):
+    stats = upsert(stocked, "sku,qty\n,9\n1,5\n2,8\n")
+
+    assert stats["skipped"] == 1
+    assert (stats["inserted"], stats["updated"], stats["unchanged"]) == (0, 1, 1)
+    assert [row["sku"] for row in stock(stocked)] == [1, 2]
+
+
+@pytest.mark.parametrize("storage", STORAGES, indirect=True)
+def test_upsert_finds_rows_appended_without_a_key(stocked):
+    upsert(stocked, "sku,qty\n1,5\n2,6\n")
+    upload(stocked, "stock.csv", "sku,qty\n3,7\n")
+
+    stats = upsert(stocked, "sku,qty\n3,7\n")
+
+    assert (stats["inserted"], stats["updated"], stats["unchanged"]) == (0, 0, 1)
+    assert [row["sku"] for row in stock(stocked)] == [1, 2, 3]
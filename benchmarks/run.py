@@ -0,0 +1,516 @@
+#!/usr/bin/env python3
+"""Benchmark suite for the Excel Database backend and CLI.
+
+Runs entirely offline: the app is driven through the Flask test client
+against a throwaway SQLite database, Redis is replaced by fakeredis, and the
+CLI scenarios talk to an in-process HTTP server on localhost. Every scenario
+runs in a process of its own, so peak RSS is measured per scenario. Pass
+--database-url to run against an empty PostgreSQL database instead.
+
+    python benchmarks/run.py run --profile smoke --output results.json
+    python benchmarks/run.py compare baseline.json results.json
+"""
+import json
+import logging
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import click
+
+from workloads import CITIES, WORDS, write_csv, write_xlsx
+
+ROOT = Path(__file__).resolve().parent.parent
+BACKEND_DIR = ROOT / "backend"
+
+PROFILES = {
+    "smoke": {"rows": 10_000, "columns": 5, "tables": 1, "requests": 50},
+    "default": {"rows": 200_000, "columns": 20, "tables": 10, "requests": 200},
+    "wide": {"rows": 100_000, "columns": 200, "tables": 1, "requests": 100},
+    "many": {"rows": 500_000, "columns": 10, "tables": 500, "requests": 200},
+    "large": {"rows": 5_000_000, "columns": 20, "tables": 50, "requests": 500},
+}
+
+# Metrics compared against a baseline, and whether higher values are better.
+METRICS = {
+    "rows_per_sec": True,
+    "p50_ms": False,
+    "p99_ms": False,
+    "peak_rss_mb": False,
+    "import_ms": False,
+}
+# Loaded on first use by the app and the CLI, never while they start up.
+LAZY_MODULES = ("pandas", "numpy", "openpyxl", "redis", "tabulate")
+STARTUP_RUNS = 5
+
+
+class BenchmarkError(Exception):
+    pass
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def peak_rss_mb():
+    # ru_maxrss is in KiB on Linux; child processes cover the sheet decoders.
+    peak = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    )
+    return round(peak / 1024, 1)
+
+
+def summarize(latencies, rows=None):
+    seconds = sum(latencies)
+    result = {
+        "requests": len(latencies),
+        "seconds": round(seconds, 3),
+        "p50_ms": round(percentile(latencies, 0.5) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+    }
+    if rows is not None:
+        result["rows"] = rows
+        result["rows_per_sec"] = round(rows / seconds) if seconds else None
+    result["peak_rss_mb"] = peak_rss_mb()
+    return result
+
+
+class Bench:
+    """The app under test plus the generated workload files."""
+
+    def __init__(self, workdir, settings, storage, database_url=None):
+        self.workdir = Path(workdir)
+        self.settings = settings
+        self.rng = random.Random(0)
+        self.app = self.load_app(storage, database_url)
+        self.client = self.app.app.test_client()
+        self.server = None
+
+    def load_app(self, storage, database_url):
+        import fakeredis
+        import redis
+
+        os.environ["DATABASE_URL"] = (
+            database_url or f"sqlite:///{self.workdir / 'bench.db'}"
+        )
+        os.environ["UPLOAD_FOLDER"] = str(self.workdir / "uploads")
+        os.environ["STORAGE_BACKEND"] = storage
+        server = fakeredis.FakeServer()
+        redis.from_url = lambda url, **kwargs: fakeredis.FakeRedis(
+            server=server, **kwargs
+        )
+        sys.path.insert(0, str(BACKEND_DIR))
+        import app
+
+        return app
+
+    def request(self, method, url, **kwargs):
+        started = time.perf_counter()
+        response = self.client.open(url, method=method, **kwargs)
+        body = response.get_data()
+        elapsed = time.perf_counter() - started
+        if response.status_code != 200:
+            raise BenchmarkError(
+                f"{method} {url}: {response.status_code} {body[:200]!r}"
+            )
+        return elapsed, response
+
+    def upload(self, path):
+        with open(path, "rb") as f:
+            return self.request(
+                "POST",
+                "/api/upload",
+                data={"file": (f, path.name)},
+                content_type="multipart/form-data",
+            )
+
+    def start_server(self):
+        from werkzeug.serving import make_server
+
+        logging.getLogger("werkzeug").setLevel(logging.WARNING)
+        self.server = make_server("127.0.0.1", 0, self.app.app, threaded=True)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return f"http://127.0.0.1:{self.server.server_port}/api"
+
+    def close(self):
+        if self.server:
+            self.server.shutdown()
+
+
+def scenario_import_csv(bench):
+    rows, columns = bench.settings["rows"], bench.settings["columns"]
+    path = write_csv(bench.workdir / "bench.csv", rows, columns)
+    elapsed, _ = bench.upload(path)
+    return summarize([elapsed], rows)
+
+
+def scenario_import_xlsx(bench):
+    tables, columns = bench.settings["tables"], bench.settings["columns"]
+    rows = max(1, bench.settings["rows"] // 10 // tables)
+    path = write_xlsx(bench.workdir / "sheets.xlsx", tables, rows, columns, seed=1)
+    elapsed, _ = bench.upload(path)
+    return summarize([elapsed], rows * tables)
+
+
+def scenario_read_pages(bench):
+    pages = max(1, bench.settings["rows"] // 50)
+    latencies = []
+    count = min(pages, bench.settings["requests"])
+    for page in bench.rng.sample(range(1, pages + 1), count):
+        elapsed, _ = bench.request(
+            "GET", f"/api/tables/bench?page={page}&per_page=50"
+        )
+        latencies.append(elapsed)
+    return summarize(latencies, len(latencies) * 50)
+
+
+def scenario_read_filtered(bench):
+    latencies = []
+    for index in range(bench.settings["requests"]):
+        city = CITIES[index % len(CITIES)]
+        elapsed, _ = bench.request(
+            "GET",
+            f"/api/tables/bench?filter=city={city}&filter=amount>{index % 900}"
+            "&sort=-amount&fields=id,name,amount&per_page=50",
+        )
+        latencies.append(elapsed)
+    return summarize(latencies)
+
+
+def scenario_search(bench):
+    latencies = []
+    for index in range(bench.settings["requests"]):
+        term = f"{WORDS[index % len(WORDS)]}{bench.rng.randrange(1000)}"
+        elapsed, _ = bench.request("GET", f"/api/search?q={term}&limit=100")
+        latencies.append(elapsed)
+    return summarize(latencies)
+
+
+def scenario_aggregate(bench):
+    latencies = []
+    for index in range(min(20, bench.settings["requests"])):
+        elapsed, _ = bench.request(
+            "GET",
+            "/api/tables/bench/aggregate?group_by=city&sum=amount&avg=amount"
+            f"&count_distinct=name&filter=amount>{index}",
+        )
+        latencies.append(elapsed)
+    return summarize(latencies)
+
+
+def scenario_export_csv(bench):
+    elapsed, _ = bench.request("GET", "/api/export/bench?format=csv")
+    return summarize([elapsed], bench.settings["rows"])
+
+
+def scenario_cli(bench):
+    from click.testing import CliRunner
+
+    os.environ["CLI_API_URL"] = bench.start_server()
+    import cli
+
+    runner = CliRunner()
+    commands = [["tables"], ["show", "bench", "-p", "2"], ["search", "alpha1"]]
+    latencies = []
+    for index in range(bench.settings["requests"]):
+        args = commands[index % len(commands)]
+        started = time.perf_counter()
+        result = runner.invoke(cli.main, args)
+        latencies.append(time.perf_counter() - started)
+        if result.exit_code != 0:
+            raise BenchmarkError(f"cli.py {' '.join(args)}: {result.output[-200:]}")
+    return summarize(latencies)
+
+
+def import_profile(module):
+    """Import *module* in a fresh interpreter with ``-X importtime``.
+
+    Returns the wall time of the process and the cumulative import time in
+    milliseconds of every module it loaded.
+    """
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        env={**os.environ, "REDIS_URL": ""},
+        capture_output=True,
+        text=True,
+    )
+    elapsed = time.perf_counter() - started
+    if result.returncode != 0:
+        raise BenchmarkError(f"import {module}: {result.stderr[-200:]}")
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            modules[name.strip()] = int(cumulative) / 1000
+    return elapsed, modules
+
+
+def startup(module):
+    latencies, import_ms = [], []
+    for _ in range(STARTUP_RUNS):
+        elapsed, modules = import_profile(module)
+        loaded = [name for name in LAZY_MODULES if name in modules]
+        if loaded:
+            raise BenchmarkError(
+                f"import {module} loaded {', '.join(loaded)} at startup"
+            )
+        latencies.append(elapsed)
+        import_ms.append(modules[module])
+    result = summarize(latencies)
+    result["import_ms"] = round(percentile(import_ms, 0.5), 1)
+    return result
+
+
+def scenario_startup_api(bench):
+    # Runs against the populated database, so startup migrations are included.
+    return startup("app")
+
+
+def scenario_startup_cli(bench):
+    return startup("cli")
+
+
+# Read scenarios use the table written by import_csv, so order matters.
+SCENARIOS = {
+    "import_csv": scenario_import_csv,
+    "import_xlsx": scenario_import_xlsx,
+    "read_pages": scenario_read_pages,
+    "read_filtered": scenario_read_filtered,
+    "search": scenario_search,
+    "aggregate": scenario_aggregate,
+    "export_csv": scenario_export_csv,
+    "cli": scenario_cli,
+    "startup_api": scenario_startup_api,
+    "startup_cli": scenario_startup_cli,
+}
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+@click.group()
+def main():
+    pass
+
+
+@main.command("run")
+@click.option("--profile", type=click.Choice(list(PROFILES)), default="smoke")
+@click.option("--rows", type=int, help="Rows in the main table")
+@click.option("--columns", type=int, help="Columns per table")
+@click.option("--tables", type=int, help="Sheets in the workbook import")
+@click.option("--requests", type=int, help="Requests per read scenario")
+@click.option(
+    "--storage", type=click.Choice(["legacy", "typed"]), default="legacy"
+)
+@click.option(
+    "--scenario",
+    "scenarios",
+    multiple=True,
+    type=click.Choice(list(SCENARIOS)),
+    help="Only run these scenarios (import_csv always runs first)",
+)
+@click.option(
+    "--database-url",
+    envvar="BENCH_DATABASE_URL",
+    help="Benchmark this (empty) database instead of a temporary SQLite file",
+)
+@click.option("--output", "-o", type=click.Path(), help="Write results as JSON")
+@click.option("--workdir", type=click.Path(file_okay=False), help="Keep files here")
+def run(
+    profile, rows, columns, tables, requests, storage, scenarios, database_url,
+    output, workdir,
+):
+    """Run the benchmark scenarios and report their metrics."""
+    settings = dict(PROFILES[profile])
+    for name, value in (
+        ("rows", rows),
+        ("columns", columns),
+        ("tables", tables),
+        ("requests", requests),
+    ):
+        if value:
+            settings[name] = value
+    selected = [name for name in SCENARIOS if not scenarios or name in scenarios]
+    if "import_csv" not in selected:
+        selected.insert(0, "import_csv")
+
+    with tempfile.TemporaryDirectory(prefix="excel-db-bench-") as tmp:
+        results = {}
+        for name in selected:
+            click.echo(f"Running {name}...", err=True)
+            results[name] = run_scenario(
+                name, settings, storage, database_url, Path(workdir or tmp)
+            )
+
+    report = {
+        "meta": {
+            "profile": profile,
+            "storage": storage,
+            "database": database_url.split(":", 1)[0] if database_url else "sqlite",
+            **settings,
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        },
+        "scenarios": results,
+    }
+    print_report(results)
+    if output:
+        Path(output).write_text(json.dumps(report, indent=2) + "\n")
+        click.echo(f"Results written to {output}", err=True)
+
+
+def run_scenario(name, settings, storage, database_url, workdir):
+    """Run one scenario in a fresh process and return its metrics.
+
+    ru_maxrss never goes down, so peak RSS is only per scenario when each one
+    has a process of its own. They share the workdir and the database.
+    """
+    result_path = workdir / f"{name}.json"
+    command = [
+        sys.executable,
+        str(Path(__file__).resolve()),
+        "scenario",
+        name,
+        "--settings",
+        json.dumps(settings),
+        "--storage",
+        storage,
+        "--workdir",
+        str(workdir),
+        "--output",
+        str(result_path),
+    ]
+    if database_url:
+        command += ["--database-url", database_url]
+    if subprocess.run(command, stdout=subprocess.DEVNULL).returncode != 0:
+        raise click.ClickException(f"Scenario {name} failed")
+    return json.loads(result_path.read_text())
+
+
+@main.command("scenario", hidden=True)
+@click.argument("name", type=click.Choice(list(SCENARIOS)))
+@click.option("--settings", required=True, help="Workload settings as JSON")
+@click.option("--storage", required=True)
+@click.option("--database-url")
+@click.option("--workdir", required=True, type=click.Path(file_okay=False))
+@click.option("--output", required=True, type=click.Path())
+def scenario(name, settings, storage, database_url, workdir, output):
+    """Run a single scenario; used by ``run``."""
+    bench = Bench(workdir, json.loads(settings), storage, database_url)
+    try:
+        result = SCENARIOS[name](bench)
+    finally:
+        bench.close()
+    Path(output).write_text(json.dumps(result))
+
+
+def print_report(results):
+    from tabulate import tabulate
+
+    headers = [
+        "scenario", "requests", "rows/sec", "p50 ms", "p99 ms", "import ms",
+        "peak RSS MB",
+    ]
+    rows = [
+        [
+            name,
+            metrics["requests"],
+            metrics.get("rows_per_sec", "-"),
+            metrics["p50_ms"],
+            metrics["p99_ms"],
+            metrics.get("import_ms", "-"),
+            metrics["peak_rss_mb"],
+        ]
+        for name, metrics in results.items()
+    ]
+    click.echo(tabulate(rows, headers=headers, tablefmt="github"))
+
+
+@main.command("compare")
+@click.argument("baseline", type=click.Path(exists=True, dir_okay=False))
+@click.argument("current", type=click.Path(exists=True, dir_okay=False))
+@click.option(
+    "--threshold",
+    default=0.15,
+    show_default=True,
+    help="Relative change treated as a regression",
+)
+def compare(baseline, current, threshold):
+    """Compare two result files and fail if any metric regressed."""
+    from tabulate import tabulate
+
+    baseline = json.loads(Path(baseline).read_text())
+    current = json.loads(Path(current).read_text())
+    for key in (
+        "profile", "storage", "database", "rows", "columns", "tables", "requests"
+    ):
+        if baseline["meta"].get(key) != current["meta"].get(key):
+            click.echo(
+                f"Warning: {key} differs ({baseline['meta'].get(key)} vs "
+                f"{current['meta'].get(key)}), results may not be comparable",
+                err=True,
+            )
+    baseline, current = baseline["scenarios"], current["scenarios"]
+    rows, regressions = [], 0
+    for name in current:
+        if name not in baseline:
+            continue
+        for metric, higher_is_better in METRICS.items():
+            old, new = baseline[name].get(metric), current[name].get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            regressed = -change > threshold if higher_is_better else change > threshold
+            regressions += regressed
+            rows.append(
+                [
+                    name,
+                    metric,
+                    old,
+                    new,
+                    f"{change:+.1%}",
+                    "REGRESSION" if regressed else "",
+                ]
+            )
+    click.echo(
+        tabulate(
+            rows,
+            headers=["scenario", "metric", "baseline", "current", "change", ""],
+            tablefmt="github",
+        )
+    )
+    if regressions:
+        click.echo(f"\n{regressions} regression(s) above {threshold:.0%}", err=True)
+        sys.exit(1)
+    click.echo(f"\nNo regressions above {threshold:.0%}", err=True)
+
+
+if __name__ == "__main__":
+    main()
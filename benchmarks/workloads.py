@@ -0,0 +1,83 @@
+"""Synthetic spreadsheets for the benchmark suite.
+
+Every generated column cycles through the value types uploads usually
+contain (integers, floats, words, categories and dates), so imports,
+searches and typed storage all see realistic data. Output is written in
+chunks, so multi-million row files never have to fit in memory.
+"""
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+
+WORDS = [
+    "alpha", "bravo", "charlie", "delta", "echo", "foxtrot", "golf", "hotel",
+    "india", "juliet", "kilo", "lima", "mike", "november", "oscar", "papa",
+]
+CITIES = ["Istanbul", "Ankara", "Izmir", "Paris", "Rome", "Oslo", "Lisbon"]
+CHUNK_ROWS = 100_000
+
+
+def make_frame(rows, columns, start=0, seed=0):
+    """Build rows [start, start + rows) of a table with *columns* columns.
+
+    The first columns are always ``id`` (unique), ``name`` (a searchable
+    word plus a number), ``city`` (low cardinality) and ``amount`` (float),
+    so scenarios can rely on them.
+    """
+    rng = np.random.default_rng(seed + start)
+    ids = np.arange(start, start + rows)
+    data = {
+        "id": ids,
+        "name": [f"{WORDS[i % len(WORDS)]}{i % 1000}" for i in ids],
+        "city": rng.choice(CITIES, rows),
+        "amount": rng.random(rows).round(2) * 1000,
+    }
+    for index in range(len(data), columns):
+        kind = index % 4
+        if kind == 0:
+            data[f"n{index}"] = rng.integers(0, 100_000, rows)
+        elif kind == 1:
+            data[f"f{index}"] = rng.random(rows).round(4)
+        elif kind == 2:
+            data[f"w{index}"] = rng.choice(WORDS, rows)
+        else:
+            data[f"d{index}"] = pd.Timestamp("2024-01-01") + pd.to_timedelta(
+                rng.integers(0, 365 * 24, rows), unit="h"
+            )
+    return pd.DataFrame(data).iloc[:, :columns]
+
+
+def frame_chunks(rows, columns, seed=0):
+    for start in range(0, rows, CHUNK_ROWS):
+        yield make_frame(min(CHUNK_ROWS, rows - start), columns, start, seed)
+
+
+def write_csv(path, rows, columns, seed=0):
+    for index, chunk in enumerate(frame_chunks(rows, columns, seed)):
+        chunk.to_csv(
+            path, mode="w" if index == 0 else "a", header=index == 0, index=False
+        )
+    return path
+
+
+def write_xlsx(path, tables, rows, columns, seed=0):
+    """Write a workbook with *tables* sheets of *rows* rows each."""
+    workbook = Workbook(write_only=True)
+    for table in range(tables):
+        sheet = workbook.create_sheet(f"sheet_{table}")
+        header = False
+        for chunk in frame_chunks(rows, columns, seed + table):
+            if not header:
+                sheet.append(list(chunk.columns))
+                header = True
+            for row in chunk.astype(object).itertuples(index=False):
+                sheet.append(
+                    [
+                        value.to_pydatetime()
+                        if isinstance(value, pd.Timestamp)
+                        else value
+                        for value in row
+                    ]
+                )
+    workbook.save(path)
+    return path
@@ -12,8 +12,9 @@ const translations = {
     minimize: "Minimize",
     close: "Close",
     run: "Run",
+    cancel: "Cancel",
     inputPlaceholder: "Enter command... (type help for assistance)",
-    historyHint: "Use ↑/↓ keys to navigate command history",
+    historyHint: "Use ↑/↓ keys to navigate command history, Ctrl+C to cancel",
     historyCount: "command(s) in history",
     connectionEstablished: "Terminal connection established...\n",
     connectionClosed: "\nTerminal connection closed.\n",
@@ -28,8 +29,10 @@ const translations = {
     minimize: "Küçült",
     close: "Kapat",
     run: "Çalıştır",
+    cancel: "İptal",
     inputPlaceholder: "Komut girin... (help ile yardım alabilirsiniz)",
-    historyHint: "↑/↓ tuşları ile komut geçmişinde gezinebilirsiniz",
+    historyHint:
+      "↑/↓ tuşları ile komut geçmişinde gezinebilirsiniz, Ctrl+C ile iptal edebilirsiniz",
     historyCount: "komut geçmişi",
     connectionEstablished: "Terminal bağlantısı kuruldu...\n",
     connectionClosed: "\nTerminal bağlantısı kesildi.\n",
@@ -42,6 +45,7 @@ const WebTerminal = ({ isOpen, onClose }) => {
   const [output, setOutput] = useState("");
   const [input, setInput] = useState("");
   const [isConnected, setIsConnected] = useState(false);
+  const [isRunning, setIsRunning] = useState(false);
   const [isMaximized, setIsMaximized] = useState(false);
   const [commandHistory, setCommandHistory] = useState([]);
   const [historyIndex, setHistoryIndex] = useState(-1);
@@ -99,16 +103,20 @@ const WebTerminal = ({ isOpen, onClose }) => {
           setOutput("");
         } else if (data.type === "output") {
           setOutput((prev) => prev + data.data);
+        } else if (data.type === "status") {
+          setIsRunning(false);
         }
       };
 
       wsRef.current.onclose = () => {
         setIsConnected(false);
+        setIsRunning(false);
         setOutput((prev) => prev + t.connectionClosed);
       };
 
       wsRef.current.onerror = () => {
         setIsConnected(false);
+        setIsRunning(false);
         setOutput((prev) => prev + t.connectionError);
       };
     } catch (error) {
@@ -122,6 +130,7 @@ const WebTerminal = ({ isOpen, onClose }) => {
       wsRef.current = null;
     }
     setIsConnected(false);
+    setIsRunning(false);
   };
 
   const sendCommand = (command) => {
@@ -132,6 +141,7 @@ const WebTerminal = ({ isOpen, onClose }) => {
           command: command,
         }),
       );
+      setIsRunning(true);
       if (command.trim() && command.trim() !== "clear") {
         setCommandHistory((prev) => {
           const newHistory = [
@@ -145,9 +155,15 @@ const WebTerminal = ({ isOpen, onClose }) => {
     }
   };
 
+  const cancelCommand = () => {
+    if (wsRef.current && wsRef.current.readyState === WebSocket.OPEN) {
+      wsRef.current.send(JSON.stringify({ type: "cancel" }));
+    }
+  };
+
   const handleSubmit = (e) => {
     e.preventDefault();
-    if (input.trim()) {
+    if (input.trim() && !isRunning) {
       setOutput((prev) => prev + input + "\n");
       sendCommand(input.trim());
       setInput("");
@@ -155,7 +171,10 @@ const WebTerminal = ({ isOpen, onClose }) => {
   };
 
   const handleKeyDown = (e) => {
-    if (e.key === "ArrowUp") {
+    if (e.ctrlKey && e.key === "c" && isRunning) {
+      e.preventDefault();
+      cancelCommand();
+    } else if (e.key === "ArrowUp") {
       e.preventDefault();
       if (historyIndex < commandHistory.length - 1) {
         const newIndex = historyIndex + 1;
@@ -251,13 +270,23 @@ const WebTerminal = ({ isOpen, onClose }) => {
               placeholder={t.inputPlaceholder}
               disabled={!isConnected}
             />
-            <button
-              type="submit"
-              disabled={!isConnected || !input.trim()}
-              className="px-3 py-1 bg-green-600 text-black rounded text-sm font-medium hover:bg-green-500 disabled:opacity-50 disabled:cursor-not-allowed transition-colors"
-            >
-              {t.run}
-            </button>
+            {isRunning ? (
+              <button
+                type="button"
+                onClick={cancelCommand}
+                className="px-3 py-1 bg-red-600 text-white rounded text-sm font-medium hover:bg-red-500 transition-colors"
+              >
+                {t.cancel}
+              </button>
+            ) : (
+              <button
+                type="submit"
+                disabled={!isConnected || !input.trim()}
+                className="px-3 py-1 bg-green-600 text-black rounded text-sm font-medium hover:bg-green-500 disabled:opacity-50 disabled:cursor-not-allowed transition-colors"
+              >
+                {t.run}
+              </button>
+            )}
           </form>
           <div className="flex items-center justify-between mt-2 text-xs text-gray-500">
             <span>{t.historyHint}</span>